@@ -0,0 +1 @@
+"""Performance benchmarks with synthetic scenes and stub tool executables."""
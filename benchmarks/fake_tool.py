@@ -0,0 +1,104 @@
+"""
+Stand-in for colmap, glomap and 3DGUT's train.py in benchmarks.
+
+Prints output shaped like the real tool's log at a controlled volume and
+rate, then exits. The first argument selects the tool ('colmap', 'glomap'
+or 'train'); the rest are the tool's own arguments (ignored apart from the
+COLMAP/GloMAP subcommand). Environment variables:
+
+    BENCH_LINES   Number of lines to print (default 10000)
+    BENCH_RATE    Lines per second, 0 for as fast as possible (default 0)
+    BENCH_FLUSH   Flush after every line like glog's unbuffered stderr,
+                  0 for block-buffered output (default 1)
+    BENCH_EXIT    Exit code (default 0)
+"""
+import os
+import sys
+import time
+
+
+def _glog_prefix(index, source):
+    """Prefix of a glog line as printed by COLMAP and GloMAP."""
+    return f"I1018 12:{index // 60000 % 60:02d}:{index // 1000 % 60:02d}.{index % 1000:03d}000 " \
+        f"140213 {source}] "
+
+
+def colmap_lines(command, count):
+    """Yield COLMAP-style output lines."""
+    if command == 'exhaustive_matcher' or command.endswith('_matcher'):
+        blocks = max(1, int(count ** 0.5))
+        for i in range(count):
+            yield _glog_prefix(i, 'matching.cc:412') + \
+                f"Matching block [{i // blocks + 1}/{blocks}, {i % blocks + 1}/{blocks}] in 0.{i % 1000:03d}s"
+        return
+    images = max(1, (count + 3) // 4)
+    for i in range(count):
+        image = i // 4
+        kind = i % 4
+        if kind == 0:
+            yield _glog_prefix(i, 'feature_extraction.cc:258') + f"Processed file [{image + 1}/{images}]"
+        elif kind == 1:
+            yield f"  Name:            IMG_{image:05d}.JPG"
+        elif kind == 2:
+            yield "  Dimensions:      4000 x 3000"
+        else:
+            yield f"  Features:        {8192 - image % 500}"
+
+
+def glomap_lines(count):
+    """Yield GloMAP-style output lines."""
+    for i in range(count):
+        yield _glog_prefix(i, 'global_positioning.cc:188') + \
+            f"Iteration {i + 1}, cost {1.0 / (i + 1):.6e}, {i % 9000 + 1000} residuals"
+
+
+def train_lines(count):
+    """Yield 3DGUT training output lines (parsed by core.training_monitor)."""
+    for i in range(count):
+        iteration = (i + 1) * 10
+        loss = 0.2 / (1.0 + i / 200.0)
+        psnr = 18.0 + 12.0 * (1.0 - 1.0 / (1.0 + i / 500.0))
+        yield f"[iter {iteration}] loss={loss:.5f} psnr={psnr:.3f} gaussians={100000 + i * 37}"
+
+
+def main(argv=None):
+    """
+    Run the fake tool.
+
+    Args:
+        argv: Arguments (sys.argv[1:] if None)
+
+    Returns:
+        Exit code
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    tool = argv[0] if argv else 'colmap'
+    command = argv[1] if len(argv) > 1 else ''
+    count = int(os.environ.get('BENCH_LINES', 10000))
+    rate = float(os.environ.get('BENCH_RATE', 0))
+    flush = rate > 0 or os.environ.get('BENCH_FLUSH', '1') != '0'
+
+    if tool == 'glomap':
+        lines = glomap_lines(count)
+    elif tool == 'train':
+        lines = train_lines(count)
+    else:
+        lines = colmap_lines(command, count)
+
+    out = sys.stdout
+    started = time.perf_counter()
+    for i, line in enumerate(lines):
+        out.write(line + '\n')
+        if flush:
+            out.flush()
+        if rate:
+            # Pace the output: sleep until the next line is due
+            delay = started + (i + 1) / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    out.flush()
+    return int(os.environ.get('BENCH_EXIT', 0))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,419 @@
+"""
+Benchmark runner.
+
+Times PLY tools on synthetic scenes and tool-output streaming through the
+wrappers, the job workers and the logger, and stores the results as JSON
+so runs on different commits can be compared.
+
+Examples:
+    python -m benchmarks.run
+    python -m benchmarks.run --suite ply --sizes 1K,1M,10M --formats binary
+    python -m benchmarks.run --suite commands --lines 200000 --rates 0,20000
+    python -m benchmarks.run --compare old.json new.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from benchmarks.stub_tools import create_stub_tools, tool_environment
+from benchmarks.synthetic import format_count, parse_count, scene_name, write_scene
+
+
+RESULTS_DIR = ROOT / 'benchmarks' / 'results'
+
+
+# PLY benchmarks ---------------------------------------------------------------
+
+def _read_ply(path, work_dir):
+    from core.ply_io import read_ply
+    return len(read_ply(path))
+
+
+def _fix_ply(path, work_dir):
+    from fix_ply import fix_ply_file
+    fix_ply_file(path, work_dir / 'fixed.ply')
+
+
+def _convert_to_splat(path, work_dir):
+    from convert_to_splat import convert_to_gaussian_splat
+    convert_to_gaussian_splat(path, work_dir / 'splat.ply')
+
+
+def _only_without_normals(count, binary, normals):
+    # read_colmap_ply expects x, y, z, red, green, blue only
+    return "reads x, y, z, red, green, blue layouts only" if normals else None
+
+
+# Name -> (function(path, work_dir), pure-Python per-point loop, extra skip check)
+PLY_BENCHMARKS = {
+    'read_ply': (_read_ply, False, None),
+    'fix_ply': (_fix_ply, True, None),
+    'convert_to_splat': (_convert_to_splat, True, _only_without_normals),
+}
+
+
+def run_ply_suite(sizes, formats, normals_options, work_dir, repeat=1, max_python_points=2000000,
+                  benchmarks=None):
+    """
+    Time PLY readers and converters on synthetic scenes.
+
+    Args:
+        sizes: Point counts
+        formats: Iterable of 'binary' / 'ascii'
+        normals_options: Iterable of booleans (with/without normals)
+        work_dir: Folder for scenes (reused between runs) and outputs
+        repeat: Runs per measurement (the fastest is reported)
+        max_python_points: Skip pure-Python implementations above this size
+        benchmarks: Names from PLY_BENCHMARKS (all if None)
+
+    Returns:
+        List of result dictionaries
+    """
+    work_dir = Path(work_dir)
+    results = []
+    for count in sizes:
+        for fmt in formats:
+            for normals in normals_options:
+                binary = fmt == 'binary'
+                scene = work_dir / 'scenes' / scene_name(count, binary, normals)
+                if not scene.exists():
+                    print(f"Generating {scene.name}...")
+                    write_scene(scene, count, binary=binary, normals=normals)
+                params = {'points': count, 'format': fmt, 'normals': normals,
+                          'file_mb': round(scene.stat().st_size / 1e6, 2)}
+
+                for name in benchmarks or PLY_BENCHMARKS:
+                    func, pure_python, check = PLY_BENCHMARKS[name]
+                    skip = check(count, binary, normals) if check else None
+                    if not skip and pure_python and count > max_python_points:
+                        skip = f"over --max-python-points ({max_python_points:,})"
+                    label = f"{name} {format_count(count)} {fmt}{' normals' if normals else ''}"
+                    if skip:
+                        print(f"  {label}: skipped ({skip})")
+                        results.append({'suite': 'ply', 'name': name, 'params': params, 'skipped': skip})
+                        continue
+                    output_dir = work_dir / 'output'
+                    output_dir.mkdir(parents=True, exist_ok=True)
+                    try:
+                        times = _time(lambda: func(scene, output_dir), repeat, quiet=True)
+                    except Exception as e:
+                        print(f"  {label}: FAILED ({e})")
+                        results.append({'suite': 'ply', 'name': name, 'params': params, 'error': str(e)})
+                        continue
+                    result = _result('ply', name, params, times, count, 'points/s')
+                    print(f"  {label}: {result['seconds']:.3f}s ({result['throughput']:,.0f} points/s)")
+                    results.append(result)
+    return results
+
+
+# Command output benchmarks ----------------------------------------------------
+
+@contextlib.contextmanager
+def _environment(variables):
+    """Temporarily set environment variables (inherited by child processes)."""
+    previous = {key: os.environ.get(key) for key in variables}
+    os.environ.update(variables)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+class _LineCounter:
+    """Progress callback counting the lines it receives."""
+
+    def __init__(self):
+        self.lines = 0
+
+    def __call__(self, message):
+        self.lines += 1
+
+
+def _colmap_wrapper(tools):
+    from core.colmap_wrapper import COLMAPWrapper
+    wrapper = COLMAPWrapper()
+    wrapper.colmap_exe = str(tools['colmap'])
+    return wrapper
+
+
+def _bench_colmap(tools, work_dir):
+    counter = _LineCounter()
+    wrapper = _colmap_wrapper(tools)
+    ok, msg = wrapper._run_command([wrapper.colmap_exe, 'feature_extractor'], counter)
+    return ok, msg, counter.lines
+
+
+def _bench_glomap(tools, work_dir):
+    from core.glomap_wrapper import GloMAPWrapper
+    counter = _LineCounter()
+    wrapper = GloMAPWrapper()
+    wrapper.glomap_exe = str(tools['glomap'])
+    ok, msg = wrapper._run_command([wrapper.glomap_exe, 'mapper'], counter)
+    return ok, msg, counter.lines
+
+
+def _bench_dgut(tools, work_dir):
+    from core.dgut_wrapper import DGUTWrapper
+    counter = _LineCounter()
+    wrapper = DGUTWrapper(dgut_path=tools['train'].parent)
+    ok, msg = wrapper._run_command([sys.executable, str(tools['train'])], counter)
+    return ok, msg, counter.lines
+
+
+def _run_worker(tools, subscriber=None):
+    """Run the COLMAP stub as a GUI job and drain the worker queue like the GUI does."""
+    from gui.workers import StepWorker
+    wrapper = _colmap_wrapper(tools)
+    worker = StepWorker(lambda callback: wrapper._run_command([wrapper.colmap_exe, 'feature_extractor'], callback))
+    worker.start()
+    events = 0
+    while True:
+        message = worker.get_message(timeout=0.05)
+        if message is None:
+            continue
+        kind, data = message
+        if kind == 'events':
+            events += len(data)
+            if subscriber:
+                subscriber(data)
+        else:
+            success, msg = (data[0], data[1]) if kind == 'finished' else (False, data)
+            return success, msg, events
+
+
+def _bench_worker(tools, work_dir):
+    return _run_worker(tools)
+
+
+def _bench_gui_log(tools, work_dir):
+    from core.events import LogSubscriber, format_event
+    from utils.logger import PhotogrammetryLogger
+    logger = PhotogrammetryLogger(log_dir=work_dir / 'logs', console=False)
+    log_subscriber = LogSubscriber(logger)
+    shown = []
+
+    def gui(events):
+        # What MainWindow.handle_events does, minus the Tk text widget
+        shown.append("\n".join(format_event(event) for event in events))
+        log_subscriber(events)
+
+    try:
+        return _run_worker(tools, gui)
+    finally:
+        logger.close()
+
+
+# Name -> (function(tools, work_dir), tool whose output is streamed)
+COMMAND_BENCHMARKS = {
+    'colmap_run_command': (_bench_colmap, 'colmap'),
+    'glomap_run_command': (_bench_glomap, 'glomap'),
+    'dgut_run_command': (_bench_dgut, 'train'),
+    'worker_events': (_bench_worker, 'colmap'),
+    'gui_log': (_bench_gui_log, 'colmap'),
+}
+
+
+def run_command_suite(lines, rates, work_dir, repeat=1, benchmarks=None):
+    """
+    Time streaming of tool output through the wrappers, workers and logger.
+
+    Args:
+        lines: Output lines per run
+        rates: Tool output rates in lines/s (0 for unthrottled)
+        work_dir: Folder for the stub tools and logs
+        repeat: Runs per measurement (the fastest is reported)
+        benchmarks: Names from COMMAND_BENCHMARKS (all if None)
+
+    Returns:
+        List of result dictionaries
+    """
+    work_dir = Path(work_dir)
+    tools = create_stub_tools(work_dir / 'tools')
+    results = []
+    for rate in rates:
+        with _environment(tool_environment(lines, rate)):
+            for name in benchmarks or COMMAND_BENCHMARKS:
+                func, tool = COMMAND_BENCHMARKS[name]
+                outcome = []
+                times = _time(lambda: outcome.append(func(tools, work_dir)), repeat)
+                ok, msg, received = outcome[-1]
+                params = {'lines': lines, 'rate': rate, 'tool': tool}
+                result = _result('commands', name, params, times, lines, 'lines/s')
+                result['received'] = received
+                if not ok:
+                    result['error'] = msg
+                label = f"{name} {lines:,} lines @ {rate or 'max'} lines/s"
+                print(f"  {label}: {result['seconds']:.3f}s ({result['throughput']:,.0f} lines/s)"
+                      + ("" if ok else f" FAILED: {msg}"))
+                results.append(result)
+    return results
+
+
+# Results --------------------------------------------------------------------
+
+def _time(func, repeat, quiet=False):
+    """Run func repeat times and return the wall times."""
+    times = []
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        if quiet:
+            with contextlib.redirect_stdout(io.StringIO()):
+                func()
+        else:
+            func()
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def _result(suite, name, params, times, items, unit):
+    """Result dictionary of a measurement (fastest run)."""
+    seconds = min(times)
+    return {
+        'suite': suite,
+        'name': name,
+        'params': params,
+        'seconds': seconds,
+        'times': times,
+        'throughput': items / seconds if seconds else 0.0,
+        'unit': unit
+    }
+
+
+def environment_info():
+    """Commit, interpreter and machine the benchmarks ran on."""
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True,
+                                  timeout=30).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ''
+
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def _key(result):
+    """Identity of a measurement across result files."""
+    return result['suite'], result['name'], json.dumps(result['params'], sort_keys=True)
+
+
+def compare(baseline_path, current_path):
+    """
+    Print the speed change of every measurement found in both files.
+
+    Args:
+        baseline_path: Earlier results JSON
+        current_path: Later results JSON
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(current_path, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+
+    before = {_key(result): result for result in baseline['results'] if 'seconds' in result}
+    print(f"Baseline: {baseline['environment']['commit'][:10]}  Current: {current['environment']['commit'][:10]}")
+    print(f"{'benchmark':<60} {'before':>10} {'after':>10} {'speedup':>8}")
+    for result in current['results']:
+        old = before.get(_key(result))
+        if 'seconds' not in result or old is None:
+            continue
+        params = ' '.join(f"{key}={value}" for key, value in result['params'].items() if key != 'file_mb')
+        label = f"{result['suite']}/{result['name']} {params}"
+        print(f"{label:<60} {old['seconds']:>9.3f}s {result['seconds']:>9.3f}s "
+              f"{old['seconds'] / result['seconds']:>7.2f}x")
+
+
+def main():
+    """Command line interface."""
+    parser = argparse.ArgumentParser(description='Run performance benchmarks')
+    parser.add_argument('--suite', choices=['all', 'ply', 'commands'], default='all')
+    parser.add_argument('--sizes', default='1K,100K,1M',
+                        help='Comma-separated point counts, e.g. 1K,1M,50M')
+    parser.add_argument('--formats', default='binary,ascii', help='binary and/or ascii')
+    parser.add_argument('--normals', choices=['both', 'yes', 'no'], default='both')
+    parser.add_argument('--ply-benchmarks', default=None,
+                        help=f"Comma-separated subset of {', '.join(PLY_BENCHMARKS)}")
+    parser.add_argument('--max-python-points', type=parse_count, default=2000000,
+                        help='Skip pure-Python PLY tools above this point count')
+    parser.add_argument('--lines', type=parse_count, default=100000,
+                        help='Output lines of the stub tools')
+    parser.add_argument('--rates', default='0',
+                        help='Comma-separated stub output rates in lines/s (0 = unthrottled)')
+    parser.add_argument('--command-benchmarks', default=None,
+                        help=f"Comma-separated subset of {', '.join(COMMAND_BENCHMARKS)}")
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per measurement (fastest is kept)')
+    parser.add_argument('--work-dir', help='Folder for scenes and stub tools (temporary if omitted)')
+    parser.add_argument('--output', '-o', help='Results JSON (default benchmarks/results/<commit>_<time>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help='Compare two results files instead of running')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    with contextlib.ExitStack() as stack:
+        work_dir = Path(args.work_dir) if args.work_dir else \
+            Path(stack.enter_context(tempfile.TemporaryDirectory(prefix='bench_')))
+        results = []
+        if args.suite in ('all', 'ply'):
+            print("PLY benchmarks")
+            results += run_ply_suite(
+                sizes=[parse_count(size) for size in args.sizes.split(',')],
+                formats=[fmt.strip() for fmt in args.formats.split(',')],
+                normals_options={'both': (False, True), 'yes': (True,), 'no': (False,)}[args.normals],
+                work_dir=work_dir,
+                repeat=args.repeat,
+                max_python_points=args.max_python_points,
+                benchmarks=args.ply_benchmarks.split(',') if args.ply_benchmarks else None
+            )
+        if args.suite in ('all', 'commands'):
+            print("Command output benchmarks")
+            results += run_command_suite(
+                lines=args.lines,
+                rates=[float(rate) for rate in args.rates.split(',')],
+                work_dir=work_dir,
+                repeat=args.repeat,
+                benchmarks=args.command_benchmarks.split(',') if args.command_benchmarks else None
+            )
+
+    environment = environment_info()
+    if args.output:
+        output = Path(args.output)
+    else:
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output = RESULTS_DIR / f"{environment['commit'][:10] or 'nocommit'}_{stamp}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment, 'results': results}, f, indent=2)
+    print(f"Results: {output}")
+
+
+if __name__ == '__main__':
+    main()
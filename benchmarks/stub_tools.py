@@ -0,0 +1,74 @@
+"""Stub colmap, glomap and train.py executables backed by fake_tool.py."""
+import os
+import stat
+import sys
+from pathlib import Path
+
+
+FAKE_TOOL = Path(__file__).resolve().parent / 'fake_tool.py'
+
+
+def _write_launcher(path, tool):
+    """Write an executable script running fake_tool.py as the given tool."""
+    if os.name == 'nt':
+        path = path.with_suffix('.bat')
+        path.write_text(f'@"{sys.executable}" "{FAKE_TOOL}" {tool} %*\n', encoding='utf-8')
+        return path
+    path.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_TOOL}" {tool} "$@"\n', encoding='utf-8')
+    path.chmod(path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+def create_stub_tools(directory):
+    """
+    Create stub tools in a directory.
+
+    'colmap' and 'glomap' are executables (batch files on Windows) usable as
+    COLMAPWrapper.colmap_exe and GloMAPWrapper.glomap_exe; 'train.py' is a
+    3DGUT-like training script run with the Python interpreter, as
+    DGUTWrapper does. Output volume and rate are set with the BENCH_*
+    environment variables described in fake_tool.py.
+
+    Args:
+        directory: Output directory (acts as a 3DGUT installation folder)
+
+    Returns:
+        Dictionary mapping 'colmap', 'glomap' and 'train' to the paths
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    train_script = directory / 'train.py'
+    train_script.write_text(
+        "import sys\n"
+        f"sys.path.insert(0, {str(FAKE_TOOL.parent)!r})\n"
+        "from fake_tool import main\n"
+        "sys.exit(main(['train'] + sys.argv[1:]))\n",
+        encoding='utf-8'
+    )
+    return {
+        'colmap': _write_launcher(directory / 'colmap', 'colmap'),
+        'glomap': _write_launcher(directory / 'glomap', 'glomap'),
+        'train': train_script
+    }
+
+
+def tool_environment(lines, rate=0, flush=True, exit_code=0):
+    """
+    Environment variables controlling the stub tools.
+
+    Args:
+        lines: Number of output lines
+        rate: Lines per second (0 for unthrottled)
+        flush: Flush every line
+        exit_code: Exit code of the tool
+
+    Returns:
+        Dictionary of BENCH_* variables
+    """
+    return {
+        'BENCH_LINES': str(int(lines)),
+        'BENCH_RATE': str(rate),
+        'BENCH_FLUSH': '1' if flush else '0',
+        'BENCH_EXIT': str(int(exit_code))
+    }
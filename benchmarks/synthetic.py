@@ -0,0 +1,147 @@
+"""Synthetic point cloud scenes for benchmarks."""
+import io
+from pathlib import Path
+
+import numpy as np
+
+from core.ply_io import PlyWriter, write_ply_header
+
+
+def scene_dtype(normals=True):
+    """
+    Vertex layout of a synthetic scene (the one COLMAP writes for fused.ply).
+
+    Args:
+        normals: Include nx, ny, nz
+
+    Returns:
+        numpy.dtype
+    """
+    fields = [('x', '<f4'), ('y', '<f4'), ('z', '<f4')]
+    if normals:
+        fields += [('nx', '<f4'), ('ny', '<f4'), ('nz', '<f4')]
+    return np.dtype(fields + [('red', 'u1'), ('green', 'u1'), ('blue', 'u1')])
+
+
+def scene_chunk(rng, count, normals=True):
+    """
+    Generate points on a noisy sphere with a ground plane.
+
+    Args:
+        rng: numpy.random.Generator
+        count: Number of points
+        normals: Include normals
+
+    Returns:
+        Structured array (scene_dtype)
+    """
+    vertices = np.empty(count, dtype=scene_dtype(normals))
+    on_sphere = rng.random(count) < 0.6
+
+    direction = rng.normal(size=(count, 3))
+    direction /= np.maximum(np.linalg.norm(direction, axis=1, keepdims=True), 1e-12)
+    xyz = direction * (1.0 + rng.normal(scale=0.01, size=(count, 1)))
+    normal = direction.copy()
+
+    ground = ~on_sphere
+    xyz[ground, 0] = rng.uniform(-3.0, 3.0, ground.sum())
+    xyz[ground, 1] = rng.uniform(-3.0, 3.0, ground.sum())
+    xyz[ground, 2] = -1.0 + rng.normal(scale=0.005, size=ground.sum())
+    normal[ground] = (0.0, 0.0, 1.0)
+
+    for i, name in enumerate('xyz'):
+        vertices[name] = xyz[:, i]
+    if normals:
+        for i, name in enumerate(('nx', 'ny', 'nz')):
+            vertices[name] = normal[:, i]
+    colors = np.clip(64 + 128 * (xyz + 1.0) / 2.0 + rng.normal(scale=8.0, size=(count, 3)), 0, 255)
+    for i, name in enumerate(('red', 'green', 'blue')):
+        vertices[name] = colors[:, i]
+    return vertices
+
+
+def write_scene(path, count, binary=True, normals=True, seed=0, chunk_size=1 << 21):
+    """
+    Write a synthetic scene PLY, generated chunk by chunk.
+
+    Args:
+        path: Output PLY path
+        count: Number of points (up to tens of millions)
+        binary: Binary little-endian (True) or ASCII (False)
+        normals: Include normals
+        seed: Random seed (the same seed gives the same file)
+        chunk_size: Points generated at once
+
+    Returns:
+        Path to the file
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    dtype = scene_dtype(normals)
+    comments = [f"synthetic scene, {count} points, seed {seed}"]
+
+    if binary:
+        with PlyWriter(path, dtype, comments) as writer:
+            for start in range(0, count, chunk_size):
+                writer.write(scene_chunk(rng, min(chunk_size, count - start), normals))
+        return path
+
+    formats = ['%.6f'] * (6 if normals else 3) + ['%d'] * 3
+    with open(path, 'wb') as f:
+        # Same header as the binary writer, apart from the format line
+        header = _header_bytes(dtype, count, comments).replace(
+            b'format binary_little_endian 1.0', b'format ascii 1.0')
+        f.write(header)
+        for start in range(0, count, chunk_size):
+            chunk = scene_chunk(rng, min(chunk_size, count - start), normals)
+            columns = np.column_stack([chunk[name].astype(np.float64) for name in dtype.names])
+            np.savetxt(f, columns, fmt=formats)
+    return path
+
+
+def _header_bytes(dtype, count, comments):
+    """Binary PLY header of a dtype as bytes."""
+    buffer = io.BytesIO()
+    write_ply_header(buffer, dtype, count, comments)
+    return buffer.getvalue()
+
+
+def scene_name(count, binary=True, normals=True):
+    """
+    File name of a synthetic scene, e.g. 'scene_1M_binary_normals.ply'.
+
+    Args:
+        count: Number of points
+        binary: Binary or ASCII
+        normals: With normals
+
+    Returns:
+        String
+    """
+    return f"scene_{format_count(count)}_{'binary' if binary else 'ascii'}" \
+        f"{'_normals' if normals else ''}.ply"
+
+
+def format_count(count):
+    """Short point count, e.g. 1K, 2.5M."""
+    for factor, suffix in ((1000000, 'M'), (1000, 'K')):
+        if count >= factor:
+            value = count / factor
+            return f"{value:g}{suffix}"
+    return str(count)
+
+
+def parse_count(text):
+    """
+    Parse a point count such as '1000', '1K', '2.5M' or '50M'.
+
+    Args:
+        text: Count string
+
+    Returns:
+        int
+    """
+    text = text.strip().upper()
+    factor = {'K': 1000, 'M': 1000000}.get(text[-1:], 1)
+    return int(float(text[:-1] if factor > 1 else text) * factor)
@@ -7,6 +7,8 @@ import sys
 from pathlib import Path
 import numpy as np
 
+from core.morton import MortonIndex, morton_order
+
 
 def read_colmap_ply(file_path):
     """Read COLMAP PLY file (x,y,z,r,g,b)."""
@@ -125,8 +127,8 @@ end_header
             f.write(data)
 
 
-def convert_to_gaussian_splat(input_path, output_path=None):
-    """Convert COLMAP PLY to Gaussian Splat PLY."""
+def convert_to_gaussian_splat(input_path, output_path=None, morton=False):
+    """Convert COLMAP PLY to Gaussian Splat PLY (optionally in Morton order)."""
     input_path = Path(input_path)
     
     if output_path is None:
@@ -138,9 +140,18 @@ def convert_to_gaussian_splat(input_path, output_path=None):
     vertices = read_colmap_ply(input_path)
     print(f"  Points: {len(vertices):,}")
     
+    if morton:
+        print("Sorting points in Morton (Z-curve) order")
+        vertices = vertices[morton_order(vertices[:, :3])]
+    
     print(f"Writing Gaussian Splat PLY: {output_path}")
     write_gaussian_splat_ply(output_path, vertices)
     
+    if morton:
+        index = MortonIndex.build(output_path)
+        index.save(output_path)
+        print(f"  Block index: {MortonIndex.sidecar_path(output_path).name} ({len(index.blocks):,} blocks)")
+    
     input_size = input_path.stat().st_size / 1024 / 1024
     output_size = output_path.stat().st_size / 1024 / 1024
     print(f"  Input size: {input_size:.2f} MB")
@@ -165,11 +176,14 @@ Examples:
   python convert_to_splat.py sparse.ply
   python convert_to_splat.py fused.ply --output scene_splat.ply
   python convert_to_splat.py *.ply
+  python convert_to_splat.py fused.ply --morton
         '''
     )
     
     parser.add_argument('input', nargs='+', help='Input PLY file(s)')
     parser.add_argument('--output', '-o', help='Output file path (for single file)')
+    parser.add_argument('--morton', action='store_true',
+                        help='Sort splats in Morton order and write a block index sidecar')
     
     args = parser.parse_args()
     
@@ -183,7 +197,7 @@ Examples:
     
     for input_file in args.input:
         try:
-            convert_to_gaussian_splat(input_file, args.output)
+            convert_to_gaussian_splat(input_file, args.output, morton=args.morton)
             print()
         except Exception as e:
             print(f"✗ Error converting {input_file}: {e}\n")
@@ -0,0 +1,143 @@
+"""Discovery, resume and garbage collection of 3DGUT training checkpoints."""
+import re
+from pathlib import Path
+
+from core.manifest import file_fingerprint
+
+
+_CHECKPOINT = re.compile(r'^ckpt_(\d+|last)\.pt$')
+
+
+def find_checkpoints(model_path):
+    """
+    Find the checkpoints written by 3DGUT training.
+
+    Args:
+        model_path: Training output folder (searched recursively)
+
+    Returns:
+        List of dictionaries with 'path', 'iteration' (None for
+        ckpt_last.pt), 'size' and 'mtime_ns', oldest first
+    """
+    checkpoints = []
+    for path in Path(model_path).rglob('ckpt_*.pt'):
+        match = _CHECKPOINT.match(path.name)
+        if not match:
+            continue
+        record = file_fingerprint(path)
+        record['path'] = path
+        record['iteration'] = None if match.group(1) == 'last' else int(match.group(1))
+        checkpoints.append(record)
+    checkpoints.sort(key=lambda record: record['mtime_ns'])
+    return checkpoints
+
+
+class CheckpointTracker:
+    """
+    Tracks 3DGUT checkpoints of a project in its manifest.
+
+    The 'dgut_training' section records the state of the last run
+    ('running' until it completes) and the known checkpoints, so a run
+    that died part-way is resumed from its newest checkpoint the next time
+    the project is trained with the same settings.
+    """
+
+    SECTION = 'dgut_training'
+
+    def __init__(self, manifest, model_path, disk_budget_gb=None):
+        """
+        Initialize tracker.
+
+        Args:
+            manifest: ProjectManifest of the project
+            model_path: 3DGUT output folder
+            disk_budget_gb: Maximum total checkpoint size (None keeps all)
+        """
+        self.manifest = manifest
+        self.model_path = Path(model_path)
+        self.disk_budget_gb = disk_budget_gb
+
+    @property
+    def state(self):
+        """Manifest section of this tracker."""
+        return self.manifest.section(self.SECTION)
+
+    def scan(self):
+        """
+        Record the checkpoints currently on disk in the manifest.
+
+        Returns:
+            List of checkpoints as returned by find_checkpoints
+        """
+        checkpoints = find_checkpoints(self.model_path)
+        self.state['checkpoints'] = [
+            {'path': record['path'].relative_to(self.model_path).as_posix(),
+             'iteration': record['iteration'], 'size': record['size'], 'mtime_ns': record['mtime_ns']}
+            for record in checkpoints
+        ]
+        self.manifest.save()
+        return checkpoints
+
+    def resume_checkpoint(self, settings=None):
+        """
+        Checkpoint to resume from, if the last run was interrupted.
+
+        Args:
+            settings: Settings of the new run; a run with different
+                settings is not resumed
+
+        Returns:
+            Path of the newest checkpoint, or None
+        """
+        if self.state.get('status') != 'running':
+            return None
+        if settings is not None and self.state.get('settings') != settings:
+            return None
+        checkpoints = self.scan()
+        return checkpoints[-1]['path'] if checkpoints else None
+
+    def mark_started(self, settings):
+        """Record that a training run started with the given settings."""
+        self.state['status'] = 'running'
+        self.state['settings'] = settings
+        self.manifest.save()
+
+    def mark_finished(self, success, message=''):
+        """Record the end of a training run."""
+        self.state['status'] = 'completed' if success else 'failed'
+        self.state['message'] = message
+        self.scan()
+
+    def collect_garbage(self, keep_latest=1):
+        """
+        Delete the oldest checkpoints until they fit in the disk budget.
+
+        The newest keep_latest checkpoints are never deleted.
+
+        Args:
+            keep_latest: Checkpoints always kept
+
+        Returns:
+            Tuple of (deleted count, freed bytes)
+        """
+        if self.disk_budget_gb is None:
+            return 0, 0
+        checkpoints = find_checkpoints(self.model_path)
+        budget = self.disk_budget_gb * 1024 ** 3
+        total = sum(record['size'] for record in checkpoints)
+
+        deleted = freed = 0
+        for record in checkpoints[:max(0, len(checkpoints) - keep_latest)]:
+            if total <= budget:
+                break
+            try:
+                record['path'].unlink()
+            except OSError:
+                continue
+            total -= record['size']
+            freed += record['size']
+            deleted += 1
+
+        if deleted:
+            self.scan()
+        return deleted, freed
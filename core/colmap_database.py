@@ -0,0 +1,339 @@
+"""Read access to COLMAP's SQLite database (database.db)."""
+import sqlite3
+
+
+# COLMAP encodes an image pair as image_id1 * MAX_IMAGE_ID + image_id2
+MAX_IMAGE_ID = 2 ** 31 - 1
+
+
+def image_ids_to_pair_id(image_id1, image_id2):
+    """
+    Encode two image IDs as a COLMAP pair ID.
+
+    Args:
+        image_id1: First image ID
+        image_id2: Second image ID
+
+    Returns:
+        Pair ID (order independent)
+    """
+    if image_id1 > image_id2:
+        image_id1, image_id2 = image_id2, image_id1
+    return image_id1 * MAX_IMAGE_ID + image_id2
+
+
+def pair_id_to_image_ids(pair_id):
+    """
+    Decode a COLMAP pair ID.
+
+    Args:
+        pair_id: Pair ID from the matches/two_view_geometries tables
+
+    Returns:
+        Tuple of (image_id1, image_id2) with image_id1 < image_id2
+    """
+    image_id2 = pair_id % MAX_IMAGE_ID
+    image_id1 = (pair_id - image_id2) // MAX_IMAGE_ID
+    return int(image_id1), int(image_id2)
+
+
+def connect(database_path):
+    """
+    Open a COLMAP database.
+
+    Args:
+        database_path: Path to COLMAP database file
+
+    Returns:
+        sqlite3.Connection
+    """
+    return sqlite3.connect(str(database_path))
+
+
+def read_image_names(database_path):
+    """
+    Read image IDs and names from a COLMAP database.
+
+    Args:
+        database_path: Path to COLMAP database file
+
+    Returns:
+        List of (image_id, name) tuples ordered by name (empty if the
+        database has no images table yet)
+    """
+    connection = connect(database_path)
+    try:
+        if not _table_columns(connection, 'images'):
+            return []
+        return connection.execute(
+            "SELECT image_id, name FROM images ORDER BY name"
+        ).fetchall()
+    finally:
+        connection.close()
+
+
+def read_inlier_counts(database_path):
+    """
+    Read the number of geometrically verified matches per image pair.
+
+    Args:
+        database_path: Path to COLMAP database file
+
+    Returns:
+        Dictionary mapping (image_id1, image_id2) to inlier count
+    """
+    connection = connect(database_path)
+    try:
+        rows = connection.execute(
+            "SELECT pair_id, rows FROM two_view_geometries WHERE rows > 0"
+        ).fetchall()
+    finally:
+        connection.close()
+    return {pair_id_to_image_ids(pair_id): count for pair_id, count in rows}
+
+
+# Tables keyed by image_id whose rows are bulk-copied when merging
+_IMAGE_TABLES = ('keypoints', 'descriptors', 'pose_priors')
+
+# Rig/frame tables written by COLMAP >= 3.12 (one trivial rig per camera and
+# one frame per image unless rigs are configured)
+_RIG_TABLES = ('rigs', 'rig_sensors', 'frames', 'frame_data')
+
+# COLMAP's SensorType value of cameras (sensor_id = camera_id, data_id = image_id)
+_SENSOR_CAMERA = 0
+
+
+def _table_columns(connection, table, schema='main'):
+    """Return the column names of a table, or an empty list if it does not exist."""
+    return [row[1] for row in connection.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def _merge_rigs(connection, camera_map, image_map, state):
+    """
+    Copy the attached shard's rigs and frames with remapped IDs.
+
+    Camera sensor IDs follow the camera renumbering and camera data IDs
+    the image renumbering. Rigs identical after remapping (e.g. the
+    default rig of a camera merged across shards) are stored once.
+
+    Args:
+        connection: Output database with the shard attached as 'shard'
+        camera_map: Shard camera_id -> merged camera_id
+        image_map: Shard image_id -> merged image_id
+        state: Dictionary carrying 'rigs' (key -> rig_id), 'next_rig_id'
+            and 'next_frame_id' across shards
+    """
+    if not all(_table_columns(connection, table, 'shard') and _table_columns(connection, table)
+               for table in _RIG_TABLES):
+        return
+
+    def sensor(sensor_id, sensor_type):
+        return camera_map.get(sensor_id, sensor_id) if sensor_type == _SENSOR_CAMERA else sensor_id
+
+    sensors = {}
+    for rig_id, sensor_id, sensor_type, pose in connection.execute(
+            "SELECT rig_id, sensor_id, sensor_type, sensor_from_rig FROM shard.rig_sensors"):
+        sensors.setdefault(rig_id, []).append((sensor(sensor_id, sensor_type), sensor_type, pose))
+
+    rig_map = {}
+    for rig_id, ref_sensor_id, ref_sensor_type in connection.execute(
+            "SELECT rig_id, ref_sensor_id, ref_sensor_type FROM shard.rigs").fetchall():
+        ref = (sensor(ref_sensor_id, ref_sensor_type), ref_sensor_type)
+        rig_sensors = sorted(sensors.get(rig_id, []), key=lambda row: row[:2])
+        key = (ref, tuple(rig_sensors))
+        if key not in state['rigs']:
+            new_id = state['next_rig_id']
+            state['next_rig_id'] += 1
+            state['rigs'][key] = new_id
+            connection.execute("INSERT INTO main.rigs (rig_id, ref_sensor_id, ref_sensor_type) VALUES (?, ?, ?)",
+                               (new_id,) + ref)
+            connection.executemany(
+                "INSERT INTO main.rig_sensors (rig_id, sensor_id, sensor_type, sensor_from_rig) "
+                "VALUES (?, ?, ?, ?)", [(new_id,) + row for row in rig_sensors])
+        rig_map[rig_id] = state['rigs'][key]
+
+    frame_map = {}
+    for frame_id, rig_id in connection.execute(
+            "SELECT frame_id, rig_id FROM shard.frames ORDER BY frame_id").fetchall():
+        frame_map[frame_id] = state['next_frame_id']
+        state['next_frame_id'] += 1
+        connection.execute("INSERT INTO main.frames (frame_id, rig_id) VALUES (?, ?)",
+                           (frame_map[frame_id], rig_map[rig_id]))
+
+    rows = []
+    for frame_id, data_id, sensor_id, sensor_type in connection.execute(
+            "SELECT frame_id, data_id, sensor_id, sensor_type FROM shard.frame_data"):
+        if sensor_type == _SENSOR_CAMERA:
+            data_id = image_map[data_id]
+        rows.append((frame_map[frame_id], data_id, sensor(sensor_id, sensor_type), sensor_type))
+    connection.executemany(
+        "INSERT INTO main.frame_data (frame_id, data_id, sensor_id, sensor_type) VALUES (?, ?, ?, ?)", rows)
+
+
+def merge_databases(shard_paths, output_path, merge_cameras=True, callback=None):
+    """
+    Merge per-shard feature databases into one COLMAP database.
+
+    Every shard is attached to the output database and copied with SQL
+    (INSERT ... SELECT), so keypoint and descriptor blobs never pass through
+    Python. Image and camera IDs are renumbered consecutively; rigs and
+    frames (COLMAP >= 3.12) are copied with their IDs remapped to match.
+
+    Args:
+        shard_paths: Shard database files, in image order
+        output_path: Merged database to create (must not exist)
+        merge_cameras: Merge cameras with identical model, size and parameters,
+            so single-camera extraction stays single-camera after the merge
+        callback: Progress callback function
+
+    Returns:
+        Tuple of (num_cameras, num_images)
+    """
+    first = connect(shard_paths[0])
+    try:
+        schema = [row[0] for row in first.execute(
+            "SELECT sql FROM sqlite_master WHERE type IN ('table', 'index') "
+            "AND name NOT LIKE 'sqlite_%' AND sql IS NOT NULL ORDER BY type DESC"
+        )]
+    finally:
+        first.close()
+
+    connection = connect(output_path)
+    try:
+        for statement in schema:
+            connection.execute(statement)
+        connection.commit()
+
+        camera_ids = {}
+        next_camera_id = 1
+        next_image_id = 1
+        rig_state = {'rigs': {}, 'next_rig_id': 1, 'next_frame_id': 1}
+
+        for shard_index, shard_path in enumerate(shard_paths):
+            connection.execute("ATTACH DATABASE ? AS shard", (str(shard_path),))
+
+            # Cameras: merge identical intrinsics
+            camera_columns = _table_columns(connection, 'cameras', 'shard')
+            camera_map = {}
+            placeholders = ', '.join('?' * len(camera_columns))
+            shard_cameras = connection.execute(
+                f"SELECT {', '.join(camera_columns)} FROM shard.cameras"
+            ).fetchall()
+            for row in shard_cameras:
+                key = tuple(row[1:]) if merge_cameras else (shard_index, row[0])
+                if key not in camera_ids:
+                    camera_ids[key] = next_camera_id
+                    next_camera_id += 1
+                    connection.execute(
+                        f"INSERT INTO main.cameras ({', '.join(camera_columns)}) VALUES ({placeholders})",
+                        (camera_ids[key],) + tuple(row[1:])
+                    )
+                camera_map[row[0]] = camera_ids[key]
+
+            # Images: renumber and remember the ID mapping in a temp table
+            image_columns = _table_columns(connection, 'images', 'shard')
+            connection.execute("CREATE TEMP TABLE id_map (old_id INTEGER PRIMARY KEY, new_id INTEGER)")
+            rows = connection.execute(
+                f"SELECT {', '.join(image_columns)} FROM shard.images ORDER BY name"
+            ).fetchall()
+            camera_pos = image_columns.index('camera_id')
+            placeholders = ', '.join('?' * len(image_columns))
+            image_map = {}
+            for row in rows:
+                row = list(row)
+                connection.execute("INSERT INTO temp.id_map VALUES (?, ?)", (row[0], next_image_id))
+                image_map[row[0]] = next_image_id
+                row[0] = next_image_id
+                row[camera_pos] = camera_map[row[camera_pos]]
+                connection.execute(
+                    f"INSERT INTO main.images ({', '.join(image_columns)}) VALUES ({placeholders})",
+                    row
+                )
+                next_image_id += 1
+
+            # Per-image blobs: bulk copy with remapped IDs
+            for table in _IMAGE_TABLES:
+                columns = _table_columns(connection, table, 'shard')
+                if not columns or not _table_columns(connection, table):
+                    continue
+                selected = ', '.join('m.new_id' if c == 'image_id' else f's.{c}' for c in columns)
+                connection.execute(
+                    f"INSERT INTO main.{table} ({', '.join(columns)}) "
+                    f"SELECT {selected} FROM shard.{table} s "
+                    f"JOIN temp.id_map m ON s.image_id = m.old_id"
+                )
+
+            _merge_rigs(connection, camera_map, image_map, rig_state)
+
+            connection.execute("DROP TABLE temp.id_map")
+            connection.commit()
+            connection.execute("DETACH DATABASE shard")
+
+            if callback:
+                callback(f"  Merged shard {shard_index + 1}/{len(shard_paths)} ({len(rows):,} images)")
+
+        return next_camera_id - 1, next_image_id - 1
+    finally:
+        connection.close()
+
+
+def extract_sub_database(database_path, output_path, image_ids):
+    """
+    Write a copy of a database restricted to a subset of images.
+
+    Tables keyed by image_id keep only the selected images, pair tables
+    keep only pairs with both images selected, frames (COLMAP >= 3.12)
+    keep only those holding a selected image, and all other tables
+    (cameras, rigs, ...) are copied unchanged. IDs are preserved, so
+    results of separate sub-databases refer to the same images.
+
+    Args:
+        database_path: Source COLMAP database
+        output_path: Database to create (must not exist)
+        image_ids: Image IDs to keep
+    """
+    source = connect(database_path)
+    try:
+        schema = source.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type IN ('table', 'index') "
+            "AND name NOT LIKE 'sqlite_%' AND sql IS NOT NULL ORDER BY type DESC"
+        ).fetchall()
+        tables = [name for name, _ in source.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        )]
+    finally:
+        source.close()
+
+    connection = connect(output_path)
+    try:
+        for _, statement in schema:
+            connection.execute(statement)
+        connection.execute("CREATE TEMP TABLE keep (image_id INTEGER PRIMARY KEY)")
+        connection.executemany("INSERT INTO temp.keep VALUES (?)", ((int(i),) for i in image_ids))
+        connection.commit()
+
+        connection.execute("ATTACH DATABASE ? AS source", (str(database_path),))
+        has_frames = all(_table_columns(connection, table, 'source') for table in ('frames', 'frame_data'))
+        if has_frames:
+            connection.execute(
+                "CREATE TEMP TABLE keep_frames AS SELECT DISTINCT frame_id FROM source.frame_data "
+                f"WHERE sensor_type = {_SENSOR_CAMERA} AND data_id IN (SELECT image_id FROM temp.keep)")
+        for table in tables:
+            columns = _table_columns(connection, table, 'source')
+            if has_frames and table == 'frames':
+                where = "WHERE frame_id IN (SELECT frame_id FROM temp.keep_frames)"
+            elif has_frames and table == 'frame_data':
+                where = ("WHERE frame_id IN (SELECT frame_id FROM temp.keep_frames) "
+                         f"AND (sensor_type != {_SENSOR_CAMERA} OR data_id IN (SELECT image_id FROM temp.keep))")
+            elif 'image_id' in columns:
+                where = "WHERE image_id IN (SELECT image_id FROM temp.keep)"
+            elif 'pair_id' in columns:
+                where = (f"WHERE pair_id % {MAX_IMAGE_ID} IN (SELECT image_id FROM temp.keep) "
+                         f"AND pair_id / {MAX_IMAGE_ID} IN (SELECT image_id FROM temp.keep)")
+            else:
+                where = ""
+            connection.execute(f"INSERT INTO main.{table} SELECT * FROM source.{table} {where}")
+        connection.commit()
+        connection.execute("DETACH DATABASE source")
+    finally:
+        connection.close()
@@ -0,0 +1,197 @@
+"""Readers for COLMAP/GloMAP binary sparse models (cameras/images/points3D.bin)."""
+import struct
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Number of intrinsic parameters per COLMAP camera model ID
+CAMERA_MODEL_NUM_PARAMS = {
+    0: 3,   # SIMPLE_PINHOLE
+    1: 4,   # PINHOLE
+    2: 4,   # SIMPLE_RADIAL
+    3: 5,   # RADIAL
+    4: 8,   # OPENCV
+    5: 8,   # OPENCV_FISHEYE
+    6: 12,  # FULL_OPENCV
+    7: 5,   # FOV
+    8: 4,   # SIMPLE_RADIAL_FISHEYE
+    9: 5,   # RADIAL_FISHEYE
+    10: 12,  # THIN_PRISM_FISHEYE
+    11: 16,  # RAD_TAN_THIN_PRISM_FISHEYE
+}
+
+
+def is_model_dir(path):
+    """
+    Check whether a folder contains a binary sparse model.
+
+    Args:
+        path: Folder to check
+
+    Returns:
+        True if cameras.bin, images.bin and points3D.bin exist
+    """
+    path = Path(path)
+    return all((path / name).exists() for name in ('cameras.bin', 'images.bin', 'points3D.bin'))
+
+
+def read_model_counts(model_path):
+    """
+    Read the number of registered images and 3D points from file headers.
+
+    Args:
+        model_path: Folder with a binary sparse model
+
+    Returns:
+        Tuple of (num_images, num_points)
+    """
+    model_path = Path(model_path)
+    counts = []
+    for name in ('images.bin', 'points3D.bin'):
+        with open(model_path / name, 'rb') as f:
+            counts.append(struct.unpack('<Q', f.read(8))[0])
+    return tuple(counts)
+
+
+def read_cameras_binary(path):
+    """
+    Read cameras.bin.
+
+    Args:
+        path: Path to cameras.bin
+
+    Returns:
+        Dictionary camera_id -> {'model_id', 'width', 'height', 'params'}
+    """
+    cameras = {}
+    with open(path, 'rb') as f:
+        count, = struct.unpack('<Q', f.read(8))
+        for _ in range(count):
+            camera_id, model_id, width, height = struct.unpack('<iiQQ', f.read(24))
+            num_params = CAMERA_MODEL_NUM_PARAMS[model_id]
+            params = struct.unpack('<' + 'd' * num_params, f.read(8 * num_params))
+            cameras[camera_id] = {
+                'model_id': model_id,
+                'width': width,
+                'height': height,
+                'params': params
+            }
+    return cameras
+
+
+def read_images_binary(path, with_points2d=False):
+    """
+    Read images.bin.
+
+    Args:
+        path: Path to images.bin
+        with_points2d: Also return 2D keypoint coordinates
+
+    Returns:
+        Dictionary image_id -> {'name', 'camera_id', 'qvec', 'tvec',
+        'point3D_ids'} (and 'xys' if requested). point3D_ids is an int64
+        array with -1 for keypoints without a 3D point.
+    """
+    point_dtype = np.dtype([('xy', '<f8', (2,)), ('point3D_id', '<i8')])
+    images = {}
+    with open(path, 'rb') as f:
+        count, = struct.unpack('<Q', f.read(8))
+        for _ in range(count):
+            image_id, = struct.unpack('<i', f.read(4))
+            qvec = struct.unpack('<dddd', f.read(32))
+            tvec = struct.unpack('<ddd', f.read(24))
+            camera_id, = struct.unpack('<i', f.read(4))
+            name = bytearray()
+            while True:
+                char = f.read(1)
+                if char in (b'\x00', b''):
+                    break
+                name += char
+            num_points2d, = struct.unpack('<Q', f.read(8))
+            points = np.frombuffer(f.read(num_points2d * point_dtype.itemsize), dtype=point_dtype)
+
+            image = {
+                'name': name.decode('utf-8'),
+                'camera_id': camera_id,
+                'qvec': np.asarray(qvec),
+                'tvec': np.asarray(tvec),
+                'point3D_ids': points['point3D_id'].copy()
+            }
+            if with_points2d:
+                image['xys'] = points['xy'].copy()
+            images[image_id] = image
+    return images
+
+
+def read_points3d_binary(path):
+    """
+    Read points3D.bin.
+
+    Args:
+        path: Path to points3D.bin
+
+    Returns:
+        Dictionary with 'ids' (N int64), 'xyz' (N x 3 float64), 'rgb'
+        (N x 3 uint8), 'error' (N float64) and 'track_lengths' (N int64)
+    """
+    data = Path(path).read_bytes()
+    count, = struct.unpack_from('<Q', data, 0)
+    ids = np.empty(count, dtype=np.int64)
+    xyz = np.empty((count, 3), dtype=np.float64)
+    rgb = np.empty((count, 3), dtype=np.uint8)
+    error = np.empty(count, dtype=np.float64)
+    track_lengths = np.empty(count, dtype=np.int64)
+
+    header = struct.Struct('<QdddBBBdQ')
+    offset = 8
+    for i in range(count):
+        values = header.unpack_from(data, offset)
+        ids[i] = values[0]
+        xyz[i] = values[1:4]
+        rgb[i] = values[4:7]
+        error[i] = values[7]
+        track_lengths[i] = values[8]
+        offset += header.size + 8 * values[8]
+
+    return {
+        'ids': ids,
+        'xyz': xyz,
+        'rgb': rgb,
+        'error': error,
+        'track_lengths': track_lengths
+    }
+
+
+def qvec_to_rotmat(qvec):
+    """
+    Convert a COLMAP quaternion (w, x, y, z) to a rotation matrix.
+
+    Args:
+        qvec: Quaternion
+
+    Returns:
+        3 x 3 rotation matrix (world to camera)
+    """
+    w, x, y, z = qvec
+    return np.array([
+        [1 - 2 * y * y - 2 * z * z, 2 * x * y - 2 * w * z, 2 * z * x + 2 * w * y],
+        [2 * x * y + 2 * w * z, 1 - 2 * x * x - 2 * z * z, 2 * y * z - 2 * w * x],
+        [2 * z * x - 2 * w * y, 2 * y * z + 2 * w * x, 1 - 2 * x * x - 2 * y * y]
+    ])
+
+
+def camera_center(image):
+    """
+    Camera center of an image in world coordinates.
+
+    Args:
+        image: Entry from read_images_binary
+
+    Returns:
+        Array of 3 coordinates
+    """
+    return -qvec_to_rotmat(image['qvec']).T @ image['tvec']
@@ -3,6 +3,8 @@ import os
 import subprocess
 from pathlib import Path
 
+from core.profiles import build_option_args
+
 
 class COLMAPWrapper:
     """Wrapper class for COLMAP commands."""
@@ -31,7 +33,8 @@ class COLMAPWrapper:
     
     def feature_extraction(self, database_path, image_path, use_gpu=True, 
                           max_features=8192, camera_model=None, camera_params=None, 
-                          single_camera=False, callback=None):
+                          single_camera=False, image_list_path=None, command_prefix=None,
+                          options=None, callback=None):
         """
         Extract features from images.
         
@@ -43,12 +46,15 @@ class COLMAPWrapper:
             camera_model: Camera model (e.g., 'OPENCV_FISHEYE', 'SIMPLE_RADIAL_FISHEYE', 'RADIAL_FISHEYE', 'FOV')
             camera_params: Camera parameters as string (e.g., "fx,fy,cx,cy,k1,k2,k3,k4")
             single_camera: Force single camera for all images
+            image_list_path: Optional text file restricting extraction to the listed images
+            command_prefix: Optional launcher prepended to the command (e.g. ['ssh', 'host'])
+            options: Extra COLMAP options (name -> value) overriding the defaults
             callback: Function to call with output lines
             
         Returns:
             Tuple of (success, message)
         """
-        cmd = [
+        cmd = list(command_prefix or []) + [
             self.colmap_exe,
             "feature_extractor",
             "--database_path", str(database_path),
@@ -68,19 +74,25 @@ class COLMAPWrapper:
         if single_camera:
             cmd.extend(["--ImageReader.single_camera", "1"])
         
+        if image_list_path:
+            cmd.extend(["--image_list_path", str(image_list_path)])
+        
         # Increase max image size for fisheye images
         if camera_model and 'FISHEYE' in camera_model.upper():
             cmd.extend(["--SiftExtraction.max_image_size", "4000"])
         
+        cmd.extend(build_option_args({}, options))
+        
         return self._run_command(cmd, callback)
     
-    def sequential_matcher(self, database_path, overlap=10, callback=None):
+    def sequential_matcher(self, database_path, overlap=10, options=None, callback=None):
         """
         Match features sequentially.
         
         Args:
             database_path: Path to COLMAP database file
             overlap: Number of overlapping images to match
+            options: Extra COLMAP options (name -> value) overriding the defaults
             callback: Function to call with output lines
             
         Returns:
@@ -93,14 +105,17 @@ class COLMAPWrapper:
             "--SequentialMatching.overlap", str(overlap)
         ]
         
+        cmd.extend(build_option_args({}, options))
+        
         return self._run_command(cmd, callback)
     
-    def exhaustive_matcher(self, database_path, callback=None):
+    def exhaustive_matcher(self, database_path, options=None, callback=None):
         """
         Match features exhaustively.
         
         Args:
             database_path: Path to COLMAP database file
+            options: Extra COLMAP options (name -> value) overriding the defaults
             callback: Function to call with output lines
             
         Returns:
@@ -112,9 +127,38 @@ class COLMAPWrapper:
             "--database_path", str(database_path)
         ]
         
+        cmd.extend(build_option_args({}, options))
+        
         return self._run_command(cmd, callback)
     
-    def mapper(self, database_path, image_path, output_path, callback=None):
+    def matches_importer(self, database_path, match_list_path, match_type="pairs", options=None,
+                         callback=None):
+        """
+        Match features for an explicit list of image pairs.
+        
+        Args:
+            database_path: Path to COLMAP database file
+            match_list_path: Text file with one "image1 image2" pair per line
+            match_type: 'pairs' (match the listed pairs) or 'raw' (import matches)
+            options: Extra COLMAP options (name -> value) overriding the defaults
+            callback: Function to call with output lines
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        cmd = [
+            self.colmap_exe,
+            "matches_importer",
+            "--database_path", str(database_path),
+            "--match_list_path", str(match_list_path),
+            "--match_type", match_type
+        ]
+        
+        cmd.extend(build_option_args({}, options))
+        
+        return self._run_command(cmd, callback)
+    
+    def mapper(self, database_path, image_path, output_path, options=None, callback=None):
         """
         Run COLMAP's incremental mapper for sparse reconstruction.
         
@@ -124,6 +168,7 @@ class COLMAPWrapper:
             database_path: Path to COLMAP database file
             image_path: Path to images folder
             output_path: Path to output sparse reconstruction
+            options: Extra COLMAP options (name -> value) overriding the defaults
             callback: Function to call with output lines
             
         Returns:
@@ -140,9 +185,66 @@ class COLMAPWrapper:
             "--output_path", str(output_path)
         ]
         
+        cmd.extend(build_option_args({}, options))
+        
+        return self._run_command(cmd, callback)
+    
+    def model_merger(self, input_path1, input_path2, output_path, max_reproj_error=64.0,
+                     callback=None):
+        """
+        Merge two sparse models that share registered images.
+        
+        Args:
+            input_path1: Path to first sparse model
+            input_path2: Path to second sparse model
+            output_path: Path to output merged model
+            max_reproj_error: Maximum reprojection error for alignment inliers
+            callback: Function to call with output lines
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        os.makedirs(output_path, exist_ok=True)
+        
+        cmd = [
+            self.colmap_exe,
+            "model_merger",
+            "--input_path1", str(input_path1),
+            "--input_path2", str(input_path2),
+            "--output_path", str(output_path),
+            "--max_reproj_error", str(max_reproj_error)
+        ]
+        
+        return self._run_command(cmd, callback)
+    
+    def bundle_adjuster(self, input_path, output_path, options=None, callback=None):
+        """
+        Run global bundle adjustment on a sparse model.
+        
+        Args:
+            input_path: Path to sparse model
+            output_path: Path to output refined model
+            options: Extra COLMAP options (name -> value) overriding the defaults
+            callback: Function to call with output lines
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        os.makedirs(output_path, exist_ok=True)
+        
+        cmd = [
+            self.colmap_exe,
+            "bundle_adjuster",
+            "--input_path", str(input_path),
+            "--output_path", str(output_path)
+        ]
+        
+        cmd.extend(build_option_args({}, options))
+        
         return self._run_command(cmd, callback)
     
-    def image_undistorter(self, image_path, input_path, output_path, callback=None):
+    def image_undistorter(self, image_path, input_path, output_path, image_list_path=None,
+                          options=None, callback=None):
         """
         Undistort images for dense reconstruction.
         
@@ -150,6 +252,8 @@ class COLMAPWrapper:
             image_path: Path to original images
             input_path: Path to sparse reconstruction
             output_path: Path to output dense workspace
+            image_list_path: Optional text file restricting undistortion to the listed images
+            options: Extra COLMAP options (name -> value) overriding the defaults
             callback: Function to call with output lines
             
         Returns:
@@ -160,18 +264,21 @@ class COLMAPWrapper:
             "image_undistorter",
             "--image_path", str(image_path),
             "--input_path", str(input_path),
-            "--output_path", str(output_path),
-            "--max_image_size", "2000"
+            "--output_path", str(output_path)
         ]
+        if image_list_path:
+            cmd.extend(["--image_list_path", str(image_list_path)])
+        cmd.extend(build_option_args({"max_image_size": 2000}, options))
         
         return self._run_command(cmd, callback)
     
-    def patch_match_stereo(self, workspace_path, callback=None):
+    def patch_match_stereo(self, workspace_path, options=None, callback=None):
         """
         Compute stereo depth maps.
         
         Args:
             workspace_path: Path to dense workspace
+            options: Extra COLMAP options (name -> value) overriding the defaults
             callback: Function to call with output lines
             
         Returns:
@@ -180,19 +287,20 @@ class COLMAPWrapper:
         cmd = [
             self.colmap_exe,
             "patch_match_stereo",
-            "--workspace_path", str(workspace_path),
-            "--PatchMatchStereo.window_radius", "5"
+            "--workspace_path", str(workspace_path)
         ]
+        cmd.extend(build_option_args({"PatchMatchStereo.window_radius": 5}, options))
         
         return self._run_command(cmd, callback)
     
-    def stereo_fusion(self, workspace_path, output_path, callback=None):
+    def stereo_fusion(self, workspace_path, output_path, options=None, callback=None):
         """
         Fuse depth maps into point cloud.
         
         Args:
             workspace_path: Path to dense workspace
             output_path: Path to output PLY file
+            options: Extra COLMAP options (name -> value) overriding the defaults
             callback: Function to call with output lines
             
         Returns:
@@ -202,9 +310,9 @@ class COLMAPWrapper:
             self.colmap_exe,
             "stereo_fusion",
             "--workspace_path", str(workspace_path),
-            "--output_path", str(output_path),
-            "--StereoFusion.min_num_pixels", "3"
+            "--output_path", str(output_path)
         ]
+        cmd.extend(build_option_args({"StereoFusion.min_num_pixels": 3}, options))
         
         return self._run_command(cmd, callback)
     
@@ -280,15 +388,21 @@ class COLMAPWrapper:
                 )
             
             output_lines = []
-            while True:
-                line = process.stdout.readline()
-                if line == '' and process.poll() is not None:
-                    break
-                if line:
-                    line = line.strip()
-                    output_lines.append(line)
-                    if callback:
-                        callback(line)
+            try:
+                while True:
+                    line = process.stdout.readline()
+                    if line == '' and process.poll() is not None:
+                        break
+                    if line:
+                        line = line.strip()
+                        output_lines.append(line)
+                        if callback:
+                            callback(line)
+            except BaseException:
+                # Cancelled from the callback: do not leave the process running
+                process.kill()
+                process.wait()
+                raise
             
             rc = process.poll()
             success = (rc == 0)
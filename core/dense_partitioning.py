@@ -0,0 +1,269 @@
+"""Dense reconstruction over spatial clusters of the sparse model."""
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from core.colmap_model import camera_center, read_images_binary
+from core.point_cloud import estimate_spacing, voxel_coordinates
+from core.ply_io import PlyWriter, read_ply, xyz_of
+from core.view_selection import SourceViewSelector
+from utils.spatial import NeighborIndex
+
+
+def cluster_cameras(centers, max_cluster_size=200, overlap_ratio=0.2):
+    """
+    Split camera positions into overlapping spatial clusters.
+
+    Cameras are bisected at the median of the axis with the largest
+    extent until every cluster is small enough. Each cluster is then
+    grown by the outside cameras closest to its members, so stereo at
+    cluster borders still finds source views and fused surfaces overlap.
+
+    Args:
+        centers: N x 3 camera centers
+        max_cluster_size: Maximum cameras per cluster before overlap
+        overlap_ratio: Extra cameras added per cluster, as a fraction of its size
+
+    Returns:
+        List of clusters, each a sorted array of indices into centers
+    """
+    centers = np.asarray(centers, dtype=np.float64)
+    pending = [np.arange(len(centers))]
+    cores = []
+    while pending:
+        members = pending.pop()
+        if len(members) <= max_cluster_size:
+            cores.append(members)
+            continue
+        points = centers[members]
+        axis = int(np.argmax(points.max(axis=0) - points.min(axis=0)))
+        order = np.argsort(points[:, axis], kind='stable')
+        half = len(members) // 2
+        pending.append(members[order[:half]])
+        pending.append(members[order[half:]])
+
+    clusters = []
+    for members in cores:
+        outside = np.setdiff1d(np.arange(len(centers)), members)
+        extra = min(len(outside), int(np.ceil(overlap_ratio * len(members))))
+        if extra:
+            distances, _ = NeighborIndex(centers[members]).query_knn(centers[outside], 1)
+            closest = outside[np.argsort(distances[:, 0], kind='stable')[:extra]]
+            members = np.concatenate([members, closest])
+        clusters.append(np.sort(members))
+    return clusters
+
+
+def merge_fused_clouds(paths, output_path, voxel_size=None, comments=()):
+    """
+    Merge fused cluster clouds into one PLY, removing duplicated overlap.
+
+    Within each voxel only the points of the cloud contributing most points
+    there are kept, so areas covered by one cluster keep their full density
+    while overlaps get a single copy of the surface. The clouds are
+    memory-mapped one at a time: a first pass counts points per voxel and
+    cloud, a second streams the kept points to the output.
+
+    Args:
+        paths: Fused PLY files with identical vertex layouts
+        output_path: Merged PLY file to write
+        voxel_size: Voxel edge length (5x the largest point spacing if None)
+        comments: Header comments of the output
+
+    Returns:
+        Tuple of (written points, removed points); nothing is written if
+        the clouds hold no points
+    """
+    lower, upper = np.full(3, np.inf), np.full(3, -np.inf)
+    spacing, total = 0.0, 0
+    for path in paths:
+        xyz = xyz_of(read_ply(path, mmap=True))
+        if len(xyz):
+            lower = np.minimum(lower, xyz.min(axis=0))
+            upper = np.maximum(upper, xyz.max(axis=0))
+            total += len(xyz)
+            if not voxel_size:
+                spacing = max(spacing, estimate_spacing(xyz))
+    if not total:
+        return 0, 0
+
+    if not voxel_size:
+        # Only points of non-owning clusters are dropped per voxel, so a
+        # coarse grid does not thin out areas covered by one cluster
+        voxel_size = 5.0 * spacing or 1e-3
+    dims = np.floor((upper - lower) / voxel_size).astype(np.int64) + 1
+    while float(np.prod(dims.astype(np.float64))) >= 2.0 ** 62:
+        voxel_size *= 2.0
+        dims = np.floor((upper - lower) / voxel_size).astype(np.int64) + 1
+
+    def voxel_keys(xyz):
+        coords = np.minimum(voxel_coordinates(xyz, voxel_size, lower), dims - 1)
+        return (coords[:, 0] * dims[1] + coords[:, 1]) * dims[2] + coords[:, 2]
+
+    keys, counts, sources = [], [], []
+    for index, path in enumerate(paths):
+        cloud_keys, cloud_counts = np.unique(voxel_keys(xyz_of(read_ply(path, mmap=True))),
+                                             return_counts=True)
+        keys.append(cloud_keys)
+        counts.append(cloud_counts)
+        sources.append(np.full(len(cloud_keys), index))
+    keys, counts, sources = np.concatenate(keys), np.concatenate(counts), np.concatenate(sources)
+    # Owner of a voxel: the cloud with most points there (the first on ties)
+    order = np.lexsort((sources, -counts, keys))
+    keys, sources = keys[order], sources[order]
+    first = np.concatenate([[True], keys[1:] != keys[:-1]])
+    owner_keys, owners = keys[first], sources[first]
+
+    with PlyWriter(output_path, read_ply(paths[0], mmap=True).dtype, comments) as writer:
+        for index, path in enumerate(paths):
+            cloud = read_ply(path, mmap=True)
+            if len(cloud):
+                keep = owners[np.searchsorted(owner_keys, voxel_keys(xyz_of(cloud)))] == index
+                writer.write(cloud[keep])
+    return writer.count, total - writer.count
+
+
+class ClusteredDenseReconstructor:
+    """
+    Runs undistortion, PatchMatch stereo and fusion per camera cluster.
+
+    Peak fusion memory depends on the cluster size instead of the scene
+    size, and clusters are processed concurrently. The fused clouds are
+    merged with overlap deduplication.
+    """
+
+    def __init__(self, colmap_wrapper, max_cluster_size=200, overlap_ratio=0.2,
+                 max_workers=2, voxel_size=None, source_views=10, depth_inspector=None,
+                 options=None):
+        """
+        Initialize clustered dense reconstruction.
+
+        Args:
+            colmap_wrapper: COLMAPWrapper instance
+            max_cluster_size: Maximum images per cluster before overlap
+            overlap_ratio: Overlap added per cluster, as a fraction of its size
+            max_workers: Clusters processed concurrently
+            voxel_size: Voxel size for overlap deduplication (estimated
+                from the point spacing if None)
+            source_views: Source images per reference image chosen by
+                covisibility before stereo (0 keeps COLMAP's selection)
+            depth_inspector: DepthMapInspector run on each cluster before fusion
+            options: Dictionary of COLMAP options per command
+                ('image_undistorter', 'patch_match_stereo', 'stereo_fusion')
+        """
+        self.colmap = colmap_wrapper
+        self.max_cluster_size = max_cluster_size
+        self.overlap_ratio = overlap_ratio
+        self.max_workers = max_workers
+        self.voxel_size = voxel_size
+        self.source_views = source_views
+        self.depth_inspector = depth_inspector
+        self.options = options or {}
+
+    def run(self, image_path, sparse_path, work_dir, output_path, callback=None):
+        """
+        Reconstruct all clusters and merge their fused point clouds.
+
+        Args:
+            image_path: Original images folder
+            sparse_path: Sparse model folder (e.g. sparse/0)
+            work_dir: Folder receiving one dense workspace per cluster
+            output_path: Merged PLY file to write
+            callback: Progress callback function
+
+        Returns:
+            Tuple of (success, message)
+        """
+        images = read_images_binary(Path(sparse_path) / 'images.bin')
+        image_ids = sorted(images)
+        if not image_ids:
+            return False, "Sparse model has no registered images"
+        centers = np.array([camera_center(images[image_id]) for image_id in image_ids])
+        clusters = cluster_cameras(centers, self.max_cluster_size, self.overlap_ratio)
+
+        if callback:
+            sizes = ', '.join(str(len(c)) for c in clusters)
+            callback(f"Split {len(image_ids):,} images into {len(clusters)} dense clusters ({sizes})")
+
+        work_dir = Path(work_dir)
+        if work_dir.exists():
+            shutil.rmtree(work_dir)
+        work_dir.mkdir(parents=True)
+
+        def reconstruct(index):
+            cluster_dir = work_dir / f"cluster_{index:03d}"
+            cluster_dir.mkdir()
+            list_path = cluster_dir / "images.txt"
+            names = [images[image_ids[i]]['name'] for i in clusters[index]]
+            list_path.write_text(''.join(name + '\n' for name in names), encoding='utf-8')
+
+            cluster_callback = None
+            if callback:
+                cluster_callback = lambda line: callback(f"[dense {index + 1}] {line}")
+
+            workspace = cluster_dir / "dense"
+            success, msg = self.colmap.image_undistorter(
+                image_path=image_path,
+                input_path=sparse_path,
+                output_path=workspace,
+                image_list_path=list_path,
+                options=self.options.get('image_undistorter'),
+                callback=cluster_callback
+            )
+            if not success:
+                return None, f"undistortion failed: {msg}"
+
+            if self.source_views:
+                try:
+                    SourceViewSelector(self.source_views).run(workspace, image_names=names,
+                                                              callback=cluster_callback)
+                except Exception as e:
+                    if cluster_callback:
+                        cluster_callback(f"Warning: Source view selection failed: {e}")
+
+            success, msg = self.colmap.patch_match_stereo(
+                workspace_path=workspace,
+                options=self.options.get('patch_match_stereo'),
+                callback=cluster_callback
+            )
+            if not success:
+                return None, f"stereo failed: {msg}"
+
+            if self.depth_inspector:
+                success, msg = self.depth_inspector.run(workspace, callback=cluster_callback)
+                if cluster_callback:
+                    cluster_callback(msg if success else f"Warning: Depth map inspection failed: {msg}")
+
+            fused = cluster_dir / "fused.ply"
+            success, msg = self.colmap.stereo_fusion(
+                workspace_path=workspace,
+                output_path=fused,
+                options=self.options.get('stereo_fusion'),
+                callback=cluster_callback
+            )
+            if not success or not fused.exists():
+                return None, f"fusion failed: {msg}"
+            return fused, msg
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(reconstruct, range(len(clusters))))
+
+        fused_paths = [path for path, _ in results if path]
+        for index, (path, msg) in enumerate(results):
+            if path is None and callback:
+                callback(f"Warning: Dense cluster {index + 1} {msg}")
+        if not fused_paths:
+            return False, "No dense cluster could be reconstructed"
+
+        if callback:
+            callback(f"Merging {len(fused_paths)} fused clouds...")
+
+        count, removed = merge_fused_clouds(fused_paths, output_path, self.voxel_size,
+                                            comments=[f"Merged from {len(fused_paths)} dense clusters"])
+        if not count:
+            return False, "No dense points produced"
+
+        return True, (f"Fused {count:,} points from {len(fused_paths)} of {len(clusters)} clusters "
+                      f"({removed:,} overlap duplicates removed)")
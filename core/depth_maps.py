@@ -0,0 +1,304 @@
+"""Inspection of COLMAP depth and normal maps before stereo fusion."""
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+
+def read_map_header(path):
+    """
+    Read the text header of a COLMAP depth/normal map.
+
+    Args:
+        path: Path to a .bin map written by patch_match_stereo
+
+    Returns:
+        Tuple of (width, height, channels, data_offset)
+
+    Raises:
+        ValueError: If the header is malformed
+    """
+    with open(path, 'rb') as f:
+        header = f.read(64)
+    fields = header.split(b'&', 3)
+    if len(fields) < 4:
+        raise ValueError(f"Invalid depth/normal map header: {path}")
+    width, height, channels = (int(value) for value in fields[:3])
+    offset = sum(len(value) for value in fields[:3]) + 3
+    return width, height, channels, offset
+
+
+def read_colmap_map(path, mmap=True):
+    """
+    Read a COLMAP depth or normal map.
+
+    Maps are stored channel by channel, row-major, as float32 after a
+    "width&height&channels&" header, so they can be memory-mapped without
+    copying.
+
+    Args:
+        path: Path to a .bin map
+        mmap: Memory-map the file instead of reading it
+
+    Returns:
+        H x W (depth) or H x W x C (normal) float32 array
+    """
+    width, height, channels, offset = read_map_header(path)
+    if mmap:
+        data = np.memmap(path, dtype='<f4', mode='r', offset=offset, shape=(channels, height, width))
+    else:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = np.fromfile(f, dtype='<f4', count=channels * height * width)
+        data = data.reshape(channels, height, width)
+    return data[0] if channels == 1 else data.transpose(1, 2, 0)
+
+
+def list_depth_maps(workspace_path, input_type='geometric'):
+    """
+    Find the depth maps of a dense workspace.
+
+    Args:
+        workspace_path: Dense workspace (containing stereo/)
+        input_type: 'geometric' or 'photometric'
+
+    Returns:
+        Dictionary of image name -> depth map path, sorted by name
+    """
+    suffix = f".{input_type}.bin"
+    depth_dir = Path(workspace_path) / 'stereo' / 'depth_maps'
+    maps = {}
+    for path in sorted(depth_dir.rglob(f"*{suffix}")):
+        maps[path.relative_to(depth_dir).as_posix()[:-len(suffix)]] = path
+    return maps
+
+
+def depth_map_stats(depth, normal=None):
+    """
+    Coverage and confidence statistics of a depth map.
+
+    'consistency' is the fraction of valid pixels whose right and lower
+    neighbours differ by less than 5% in depth; noisy or failed views
+    score low. 'normal_facing' is the fraction of valid normals pointing
+    towards the camera.
+
+    Args:
+        depth: H x W depth map
+        normal: Optional H x W x 3 normal map
+
+    Returns:
+        Dictionary of statistics, including a combined 'score' in [0, 1]
+    """
+    depth = np.asarray(depth)
+    valid = depth > 0
+    count = int(valid.sum())
+    stats = {
+        'width': int(depth.shape[1]),
+        'height': int(depth.shape[0]),
+        'coverage': count / depth.size if depth.size else 0.0,
+        'depth_min': 0.0, 'depth_median': 0.0, 'depth_max': 0.0,
+        'consistency': 0.0,
+        'normal_facing': None,
+        'score': 0.0
+    }
+    if not count:
+        return stats
+
+    values = depth[valid]
+    stats['depth_min'], stats['depth_median'], stats['depth_max'] = \
+        (float(v) for v in np.percentile(values, [2, 50, 98]))
+
+    smooth = 0
+    pairs = 0
+    for a, b in ((depth[:, :-1], depth[:, 1:]), (depth[:-1, :], depth[1:, :])):
+        both = (a > 0) & (b > 0)
+        pairs += int(both.sum())
+        smooth += int((np.abs(a - b)[both] < 0.05 * a[both]).sum())
+    stats['consistency'] = smooth / pairs if pairs else 0.0
+
+    if normal is not None:
+        stats['normal_facing'] = float((np.asarray(normal)[..., 2][valid] < 0).mean())
+
+    stats['score'] = stats['coverage'] * stats['consistency']
+    return stats
+
+
+def write_preview(depth, path, max_size=256, depth_range=None):
+    """
+    Write a low-resolution grayscale preview of a depth map (binary PGM).
+
+    Near surfaces are bright, far ones dark, and missing depth is black.
+
+    Args:
+        depth: H x W depth map
+        path: Output .pgm path
+        max_size: Longest preview side in pixels
+        depth_range: (near, far) used for scaling (percentiles if None)
+    """
+    step = max(1, int(np.ceil(max(depth.shape) / max_size)))
+    small = np.asarray(depth[::step, ::step], dtype=np.float32)
+    valid = small > 0
+
+    image = np.zeros(small.shape, dtype=np.uint8)
+    if valid.any():
+        near, far = depth_range or np.percentile(small[valid], [2, 98])
+        scaled = 1.0 - (small - near) / max(far - near, 1e-9)
+        image[valid] = np.clip(55 + 200 * scaled[valid], 55, 255).astype(np.uint8)
+
+    with open(path, 'wb') as f:
+        f.write(f"P5\n{image.shape[1]} {image.shape[0]}\n255\n".encode('ascii'))
+        f.write(image.tobytes())
+
+
+def _file_key(path):
+    """Size and modification time identifying a file version."""
+    info = Path(path).stat()
+    return [info.st_size, info.st_mtime_ns]
+
+
+class DepthMapInspector:
+    """
+    Computes per-image depth map statistics and previews, with caching.
+
+    Results are cached in stereo/depth_report.json next to the maps and
+    only recomputed for maps whose size or modification time changed.
+    """
+
+    def __init__(self, input_type='geometric', preview_size=256, min_coverage=0.0, min_score=0.0):
+        """
+        Initialize inspector.
+
+        Args:
+            input_type: 'geometric' or 'photometric' maps (as used by fusion)
+            preview_size: Longest preview side in pixels (0 disables previews)
+            min_coverage: Minimum valid-depth fraction for an image to be fused
+            min_score: Minimum combined score for an image to be fused
+        """
+        self.input_type = input_type
+        self.preview_size = preview_size
+        self.min_coverage = min_coverage
+        self.min_score = min_score
+
+    def inspect(self, workspace_path, callback=None):
+        """
+        Inspect all depth maps of a dense workspace.
+
+        Args:
+            workspace_path: Dense workspace (containing stereo/)
+            callback: Progress callback function
+
+        Returns:
+            Dictionary of image name -> statistics
+        """
+        stereo = Path(workspace_path) / 'stereo'
+        report_path = stereo / 'depth_report.json'
+        preview_dir = stereo / 'previews'
+        if self.preview_size:
+            preview_dir.mkdir(exist_ok=True)
+
+        cache = {}
+        if report_path.exists():
+            try:
+                cache = json.loads(report_path.read_text(encoding='utf-8')).get('images', {})
+            except ValueError:
+                cache = {}
+
+        depth_maps = list_depth_maps(workspace_path, self.input_type)
+        report = {}
+        for i, (name, depth_path) in enumerate(depth_maps.items()):
+            normal_path = stereo / 'normal_maps' / depth_path.relative_to(stereo / 'depth_maps')
+            key = _file_key(depth_path)
+
+            cached = cache.get(name)
+            if cached and cached.get('source') == key:
+                report[name] = cached
+                continue
+
+            depth = read_colmap_map(depth_path)
+            normal = read_colmap_map(normal_path) if normal_path.exists() else None
+            stats = depth_map_stats(depth, normal)
+            stats['source'] = key
+            if self.preview_size:
+                preview = preview_dir / f"{name}.{self.input_type}.pgm"
+                preview.parent.mkdir(parents=True, exist_ok=True)
+                write_preview(depth, preview, self.preview_size)
+                stats['preview'] = str(preview.relative_to(stereo).as_posix())
+            report[name] = stats
+
+            if callback and (i + 1) % 100 == 0:
+                callback(f"  Inspected {i + 1:,}/{len(depth_maps):,} depth maps")
+
+        report_path.write_text(json.dumps({'input_type': self.input_type, 'images': report}, indent=2),
+                               encoding='utf-8')
+        return report
+
+    def passes(self, stats):
+        """Check whether an image's statistics meet the quality thresholds."""
+        return stats['coverage'] >= self.min_coverage and stats['score'] >= self.min_score
+
+    def run(self, workspace_path, callback=None):
+        """
+        Inspect depth maps and restrict fusion to images passing the thresholds.
+
+        The original stereo/fusion.cfg is kept as fusion.cfg.all and is the
+        source of the image list on later runs. It is taken again whenever
+        fusion.cfg is newer (rewritten by a new image_undistorter run).
+
+        Args:
+            workspace_path: Dense workspace (containing stereo/)
+            callback: Progress callback function
+
+        Returns:
+            Tuple of (success, message)
+        """
+        stereo = Path(workspace_path) / 'stereo'
+        if not (stereo / 'depth_maps').exists():
+            return False, "No depth maps found"
+
+        report = self.inspect(workspace_path, callback=callback)
+        if not report:
+            return False, f"No {self.input_type} depth maps found"
+
+        coverage = [stats['coverage'] for stats in report.values()]
+        message = (f"Inspected {len(report):,} depth maps, "
+                   f"median coverage {float(np.median(coverage)):.0%}")
+
+        config_path = stereo / 'fusion.cfg'
+        original_path = stereo / 'fusion.cfg.all'
+        if (original_path.exists() and config_path.exists()
+                and config_path.stat().st_mtime_ns > original_path.stat().st_mtime_ns):
+            # fusion.cfg was rewritten by a new undistortion: the backup is stale
+            original_path.unlink()
+
+        if not (self.min_coverage or self.min_score):
+            if original_path.exists():
+                # Undo the filtering of an earlier run
+                shutil.copy2(original_path, config_path)
+            return True, message
+
+        if not original_path.exists():
+            if not config_path.exists():
+                return False, "No fusion.cfg in stereo folder"
+            shutil.copy2(config_path, original_path)
+
+        names = [line.strip() for line in original_path.read_text(encoding='utf-8').splitlines()
+                 if line.strip()]
+        kept = [name for name in names if name in report and self.passes(report[name])]
+        rejected = [name for name in names if name not in kept]
+        if not kept:
+            return False, "No depth map passes the quality thresholds"
+
+        config_path.write_text(''.join(name + '\n' for name in kept), encoding='utf-8')
+        # Keep the backup at least as new as the filtered list
+        os.utime(original_path)
+        if callback:
+            for name in rejected[:20]:
+                stats = report.get(name)
+                detail = f"coverage {stats['coverage']:.0%}, score {stats['score']:.2f}" if stats else "missing"
+                callback(f"  Excluded from fusion: {name} ({detail})")
+            if len(rejected) > 20:
+                callback(f"  ... and {len(rejected) - 20} more")
+
+        return True, f"{message}; fusing {len(kept):,} of {len(names):,} images"
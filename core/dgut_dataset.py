@@ -0,0 +1,184 @@
+"""Preparation of 3DGUT training datasets (sparse model plus pre-resized images)."""
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+from core.colmap_model import read_images_binary
+
+
+SPARSE_FILES = ('cameras.bin', 'images.bin', 'points3D.bin')
+
+
+def _is_current(target, source):
+    """Check whether a derived file is newer than its source."""
+    try:
+        return target.stat().st_mtime_ns >= source.stat().st_mtime_ns
+    except OSError:
+        return False
+
+
+def _link_or_copy(source, target):
+    """Hard-link a file, copying it where links are not possible."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.exists():
+        target.unlink()
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def _resize_image(task):
+    """
+    Write the downsampled copies of one image (process pool task).
+
+    The image is decoded once; every level is resized from the previous
+    one with area interpolation.
+
+    Args:
+        task: Tuple of (source path, [(factor, target path), ...], jpeg_quality)
+
+    Returns:
+        Tuple of (source path, error message or None)
+    """
+    source, targets, jpeg_quality = task
+    cv2.setNumThreads(1)
+    image = cv2.imread(str(source), cv2.IMREAD_UNCHANGED)
+    if image is None:
+        return source, "unreadable image"
+
+    height, width = image.shape[:2]
+    params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+    for factor, target in targets:
+        size = (max(1, int(width / factor)), max(1, int(height / factor)))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        Path(target).parent.mkdir(parents=True, exist_ok=True)
+        if not cv2.imwrite(str(target), image, params):
+            return source, f"could not write {target}"
+    return source, None
+
+
+class DGUTDatasetBuilder:
+    """
+    Builds the dataset folder 3DGUT trains and renders from.
+
+    The layout is the one 3DGRUT's COLMAP loader expects: images/ (hard
+    links to the project images), images_<factor>/ with pre-resized copies
+    and sparse/0/ with the binary model. Only images registered in the
+    model are included, and files already newer than their source are
+    kept, so later runs only redo what changed.
+    """
+
+    def __init__(self, factors=(2, 4), max_workers=None, jpeg_quality=95):
+        """
+        Initialize builder.
+
+        Args:
+            factors: Downsample factors written as images_<factor>
+            max_workers: Resize processes (CPU count if None)
+            jpeg_quality: JPEG quality of resized JPEG images
+        """
+        self.factors = sorted({int(factor) for factor in factors if int(factor) > 1})
+        self.max_workers = max_workers
+        self.jpeg_quality = jpeg_quality
+
+    def check_installation(self):
+        """
+        Check if OpenCV is available for resizing.
+
+        Returns:
+            Tuple of (success, message)
+        """
+        if not self.factors or cv2 is not None:
+            return True, "OpenCV installed" if cv2 is not None else "No resizing needed"
+        return False, "OpenCV not found. Install: pip install opencv-python"
+
+    def build(self, image_path, sparse_path, dataset_path, callback=None):
+        """
+        Create or update a 3DGUT dataset.
+
+        Args:
+            image_path: Project images folder
+            sparse_path: Binary sparse model folder (cameras.bin, images.bin, points3D.bin)
+            dataset_path: Output dataset folder
+            callback: Progress callback function
+
+        Returns:
+            Tuple of (success, message)
+        """
+        image_path = Path(image_path)
+        sparse_path = Path(sparse_path)
+        dataset_path = Path(dataset_path)
+
+        ok, msg = self.check_installation()
+        if not ok:
+            return False, msg
+        missing = [name for name in SPARSE_FILES if not (sparse_path / name).exists()]
+        if missing:
+            return False, f"Sparse model incomplete in {sparse_path} (missing {', '.join(missing)})"
+
+        # Sparse model
+        model_path = dataset_path / 'sparse' / '0'
+        model_path.mkdir(parents=True, exist_ok=True)
+        for name in SPARSE_FILES:
+            if not _is_current(model_path / name, sparse_path / name):
+                shutil.copy2(sparse_path / name, model_path / name)
+
+        names = sorted(image['name'] for image in read_images_binary(sparse_path / 'images.bin').values())
+        absent = [name for name in names if not (image_path / name).exists()]
+        if absent:
+            return False, f"{len(absent)} registered images missing from {image_path} (e.g. {absent[0]})"
+
+        # Full-resolution images
+        linked = 0
+        for name in names:
+            target = dataset_path / 'images' / name
+            if not _is_current(target, image_path / name):
+                _link_or_copy(image_path / name, target)
+                linked += 1
+
+        # Downsampled images, one task per image covering every factor
+        tasks = []
+        for name in names:
+            source = image_path / name
+            targets = [(factor, dataset_path / f"images_{factor}" / name) for factor in self.factors]
+            if not all(_is_current(target, source) for _, target in targets):
+                tasks.append((source, targets, self.jpeg_quality))
+
+        failed = []
+        if tasks:
+            if callback:
+                callback(f"Resizing {len(tasks):,} images to "
+                         f"{', '.join(f'1/{factor}' for factor in self.factors)} resolution...")
+            workers = min(self.max_workers or os.cpu_count() or 1, len(tasks))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                chunk_size = max(1, len(tasks) // (workers * 8))
+                for done, (source, error) in enumerate(pool.map(_resize_image, tasks, chunksize=chunk_size), 1):
+                    if error:
+                        failed.append(f"{source.name}: {error}")
+                    if callback and (done % 100 == 0 or done == len(tasks)):
+                        callback(f"  Resized {done:,}/{len(tasks):,} images")
+        if failed:
+            return False, f"Could not resize {len(failed)} images ({failed[0]})"
+
+        # Drop images that are no longer part of the model
+        keep = set(names)
+        removed = 0
+        for folder in ['images'] + [f"images_{factor}" for factor in self.factors]:
+            for path in (dataset_path / folder).rglob('*'):
+                if path.is_file() and path.relative_to(dataset_path / folder).as_posix() not in keep:
+                    path.unlink()
+                    removed += 1
+
+        parts = [f"{linked:,} linked"]
+        if self.factors:
+            parts = [f"{len(tasks):,} resized", f"{len(names) - len(tasks):,} reused"] + parts
+        if removed:
+            parts.append(f"{removed:,} stale files removed")
+        return True, f"3DGUT dataset ready: {len(names):,} images ({', '.join(parts)}) in {dataset_path}"
@@ -3,6 +3,9 @@ import subprocess
 import os
 from pathlib import Path
 
+from core.checkpoints import find_checkpoints
+from core.render_service import RenderService
+
 
 class DGUTWrapper:
     """Wrapper for 3DGUT Gaussian Splatting with fisheye support."""
@@ -18,6 +21,7 @@ class DGUTWrapper:
         self.train_script = None
         self.render_script = None
         self.export_script = None
+        self._render_service = None
         
         # Try to locate 3DGUT installation
         self._locate_dgut()
@@ -64,7 +68,8 @@ class DGUTWrapper:
     
     def train(self, source_path, model_path, camera_model='perspective',
               use_mcmc=True, iterations=30000, down_sample_factor=2, 
-              with_gui=False, export_ply=True, callback=None):
+              with_gui=False, export_ply=True, monitor=None, resume_checkpoint=None,
+              init_point_cloud=None, callback=None):
         """
         Train 3D GRUT Gaussian Splatting model.
         
@@ -73,10 +78,15 @@ class DGUTWrapper:
             model_path: Output path for trained model
             camera_model: 'perspective' or 'fisheye' (mapped to colmap/mcmc config)
             use_mcmc: Enable MCMC optimization (uses 'mcmc' config)
-            iterations: Training iterations (not used directly, controlled by config)
+            iterations: Training iterations (passed as the n_iterations override)
             down_sample_factor: Resolution reduction (1=full, 2=half, 4=quarter)
             with_gui: Open interactive viewer during training
             export_ply: Export PLY point cloud after training
+            monitor: TrainingMonitor stopping the run when the loss/PSNR
+                plateaus (optional)
+            resume_checkpoint: Checkpoint (ckpt_*.pt) to continue training from
+            init_point_cloud: PLY file seeding the Gaussians instead of the
+                sparse model's points (optional)
             callback: Progress callback function
             
         Returns:
@@ -96,9 +106,17 @@ class DGUTWrapper:
             "--data.path", str(source_path),
             "--output_dir", str(model_path),
             "--down_sample_factor", str(down_sample_factor),
-            "--export_ply_enabled", "true" if export_ply else "false"
+            "--export_ply_enabled", "true" if export_ply else "false",
+            f"n_iterations={int(iterations)}"
         ]
         
+        if resume_checkpoint:
+            cmd.append(f"resume={resume_checkpoint}")
+        
+        if init_point_cloud:
+            cmd.extend(["initialization.method=point_cloud",
+                        f"initialization.fused_point_cloud_path={init_point_cloud}"])
+        
         # Add GUI option (note: requires manual "Train" checkbox activation)
         if with_gui:
             cmd.extend(["--with_gui", "true"])
@@ -109,6 +127,12 @@ class DGUTWrapper:
             callback(f"  Data: {source_path}")
             callback(f"  Output: {model_path}")
             callback(f"  Downsample: {down_sample_factor}x")
+            callback(f"  Iterations: {int(iterations):,}")
+            if resume_checkpoint:
+                callback(f"  Resuming from: {resume_checkpoint}")
+            callback(f"  Initialization: {init_point_cloud or 'sparse points'}")
+            if monitor:
+                callback(f"  Early stopping: after {monitor.patience:,} iterations without improvement")
             if with_gui:
                 callback("  GUI: Enabled (remember to click 'Train' checkbox!)")
             callback("")
@@ -116,7 +140,32 @@ class DGUTWrapper:
             callback("")
         
         # Run training
-        return self._run_command(cmd, callback)
+        if monitor:
+            monitor.reset()
+        success, message = self._run_command(
+            cmd, callback, line_monitor=monitor.feed if monitor else None,
+            stop_message=lambda: f"3DGUT training stopped early: {monitor.stop_reason}"
+        )
+        if not (success and monitor and monitor.stop_reason):
+            return success, message
+        
+        # The trainer was terminated: its final checkpoint and PLY export never
+        # ran, so finish from the newest checkpoint with a zero-iteration resume
+        checkpoints = [c for c in find_checkpoints(model_path) if c['iteration'] is not None]
+        if not checkpoints:
+            return True, (f"{message} (no checkpoint written yet, so no model was exported; "
+                          "lower the checkpoint interval or the patience)")
+        checkpoint = checkpoints[-1]
+        if callback:
+            callback(f"Finishing from {checkpoint['path'].name} (iteration {checkpoint['iteration']:,}); "
+                     "progress after it is discarded")
+        
+        finish_cmd = [arg for arg in cmd if not arg.startswith(('n_iterations=', 'resume='))]
+        finish_cmd += [f"n_iterations={checkpoint['iteration']}", f"resume={checkpoint['path']}"]
+        ok, msg = self._run_command(finish_cmd, callback)
+        if not ok:
+            return True, f"{message}; exporting from {checkpoint['path'].name} failed: {msg}"
+        return True, f"{message}; model exported from checkpoint at iteration {checkpoint['iteration']:,}"
     
     def render(self, model_path, camera_model='perspective', iteration=30000,
                skip_train=True, render_path=None, output_path=None, callback=None):
@@ -160,6 +209,65 @@ class DGUTWrapper:
         
         return self._run_command(cmd, callback)
     
+    def render_service(self):
+        """
+        Render service shared by all render_trajectory calls.
+        
+        The worker process is started on first use and keeps the last
+        rendered model loaded, so repeated renders skip model loading.
+        
+        Returns:
+            RenderService
+        """
+        if self._render_service is None:
+            self._render_service = RenderService(self.dgut_path)
+        return self._render_service
+    
+    def render_trajectory(self, model_path, output_path, trajectory=None, dataset_path=None,
+                          callback=None):
+        """
+        Render a trained model through the render service.
+        
+        Args:
+            model_path: Checkpoint (ckpt_*.pt) or training output folder
+                (its newest checkpoint is used)
+            output_path: Output folder for rendered images
+            trajectory: Trajectory dictionary or JSON file (see
+                core.render_service.turntable_trajectory)
+            dataset_path: COLMAP dataset whose cameras are rendered when
+                no trajectory is given
+            callback: Progress callback function
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        checkpoint = Path(model_path)
+        if checkpoint.is_dir():
+            checkpoints = find_checkpoints(checkpoint)
+            if not checkpoints:
+                return False, f"No 3DGUT checkpoint found in {checkpoint}"
+            checkpoint = checkpoints[-1]['path']
+        elif not checkpoint.exists():
+            return False, f"Checkpoint not found: {checkpoint}"
+        
+        if callback:
+            callback(f"Rendering {checkpoint.name} via render service...")
+        try:
+            success, message = self.render_service().render(checkpoint, output_path,
+                                                            trajectory=trajectory,
+                                                            dataset_path=dataset_path)
+        except (RuntimeError, OSError) as e:
+            return False, f"Render service error: {str(e)}"
+        if callback:
+            callback(message)
+        return success, message
+    
+    def close(self):
+        """Stop the render service worker if it was started."""
+        if self._render_service is not None:
+            self._render_service.stop()
+            self._render_service = None
+    
     def export_pointcloud(self, model_path, output_path, num_points=1000000, callback=None):
         """
         Export 3DGUT model to PLY point cloud.
@@ -189,13 +297,16 @@ class DGUTWrapper:
         
         return self._run_command(cmd, callback)
     
-    def _run_command(self, cmd, callback=None):
+    def _run_command(self, cmd, callback=None, line_monitor=None, stop_message=None):
         """
         Run a 3DGUT command.
         
         Args:
             cmd: Command list to execute
             callback: Progress callback function
+            line_monitor: Called with every output line; returning True
+                terminates the process, which then counts as success
+            stop_message: Callable returning the message of such a stop
             
         Returns:
             Tuple of (success, message)
@@ -216,15 +327,35 @@ class DGUTWrapper:
             
             # Stream output
             output_lines = []
-            for line in process.stdout:
-                line = line.rstrip()
-                output_lines.append(line)
-                if callback:
-                    callback(line)
+            stopped = False
+            try:
+                for line in process.stdout:
+                    line = line.rstrip()
+                    output_lines.append(line)
+                    if callback:
+                        callback(line)
+                    if line_monitor and line_monitor(line):
+                        stopped = True
+                        process.terminate()
+                        break
+            except BaseException:
+                # Cancelled from the callback: do not leave training running
+                process.kill()
+                process.wait()
+                raise
             
             # Wait for completion
-            process.wait()
+            try:
+                process.wait(timeout=60 if stopped else None)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
             
+            if stopped:
+                message = stop_message() if stop_message else "3DGUT operation stopped"
+                if callback:
+                    callback(message)
+                return True, message
             if process.returncode == 0:
                 return True, "3DGUT operation completed successfully"
             else:
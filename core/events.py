@@ -0,0 +1,353 @@
+"""Typed pipeline events and the bus delivering them to subscribers."""
+import json
+import re
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from core.training_monitor import parse_metrics
+
+
+class Event:
+    """Base class of pipeline events; the timestamp is set on creation."""
+
+    def __post_init__(self):
+        self.timestamp = time.time()
+
+    def to_dict(self):
+        """JSON-serializable form with the event type and timestamp."""
+        data = {key: str(value) if isinstance(value, Path) else value for key, value in asdict(self).items()}
+        return dict(data, event=type(self).__name__, timestamp=self.timestamp)
+
+
+@dataclass
+class StageStarted(Event):
+    """A pipeline stage started."""
+    stage: str
+
+
+@dataclass
+class StageFinished(Event):
+    """A pipeline stage ended."""
+    stage: str
+    success: bool = True
+    message: str = ''
+    seconds: float = 0.0
+
+
+@dataclass
+class Progress(Event):
+    """Progress within a stage."""
+    current: int
+    total: int
+    message: str = ''
+    stage: str = None
+
+    @property
+    def fraction(self):
+        """Completed fraction in [0, 1]."""
+        return min(1.0, self.current / self.total) if self.total else 0.0
+
+
+@dataclass
+class LogLine(Event):
+    """A line of log output (tool output or pipeline message)."""
+    message: str
+    level: str = 'info'
+    stage: str = None
+
+
+@dataclass
+class Metric(Event):
+    """A numeric measurement such as a training loss."""
+    name: str
+    value: float
+    step: int = None
+    stage: str = None
+
+
+@dataclass
+class Artifact(Event):
+    """An output file was written."""
+    kind: str
+    path: str
+    stage: str = None
+
+
+# Events that arrive in large numbers and are delivered in batches
+BULK_EVENTS = (LogLine, Progress, Metric)
+
+
+def format_event(event):
+    """
+    Render an event as the log line the string callbacks used to receive.
+
+    Args:
+        event: Event
+
+    Returns:
+        String
+    """
+    if isinstance(event, StageStarted):
+        return f"=== {event.stage} ==="
+    if isinstance(event, StageFinished):
+        status = "finished" if event.success else "failed"
+        detail = f": {event.message}" if event.message else ""
+        return f"{event.stage} {status} after {event.seconds:.1f}s{detail}"
+    if isinstance(event, Progress):
+        return event.message or f"  {event.current:,}/{event.total:,}"
+    if isinstance(event, Metric):
+        step = f" (iteration {event.step:,})" if event.step is not None else ""
+        return f"  {event.name}: {event.value:.6g}{step}"
+    if isinstance(event, Artifact):
+        return f"{event.kind}: {event.path}"
+    return event.message
+
+
+class EventBus:
+    """
+    Distributes events to subscribers.
+
+    Subscribers are called with single events, or with lists of events if
+    subscribed with batched=True. Bulk events (log lines, progress,
+    metrics) are buffered and delivered together once batch_size of them
+    accumulated or flush_interval passed; any other event flushes the
+    buffer first, so every subscriber sees events in publishing order.
+    """
+
+    def __init__(self, batch_size=256, flush_interval=0.2):
+        """
+        Initialize bus.
+
+        Args:
+            batch_size: Buffered bulk events that trigger delivery
+            flush_interval: Longest time (seconds) a bulk event is held back
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._subscribers = []
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._deliver_lock = threading.RLock()
+        self._timer = None
+
+    def subscribe(self, handler, batched=False, event_types=None):
+        """
+        Register a subscriber.
+
+        Args:
+            handler: Callable receiving an event (or a list if batched)
+            batched: Deliver lists of events
+            event_types: Event classes delivered (all if None)
+
+        Returns:
+            The handler (pass it to unsubscribe)
+        """
+        with self._deliver_lock:
+            self._subscribers.append((handler, batched, tuple(event_types) if event_types else None))
+        return handler
+
+    def unsubscribe(self, handler):
+        """Remove a subscriber."""
+        with self._deliver_lock:
+            self._subscribers = [entry for entry in self._subscribers if entry[0] is not handler]
+
+    def publish(self, event):
+        """
+        Publish an event.
+
+        Args:
+            event: Event instance
+        """
+        with self._lock:
+            self._buffer.append(event)
+            due = not isinstance(event, BULK_EVENTS) or len(self._buffer) >= self.batch_size
+            if not due and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Deliver all buffered events."""
+        with self._deliver_lock:
+            with self._lock:
+                events, self._buffer = self._buffer, []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not events:
+                return
+            for handler, batched, event_types in self._subscribers:
+                selected = events if event_types is None else [e for e in events if isinstance(e, event_types)]
+                if not selected:
+                    continue
+                try:
+                    if batched:
+                        handler(selected)
+                    else:
+                        for event in selected:
+                            handler(event)
+                except Exception as e:
+                    # A broken subscriber must not stop the pipeline
+                    print(f"Event subscriber {handler!r} failed: {e}", file=sys.stderr)
+
+    def close(self):
+        """Deliver pending events (call when the run ends)."""
+        self.flush()
+
+
+class EventCallback:
+    """
+    Callback adapter publishing progress messages as events.
+
+    The pipeline sends typed events (stage starts and ends, progress)
+    through emit(); they are published as is, and the running stage is
+    tracked from them. The wrappers pass the raw output of the tools as
+    strings, which are turned into events here: "a/b" progress lines,
+    warnings and training metrics.
+    """
+
+    _PROGRESS = re.compile(r'(?<![\w/.])(\d[\d,]*)\s*/\s*(\d[\d,]*)(?![\w/.])')
+
+    def __init__(self, bus):
+        """
+        Initialize adapter.
+
+        Args:
+            bus: EventBus to publish to
+        """
+        self.bus = bus
+        self.stage = None
+        self.stage_started = None
+
+    def __call__(self, message):
+        if isinstance(message, Event):
+            self.publish(message)
+            return
+        message = str(message)
+
+        text = message.strip().lower()
+        level = 'warning' if text.startswith('warning') else \
+            'error' if text.startswith(('error', '✗')) else 'info'
+        progress = self._PROGRESS.search(message) if level == 'info' else None
+        if progress:
+            current, total = (int(value.replace(',', '')) for value in progress.groups())
+            self.bus.publish(Progress(current, total, message, stage=self.stage))
+            return
+
+        self.bus.publish(LogLine(message, level, stage=self.stage))
+        metrics = parse_metrics(message)
+        if 'iteration' in metrics:
+            for name in ('loss', 'psnr'):
+                if name in metrics:
+                    self.bus.publish(Metric(name, metrics[name], metrics['iteration'], stage=self.stage))
+
+    def publish(self, event):
+        """Publish an event, tracking stages and filling in the current stage."""
+        if isinstance(event, StageStarted):
+            self._end_stage(True)
+            self.stage, self.stage_started = event.stage, time.time()
+        elif isinstance(event, StageFinished):
+            if event.stage == self.stage:
+                self.stage = None
+        elif getattr(event, 'stage', '') is None:
+            event.stage = self.stage
+        self.bus.publish(event)
+
+    def _end_stage(self, success, message=''):
+        """Publish StageFinished for the running stage."""
+        if self.stage is not None:
+            self.bus.publish(StageFinished(self.stage, success, message, time.time() - self.stage_started))
+            self.stage = None
+
+    def finish(self, success, message=''):
+        """
+        End the run: close the running stage and deliver pending events.
+
+        Args:
+            success: Whether the run succeeded
+            message: Result message
+        """
+        self._end_stage(success, '' if success else message)
+        self.bus.flush()
+
+
+def emit(callback, event):
+    """
+    Send a typed event through a progress callback.
+
+    EventCallback publishes it directly; plain string callbacks receive
+    its formatted line.
+
+    Args:
+        callback: Progress callback (or None)
+        event: Event
+    """
+    if isinstance(callback, EventCallback):
+        callback.publish(event)
+    elif callback:
+        callback(format_event(event))
+
+
+class LogSubscriber:
+    """Batched subscriber writing events to a logger (file log)."""
+
+    def __init__(self, logger):
+        """
+        Args:
+            logger: Object with info/warning/error methods
+        """
+        self.logger = logger
+
+    def __call__(self, events):
+        for event in events:
+            if isinstance(event, Metric):
+                continue
+            level = event.level if isinstance(event, LogLine) else \
+                'error' if isinstance(event, StageFinished) and not event.success else 'info'
+            getattr(self.logger, level, self.logger.info)(format_event(event))
+
+
+class MetricsWriter:
+    """Batched subscriber appending metrics, stage timings and artifacts as JSON lines."""
+
+    EVENT_TYPES = (Metric, StageFinished, Artifact)
+
+    def __init__(self, path):
+        """
+        Args:
+            path: JSON lines file
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def __call__(self, events):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for event in events:
+                if isinstance(event, self.EVENT_TYPES):
+                    f.write(json.dumps(event.to_dict()) + '\n')
+
+
+class ConsoleSubscriber:
+    """Batched subscriber printing events for command-line runs."""
+
+    def __init__(self, stream=None, show_metrics=False):
+        """
+        Args:
+            stream: Output stream (stdout if None)
+            show_metrics: Also print Metric events (their log lines are printed anyway)
+        """
+        self.stream = stream
+        self.show_metrics = show_metrics
+
+    def __call__(self, events):
+        stream = self.stream or sys.stdout
+        lines = [format_event(event) for event in events
+                 if self.show_metrics or not isinstance(event, Metric)]
+        if lines:
+            stream.write('\n'.join(lines) + '\n')
+            stream.flush()
@@ -3,6 +3,8 @@ import os
 import subprocess
 from pathlib import Path
 
+from core.profiles import build_option_args
+
 
 class GloMAPWrapper:
     """Wrapper class for GloMAP commands."""
@@ -24,7 +26,7 @@ class GloMAPWrapper:
             else:
                 self.glomap_exe = "glomap"
     
-    def mapper(self, database_path, image_path, output_path, callback=None):
+    def mapper(self, database_path, image_path, output_path, options=None, callback=None):
         """
         Run GloMAP mapper for sparse reconstruction.
         
@@ -35,6 +37,8 @@ class GloMAPWrapper:
             database_path: Path to COLMAP database file with features
             image_path: Path to images folder
             output_path: Path to output sparse reconstruction
+            options: Extra GloMAP options (name -> value), e.g.
+                {'GlobalPositioning.max_num_iterations': 100}
             callback: Function to call with output lines
             
         Returns:
@@ -50,6 +54,7 @@ class GloMAPWrapper:
             "--image_path", str(image_path),
             "--output_path", str(output_path)
         ]
+        cmd.extend(build_option_args({}, options))
         
         return self._run_command(cmd, callback)
     
@@ -110,15 +115,21 @@ class GloMAPWrapper:
                 )
             
             output_lines = []
-            while True:
-                line = process.stdout.readline()
-                if line == '' and process.poll() is not None:
-                    break
-                if line:
-                    line = line.strip()
-                    output_lines.append(line)
-                    if callback:
-                        callback(line)
+            try:
+                while True:
+                    line = process.stdout.readline()
+                    if line == '' and process.poll() is not None:
+                        break
+                    if line:
+                        line = line.strip()
+                        output_lines.append(line)
+                        if callback:
+                            callback(line)
+            except BaseException:
+                # Cancelled from the callback: do not leave the process running
+                process.kill()
+                process.wait()
+                raise
             
             rc = process.poll()
             success = (rc == 0)
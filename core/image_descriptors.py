@@ -0,0 +1,248 @@
+"""Compact global image descriptors and near-duplicate detection."""
+import json
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff'}
+
+# Popcount lookup for Hamming distances between packed hashes
+_POPCOUNT = None
+
+
+def check_dependencies():
+    """
+    Check if NumPy and OpenCV are available.
+
+    Returns:
+        Tuple of (success, message)
+    """
+    if np is None:
+        return False, "NumPy not found. Install: pip install numpy"
+    if cv2 is None:
+        return False, "OpenCV not found. Install: pip install opencv-python"
+    return True, "NumPy and OpenCV installed"
+
+
+def list_images(image_root):
+    """
+    List images below a folder using COLMAP's naming convention.
+
+    Args:
+        image_root: Images folder (COLMAP --image_path)
+
+    Returns:
+        Sorted list of image names relative to image_root, with '/' separators
+    """
+    image_root = Path(image_root)
+    return sorted(
+        f.relative_to(image_root).as_posix()
+        for f in image_root.rglob('*')
+        if f.is_file() and f.suffix.lower() in IMAGE_EXTENSIONS
+    )
+
+
+def compute_descriptors(image_root, names, thumb_size=16, callback=None):
+    """
+    Compute thumbnail embeddings, difference hashes and sharpness for images.
+
+    Images are decoded at reduced resolution, so a full-resolution decode is
+    never needed.
+
+    Args:
+        image_root: Images folder
+        names: Image names relative to image_root
+        thumb_size: Side length of the square thumbnail embedding
+        callback: Progress callback function
+
+    Returns:
+        Dictionary with 'embeddings' (N x thumb_size^2 float32, unit norm),
+        'hashes' (N x 8 uint8 packed 64-bit dHash), 'sharpness' (N float32)
+        and 'valid' (N bool, False for unreadable images)
+    """
+    image_root = Path(image_root)
+    count = len(names)
+    embeddings = np.zeros((count, thumb_size * thumb_size), dtype=np.float32)
+    hashes = np.zeros((count, 8), dtype=np.uint8)
+    sharpness = np.zeros(count, dtype=np.float32)
+    valid = np.zeros(count, dtype=bool)
+
+    for i, name in enumerate(names):
+        gray = cv2.imread(str(image_root / name), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        if gray is None:
+            continue
+
+        sharpness[i] = cv2.Laplacian(gray, cv2.CV_32F).var()
+
+        thumb = cv2.resize(gray, (thumb_size, thumb_size),
+                           interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+        thumb -= thumb.mean()
+        norm = np.linalg.norm(thumb)
+        if norm > 0:
+            thumb /= norm
+        embeddings[i] = thumb
+
+        small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+        hashes[i] = np.packbits(small[:, 1:] > small[:, :-1])
+        valid[i] = True
+
+        if callback and (i + 1) % 500 == 0:
+            callback(f"  Described {i + 1:,}/{count:,} images")
+
+    return {
+        'embeddings': embeddings,
+        'hashes': hashes,
+        'sharpness': sharpness,
+        'valid': valid
+    }
+
+
+def hamming_distances(hash_row, hashes):
+    """
+    Hamming distances between one packed hash and many.
+
+    Args:
+        hash_row: Packed hash, shape (8,)
+        hashes: Packed hashes, shape (N, 8)
+
+    Returns:
+        Array of N distances (0-64)
+    """
+    global _POPCOUNT
+    if _POPCOUNT is None:
+        _POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+    return _POPCOUNT[np.bitwise_xor(hashes, hash_row)].sum(axis=1)
+
+
+class DuplicateFilter:
+    """Clusters near-identical images and keeps the sharpest of each cluster."""
+
+    def __init__(self, max_hash_distance=4, min_similarity=0.97, thumb_size=16):
+        """
+        Initialize duplicate filter.
+
+        Args:
+            max_hash_distance: Maximum dHash Hamming distance (of 64 bits) for duplicates
+            min_similarity: Minimum cosine similarity of thumbnail embeddings for duplicates
+            thumb_size: Side length of the thumbnail embedding
+        """
+        self.max_hash_distance = max_hash_distance
+        self.min_similarity = min_similarity
+        self.thumb_size = thumb_size
+
+    def find_clusters(self, descriptors):
+        """
+        Group images into near-duplicate clusters.
+
+        Uses leader clustering in capture (name) order: an image joins a
+        cluster only if it is close to that cluster's first image, so slow
+        pans do not chain into one giant cluster.
+
+        Args:
+            descriptors: Result of compute_descriptors
+
+        Returns:
+            List of clusters, each a list of image indices
+        """
+        hashes = descriptors['hashes']
+        embeddings = descriptors['embeddings']
+        valid = descriptors['valid']
+
+        # Leader hashes are kept in a preallocated array so each comparison
+        # is a single vectorized pass; embeddings are only compared for the
+        # few leaders whose hash is already close.
+        leader_hashes = np.empty_like(hashes)
+        leader_ids = np.empty(len(hashes), dtype=np.int64)
+        leader_cluster = []
+        num_leaders = 0
+        clusters = []
+        for i in range(len(hashes)):
+            if not valid[i]:
+                clusters.append([i])
+                continue
+
+            if num_leaders:
+                distances = hamming_distances(hashes[i], leader_hashes[:num_leaders])
+                candidates = np.flatnonzero(distances <= self.max_hash_distance)
+                if len(candidates):
+                    similarity = embeddings[leader_ids[candidates]] @ embeddings[i]
+                    matches = candidates[similarity >= self.min_similarity]
+                    if len(matches):
+                        clusters[leader_cluster[matches[-1]]].append(i)
+                        continue
+
+            leader_hashes[num_leaders] = hashes[i]
+            leader_ids[num_leaders] = i
+            leader_cluster.append(len(clusters))
+            num_leaders += 1
+            clusters.append([i])
+
+        return clusters
+
+    def run(self, image_root, image_list_path, report_path, callback=None):
+        """
+        Detect near-duplicates and write the list of images to keep.
+
+        Args:
+            image_root: Images folder
+            image_list_path: Output text file with kept image names (one per line),
+                usable as COLMAP --image_list_path
+            report_path: Output JSON report of dropped images
+            callback: Progress callback function
+
+        Returns:
+            Tuple of (success, message)
+        """
+        ok, msg = check_dependencies()
+        if not ok:
+            return False, msg
+
+        names = list_images(image_root)
+        if not names:
+            return False, "No images found"
+
+        if callback:
+            callback(f"Computing global descriptors for {len(names):,} images...")
+        descriptors = compute_descriptors(image_root, names, self.thumb_size, callback)
+
+        clusters = self.find_clusters(descriptors)
+        sharpness = descriptors['sharpness']
+
+        kept = []
+        groups = []
+        for cluster in clusters:
+            best = max(cluster, key=lambda idx: sharpness[idx])
+            kept.append(best)
+            if len(cluster) > 1:
+                groups.append({
+                    'kept': names[best],
+                    'dropped': [names[idx] for idx in cluster if idx != best]
+                })
+
+        kept.sort()
+        Path(image_list_path).write_text(
+            ''.join(names[idx] + '\n' for idx in kept), encoding='utf-8'
+        )
+
+        dropped = len(names) - len(kept)
+        report = {
+            'total_images': len(names),
+            'kept_images': len(kept),
+            'dropped_images': dropped,
+            'max_hash_distance': self.max_hash_distance,
+            'min_similarity': self.min_similarity,
+            'clusters': groups
+        }
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+        return True, f"Kept {len(kept):,} of {len(names):,} images ({dropped:,} near-duplicates dropped)"
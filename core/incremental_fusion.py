@@ -0,0 +1,398 @@
+"""Incremental stereo fusion that only re-fuses changed depth maps."""
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from core.colmap_model import read_images_binary
+from core.depth_maps import list_depth_maps
+from core.point_cloud import estimate_spacing, voxel_coordinates
+from core.ply_io import read_ply, write_ply, xyz_of
+from core.view_selection import select_source_views
+
+
+def _length_positions(data):
+    """
+    Positions of the length prefixes in the body of a .vis file.
+
+    Each list starts with its length, so the prefix positions form a chain
+    from position 0. The chain is followed from evenly spaced starting
+    points in parallel; a start inside an index list soon lands on a
+    prefix, after which it runs along the true chain. A walk stops when it
+    reaches a position another walk has visited, and the chain from 0 is
+    then pieced together from the walks it passes into.
+
+    Args:
+        data: uint32 array of the file after the point count
+
+    Returns:
+        int64 array of prefix positions in file order
+    """
+    size = len(data)
+    if not size:
+        return np.zeros(0, dtype=np.int64)
+    starts = np.arange(0, size, max(1024, 4 * int(np.sqrt(size))), dtype=np.int64)
+    owner = np.full(size, -1, dtype=np.int32)
+    owner[starts] = np.arange(len(starts))
+    # Position each walk stepped onto when it stopped (size: ran off the end)
+    joins = np.full(len(starts), size, dtype=np.int64)
+
+    walks, positions = np.arange(len(starts)), starts
+    while len(walks):
+        positions = positions + data[positions] + 1
+        inside = positions < size
+        walks, positions = walks[inside], positions[inside]
+        _, first = np.unique(positions, return_index=True)
+        fresh = np.zeros(len(positions), dtype=bool)
+        fresh[first] = True
+        fresh &= owner[positions] < 0
+        joins[walks[~fresh]] = positions[~fresh]
+        walks, positions = walks[fresh], positions[fresh]
+        owner[positions] = walks
+
+    # Visited positions grouped by walk, ascending (= step order) within each
+    visited = np.flatnonzero(owner >= 0)
+    visited = visited[np.argsort(owner[visited], kind='stable')]
+    bounds = np.searchsorted(owner[visited], np.arange(len(starts) + 1))
+    parts = []
+    walk, position = 0, 0
+    while position < size:
+        steps = visited[bounds[walk]:bounds[walk + 1]]
+        parts.append(steps[steps >= position])
+        position = joins[walk]
+        if position < size:
+            walk = owner[position]
+    return np.concatenate(parts)
+
+
+def read_visibility(path):
+    """
+    Read a COLMAP fused.ply.vis file.
+
+    Args:
+        path: Path to the .vis file
+
+    Returns:
+        Tuple of (offsets, indices) in CSR form: the images seeing point i
+        are indices[offsets[i]:offsets[i + 1]]
+    """
+    with open(path, 'rb') as f:
+        count = int(np.fromfile(f, dtype='<u8', count=1)[0])
+        data = np.fromfile(f, dtype='<u4')
+
+    positions = _length_positions(data)
+    if len(positions) != count:
+        raise ValueError(f"Corrupt visibility file {path}: expected {count} points, found {len(positions)}")
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(data[positions], out=offsets[1:])
+
+    # Drop the per-point counts, keeping only the image indices
+    is_count = np.zeros(len(data), dtype=bool)
+    is_count[positions] = True
+    return offsets, data[~is_count].astype(np.uint32)
+
+
+def write_visibility(path, offsets, indices):
+    """
+    Write a COLMAP fused.ply.vis file.
+
+    Args:
+        path: Output path
+        offsets: CSR offsets (num_points + 1)
+        indices: Image indices of all points
+    """
+    count = len(offsets) - 1
+    data = np.empty(count + len(indices), dtype='<u4')
+    count_positions = offsets[:-1] + np.arange(count)
+    is_count = np.zeros(len(data), dtype=bool)
+    is_count[count_positions] = True
+    data[count_positions] = np.diff(offsets)
+    data[~is_count] = indices
+    with open(path, 'wb') as f:
+        f.write(np.uint64(count).astype('<u8').tobytes())
+        data.tofile(f)
+
+
+def _subset_visibility(offsets, indices, keep):
+    """Restrict CSR visibility lists to the points selected by a boolean mask."""
+    lengths = np.diff(offsets)[keep]
+    point_of_entry = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    new_indices = indices[keep[point_of_entry]]
+    return np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64), new_indices
+
+
+def _points_seen_by(offsets, indices, image_indices):
+    """Boolean mask of points whose visibility includes any of the given images."""
+    flagged = np.isin(indices, np.asarray(list(image_indices), dtype=np.uint32))
+    point_of_entry = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    seen = np.zeros(len(offsets) - 1, dtype=bool)
+    seen[point_of_entry[flagged]] = True
+    return seen
+
+
+class FusionIndex:
+    """
+    Persistent fused point set with per-point visibility and voxel keys.
+
+    Stored as a single .npz file. The visibility lists record which views
+    contributed each point, so the contributions of individual views can
+    be replaced; voxel keys on a fixed grid detect points duplicated by a
+    partial re-fusion.
+    """
+
+    def __init__(self, vertices, offsets, indices, voxel_size, origin):
+        """
+        Initialize index.
+
+        Args:
+            vertices: Structured vertex array (as in fused.ply)
+            offsets: CSR visibility offsets
+            indices: CSR visibility image indices
+            voxel_size: Edge length of the voxel grid
+            origin: Grid origin (3 floats)
+        """
+        self.vertices = vertices
+        self.offsets = offsets
+        self.indices = indices
+        self.voxel_size = float(voxel_size)
+        self.origin = np.asarray(origin, dtype=np.float64)
+        self.voxel_keys = self._keys(vertices)
+
+    def _keys(self, vertices):
+        """Voxel keys of vertices on the index grid."""
+        coords = voxel_coordinates(xyz_of(vertices), self.voxel_size, self.origin)
+        # Centre the grid on the origin so points added outside the original
+        # bounds still get valid keys
+        coords = np.clip(coords + (1 << 20), 0, (1 << 21) - 1)
+        return (coords[:, 0] << 42) | (coords[:, 1] << 21) | coords[:, 2]
+
+    @classmethod
+    def from_fusion(cls, ply_path, vis_path, voxel_size=None):
+        """Build an index from a fused.ply and its .vis file."""
+        vertices = read_ply(ply_path)
+        offsets, indices = read_visibility(vis_path)
+        xyz = xyz_of(vertices)
+        if not voxel_size:
+            voxel_size = estimate_spacing(xyz) or 1e-3
+        origin = xyz.min(axis=0) if len(xyz) else np.zeros(3)
+        return cls(vertices, offsets, indices, voxel_size, origin)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved with save()."""
+        with np.load(path) as data:
+            return cls(data['vertices'], data['offsets'], data['indices'],
+                       float(data['voxel_size']), data['origin'])
+
+    def save(self, path):
+        """Save the index as .npz."""
+        temp_path = Path(path).with_suffix('.tmp.npz')
+        np.savez(temp_path, vertices=self.vertices, offsets=self.offsets, indices=self.indices,
+                 voxel_size=self.voxel_size, origin=self.origin)
+        shutil.move(str(temp_path), str(path))
+
+    def replace_views(self, image_indices, vertices, offsets, indices):
+        """
+        Replace all contributions of some views with newly fused points.
+
+        Args:
+            image_indices: Views whose depth maps changed (or were removed)
+            vertices, offsets, indices: Points of a partial re-fusion
+
+        Returns:
+            Tuple of (removed, added) point counts
+        """
+        stale = _points_seen_by(self.offsets, self.indices, image_indices)
+        kept = ~stale
+        self.vertices = self.vertices[kept]
+        self.offsets, self.indices = _subset_visibility(self.offsets, self.indices, kept)
+        self.voxel_keys = self.voxel_keys[kept]
+
+        # New points must involve a changed view (the rest is already in the
+        # index) and must not land in a voxel still occupied by kept points
+        new = _points_seen_by(offsets, indices, image_indices)
+        if new.any():
+            new &= ~np.isin(self._keys(vertices), self.voxel_keys)
+        vertices = vertices[new]
+        offsets, indices = _subset_visibility(offsets, indices, new)
+
+        self.vertices = np.concatenate([self.vertices, vertices.astype(self.vertices.dtype)])
+        self.indices = np.concatenate([self.indices, indices])
+        self.offsets = np.concatenate([self.offsets[:-1], offsets + self.offsets[-1]])
+        self.voxel_keys = np.concatenate([self.voxel_keys, self._keys(vertices)])
+        return int(stale.sum()), int(len(vertices))
+
+    def export(self, ply_path):
+        """Write the indexed points as fused.ply plus fused.ply.vis."""
+        write_ply(ply_path, self.vertices)
+        write_visibility(str(ply_path) + '.vis', self.offsets, self.indices)
+
+
+class IncrementalFusion:
+    """
+    Keeps fused.ply up to date by re-fusing only views whose depth maps changed.
+
+    Depth map versions are tracked in the project manifest. On the first
+    run (or after too many changes) the whole workspace is fused and
+    indexed; later runs fuse the changed views together with their stereo
+    source views and swap their contributions in the index.
+    """
+
+    def __init__(self, colmap_wrapper, manifest, input_type='geometric', options=None,
+                 voxel_size=None, max_changed_ratio=0.5):
+        """
+        Initialize incremental fusion.
+
+        Args:
+            colmap_wrapper: COLMAPWrapper instance
+            manifest: ProjectManifest of the project
+            input_type: Depth map type fused ('geometric' or 'photometric')
+            options: Extra StereoFusion options
+            voxel_size: Duplicate detection voxel size (point spacing if None)
+            max_changed_ratio: Fraction of changed views above which a full
+                fusion is run instead
+        """
+        self.colmap = colmap_wrapper
+        self.manifest = manifest
+        self.input_type = input_type
+        self.options = options or {}
+        self.voxel_size = voxel_size
+        self.max_changed_ratio = max_changed_ratio
+
+    def _fuse(self, workspace_path, output_path, image_names=None, callback=None):
+        """Run stereo_fusion, optionally restricted to some images via fusion.cfg."""
+        config_path = Path(workspace_path) / 'stereo' / 'fusion.cfg'
+        backup_path = config_path.with_suffix('.cfg.incremental')
+        if image_names is not None:
+            shutil.copy2(config_path, backup_path)
+            config_path.write_text(''.join(name + '\n' for name in image_names), encoding='utf-8')
+        try:
+            options = dict(self.options)
+            options.setdefault('input_type', self.input_type)
+            return self.colmap.stereo_fusion(
+                workspace_path=workspace_path,
+                output_path=output_path,
+                options=options,
+                callback=callback
+            )
+        finally:
+            if image_names is not None:
+                shutil.move(str(backup_path), str(config_path))
+
+    def _fusion_images(self, workspace_path, depth_maps):
+        """Images listed in stereo/fusion.cfg (all depth maps if it is missing)."""
+        config_path = Path(workspace_path) / 'stereo' / 'fusion.cfg'
+        if not config_path.exists():
+            return set(depth_maps)
+        return {line.strip() for line in config_path.read_text(encoding='utf-8').splitlines()
+                if line.strip()}
+
+    def _neighbours(self, workspace_path, names):
+        """Stereo source views of the given images (from patch-match.cfg)."""
+        config_path = Path(workspace_path) / 'stereo' / 'patch-match.cfg'
+        lines = [line.strip() for line in config_path.read_text(encoding='utf-8').splitlines()]
+        sources = {}
+        for reference, line in zip(lines[0::2], lines[1::2]):
+            sources[reference] = line
+        neighbours = set()
+        automatic = []
+        for name in names:
+            line = sources.get(name, '__auto__')
+            if line.startswith('__'):
+                automatic.append(name)
+            else:
+                neighbours.update(source.strip() for source in line.split(',') if source.strip())
+        if automatic:
+            selection = select_source_views(Path(workspace_path) / 'sparse')
+            for name in automatic:
+                neighbours.update(selection.get(name, []))
+        return neighbours
+
+    def run(self, workspace_path, output_path, callback=None):
+        """
+        Update the fused point cloud.
+
+        Only images listed in stereo/fusion.cfg are fused, so the depth map
+        filter applies to partial re-fusions too; images entering or leaving
+        that list are re-fused like changed depth maps.
+
+        Args:
+            workspace_path: Dense workspace (after patch_match_stereo)
+            output_path: fused.ply to write
+            callback: Progress callback function
+
+        Returns:
+            Tuple of (success, message)
+        """
+        workspace_path = Path(workspace_path)
+        index_path = workspace_path / 'fusion_index.npz'
+        state = self.manifest.section('fusion')
+
+        depth_maps = list_depth_maps(workspace_path, self.input_type)
+        if not depth_maps:
+            return False, f"No {self.input_type} depth maps found"
+        changed, removed, records = self.manifest.changed_files('depth_maps', depth_maps)
+        images = self._fusion_images(workspace_path, depth_maps)
+        # Images the depth map filter added to or dropped from fusion.cfg
+        toggled = images ^ set(state.get('images', images))
+
+        settings = json.dumps({'input_type': self.input_type, 'options': self.options}, sort_keys=True)
+        full = (not index_path.exists() or not Path(output_path).exists()
+                or state.get('settings') != settings or 'images' not in state
+                or len(changed) + len(removed) + len(toggled) > self.max_changed_ratio * len(depth_maps))
+
+        if not full and not changed and not removed and not toggled:
+            return True, "Fused point cloud is up to date (no depth map changed)"
+
+        if full:
+            if callback:
+                callback(f"Fusing all {len(depth_maps):,} depth maps...")
+            success, msg = self._fuse(workspace_path, output_path, callback=callback)
+            vis_path = Path(str(output_path) + '.vis')
+            if not success:
+                return False, msg
+            if not vis_path.exists():
+                return False, "Fusion did not write a visibility file (fused.ply.vis)"
+            index = FusionIndex.from_fusion(output_path, vis_path, self.voxel_size)
+            index.save(index_path)
+            message = f"Fused {len(index.vertices):,} points from {len(depth_maps):,} depth maps"
+        else:
+            # Visibility indices refer to the image order of the dense model
+            names = [image['name'] for image in
+                     read_images_binary(workspace_path / 'sparse' / 'images.bin').values()]
+            image_index = {name: i for i, name in enumerate(names)}
+            refused = set(changed) | toggled
+            updated = refused | set(removed)
+            updated_indices = {image_index[name] for name in updated if name in image_index}
+
+            subset = sorted((refused | self._neighbours(workspace_path, refused)) & set(depth_maps) & images)
+            if callback:
+                callback(f"Re-fusing {len(refused):,} changed depth maps "
+                         f"({len(subset):,} views with neighbours, {len(removed):,} removed)...")
+
+            delta_path = workspace_path / 'fused_delta.ply'
+            index = FusionIndex.load(index_path)
+            if subset:
+                success, msg = self._fuse(workspace_path, delta_path, subset, callback=callback)
+                if not success:
+                    return False, msg
+                vertices = read_ply(delta_path)
+                offsets, indices = read_visibility(str(delta_path) + '.vis')
+            else:
+                vertices = index.vertices[:0]
+                offsets, indices = np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.uint32)
+
+            dropped, added = index.replace_views(updated_indices, vertices, offsets, indices)
+            index.export(output_path)
+            index.save(index_path)
+            for path in (delta_path, Path(str(delta_path) + '.vis')):
+                if path.exists():
+                    path.unlink()
+            message = (f"Updated fused cloud: replaced {dropped:,} points with {added:,} "
+                       f"({len(index.vertices):,} total)")
+
+        state['settings'] = settings
+        state['images'] = sorted(images)
+        self.manifest.record_files('depth_maps', records)
+        return True, message
@@ -0,0 +1,248 @@
+"""Background jobs on a shared executor, with progress events and cancellation."""
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+
+from core.events import EventBus, EventCallback, Progress
+
+
+class JobCancelled(BaseException):
+    """
+    Raised inside a job when it was cancelled.
+
+    Derives from BaseException so the 'except Exception' handlers of the
+    wrappers and the pipeline let it through; the wrappers kill their
+    running process on the way out.
+    """
+
+
+class JobResult:
+    """Outcome of a job: success flag, message and optional data (e.g. paths)."""
+
+    def __init__(self, success, message, data=None, values=None):
+        self.success = success
+        self.message = message
+        self.data = data
+        self.values = values if values is not None else (success, message, data)
+
+    @classmethod
+    def from_value(cls, value):
+        """
+        Normalize what a job function returned.
+
+        Args:
+            value: (success, message) or (success, message, data) tuple,
+                JobResult, or any other value (taken as successful data)
+
+        Returns:
+            JobResult
+        """
+        if isinstance(value, JobResult):
+            return value
+        if isinstance(value, tuple) and len(value) in (2, 3) and isinstance(value[0], bool):
+            return cls(value[0], value[1], value[2] if len(value) == 3 else None, values=value)
+        return cls(True, "Completed", value)
+
+    def __repr__(self):
+        return f"JobResult(success={self.success!r}, message={self.message!r})"
+
+
+class _JobCallback(EventCallback):
+    """Event callback that stops its job at the next message once cancelled."""
+
+    def __init__(self, job):
+        super().__init__(job.events)
+        self.job = job
+
+    def __call__(self, message):
+        if self.job.cancel_requested:
+            raise JobCancelled(self.job.name)
+        super().__call__(message)
+
+
+class Job:
+    """
+    A unit of background work.
+
+    The function is called with a progress callback (an EventCallback
+    publishing to job.events) and returns a (success, message[, data])
+    tuple. Jobs can depend on other jobs: they start once all dependencies
+    succeeded and fail without running if one did not.
+    """
+
+    def __init__(self, name, func, depends_on=()):
+        """
+        Initialize job.
+
+        Args:
+            name: Display name
+            func: Callable taking the progress callback
+            depends_on: Jobs that must succeed first
+        """
+        self.name = name
+        self.func = func
+        self.depends_on = list(depends_on)
+        self.events = EventBus()
+        self.future = Future()
+        self.state = 'pending'
+        self.progress = 0.0
+        self._cancel = threading.Event()
+        self.events.subscribe(self._track_progress, event_types=(Progress,))
+
+    def _track_progress(self, event):
+        self.progress = event.fraction
+
+    @property
+    def cancel_requested(self):
+        """Whether cancel() was called."""
+        return self._cancel.is_set()
+
+    def subscribe(self, handler, batched=False, event_types=None):
+        """Subscribe to the job's events (see EventBus.subscribe)."""
+        return self.events.subscribe(handler, batched=batched, event_types=event_types)
+
+    def cancel(self):
+        """
+        Cancel the job.
+
+        A pending job never starts; a running one stops at its next
+        progress message.
+        """
+        self._cancel.set()
+        if self.future.cancel():
+            self.state = 'cancelled'
+
+    def done(self):
+        """Whether the job finished (in any way)."""
+        return self.future.done()
+
+    def result(self, timeout=None):
+        """
+        Wait for the job.
+
+        Args:
+            timeout: Seconds to wait (forever if None)
+
+        Returns:
+            JobResult (failed for errors and cancellation)
+        """
+        try:
+            return self.future.result(timeout)
+        except CancelledError:
+            return JobResult(False, f"{self.name} cancelled")
+
+    def _run(self):
+        """Execute the job (in an executor thread)."""
+        if not self.future.set_running_or_notify_cancel():
+            return
+        self.state = 'running'
+        callback = _JobCallback(self)
+        try:
+            result = JobResult.from_value(self.func(callback))
+            self.state = 'done' if result.success else 'failed'
+        except JobCancelled:
+            result = JobResult(False, f"{self.name} cancelled")
+            self.state = 'cancelled'
+        except Exception as e:
+            result = JobResult(False, f"{self.name} failed: {e}")
+            self.state = 'failed'
+        callback.finish(result.success, result.message)
+        self.events.close()
+        self.future.set_result(result)
+
+    def __repr__(self):
+        return f"Job({self.name!r}, state={self.state!r})"
+
+
+class JobRunner:
+    """
+    Runs jobs on a shared thread pool.
+
+    Heavy stages mostly wait on external processes (COLMAP, GloMAP,
+    3DGUT), so threads are enough; max_workers bounds how many run at once.
+    """
+
+    def __init__(self, max_workers=1):
+        """
+        Initialize runner.
+
+        Args:
+            max_workers: Jobs running at the same time
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.jobs = []
+        self._lock = threading.Lock()
+
+    def submit(self, job):
+        """
+        Queue a job; it starts when its dependencies have succeeded.
+
+        Args:
+            job: Job
+
+        Returns:
+            The job
+        """
+        with self._lock:
+            self.jobs.append(job)
+        pending = [dependency for dependency in job.depends_on if not dependency.done()]
+        if not pending:
+            self._start(job)
+            return job
+
+        remaining = [len(pending)]
+        lock = threading.Lock()
+
+        def dependency_done(_):
+            with lock:
+                remaining[0] -= 1
+                ready = remaining[0] == 0
+            if ready:
+                self._start(job)
+
+        for dependency in pending:
+            dependency.future.add_done_callback(dependency_done)
+        return job
+
+    def submit_graph(self, jobs):
+        """
+        Queue several jobs (dependencies are honoured whatever the order).
+
+        Args:
+            jobs: Iterable of Jobs
+
+        Returns:
+            List of the jobs
+        """
+        return [self.submit(job) for job in jobs]
+
+    def _start(self, job):
+        """Start a job whose dependencies are done, or fail it."""
+        failed = [dependency.name for dependency in job.depends_on if not dependency.result().success]
+        if failed:
+            if job.future.set_running_or_notify_cancel():
+                job.state = 'failed'
+                job.future.set_result(JobResult(False, f"{job.name} skipped: {', '.join(failed)} did not succeed"))
+            return
+        if job.future.cancelled():
+            return
+        self.executor.submit(job._run)
+
+    def cancel_all(self):
+        """Cancel every job that has not finished."""
+        with self._lock:
+            jobs = list(self.jobs)
+        for job in jobs:
+            if not job.done():
+                job.cancel()
+
+    def shutdown(self, wait=True, cancel=True):
+        """
+        Stop the runner.
+
+        Args:
+            wait: Wait for running jobs
+            cancel: Cancel unfinished jobs first
+        """
+        if cancel:
+            self.cancel_all()
+        self.executor.shutdown(wait=wait)
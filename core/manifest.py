@@ -0,0 +1,125 @@
+"""Project manifest (project.json) tracking processing state across runs."""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+
+def file_fingerprint(path):
+    """
+    Cheap fingerprint of a file version.
+
+    Args:
+        path: File path
+
+    Returns:
+        Dictionary with 'size' and 'mtime_ns'
+    """
+    info = Path(path).stat()
+    return {'size': info.st_size, 'mtime_ns': info.st_mtime_ns}
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """
+    Content hash of a file.
+
+    Args:
+        path: File path
+        chunk_size: Bytes read per chunk
+
+    Returns:
+        Hex digest (BLAKE2b, 128 bit)
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ProjectManifest:
+    """
+    JSON manifest stored as project.json in the project folder.
+
+    Each pipeline component keeps its state in its own top-level section.
+    Writes go through a temporary file, so an interrupted run never leaves
+    a truncated manifest behind.
+    """
+
+    FILENAME = 'project.json'
+
+    def __init__(self, project_path):
+        """
+        Load the manifest of a project (empty if it does not exist yet).
+
+        Args:
+            project_path: Project root folder
+        """
+        self.path = Path(project_path) / self.FILENAME
+        self.data = {}
+        if self.path.exists():
+            try:
+                self.data = json.loads(self.path.read_text(encoding='utf-8'))
+            except ValueError:
+                self.data = {}
+
+    def section(self, name):
+        """
+        Get a section, creating it if needed.
+
+        Args:
+            name: Section name
+
+        Returns:
+            Dictionary stored in the manifest (modify, then call save)
+        """
+        return self.data.setdefault(name, {})
+
+    def save(self):
+        """Write the manifest atomically."""
+        temp_path = self.path.with_suffix('.json.tmp')
+        temp_path.write_text(json.dumps(self.data, indent=2), encoding='utf-8')
+        os.replace(temp_path, self.path)
+
+    def changed_files(self, section_name, files):
+        """
+        Find files that differ from the versions recorded in a section.
+
+        Size and modification time are compared first; only files whose
+        fingerprint changed are hashed, so touched but identical files are
+        not reported.
+
+        Args:
+            section_name: Section holding the recorded versions
+            files: Dictionary of key -> path of the current files
+
+        Returns:
+            Tuple of (changed keys, removed keys, current records); pass the
+            records to record_files once the files have been processed
+        """
+        recorded = self.section(section_name)
+        changed = []
+        records = {}
+        for key, path in files.items():
+            record = file_fingerprint(path)
+            previous = recorded.get(key)
+            if previous and all(previous.get(k) == record[k] for k in ('size', 'mtime_ns')):
+                record['hash'] = previous.get('hash')
+            else:
+                record['hash'] = file_hash(path)
+                if not previous or previous.get('hash') != record['hash']:
+                    changed.append(key)
+            records[key] = record
+        removed = [key for key in recorded if key not in files]
+        return changed, removed, records
+
+    def record_files(self, section_name, records):
+        """
+        Replace the recorded file versions of a section.
+
+        Args:
+            section_name: Section name
+            records: Records returned by changed_files
+        """
+        self.data[section_name] = records
+        self.save()
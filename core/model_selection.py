@@ -0,0 +1,251 @@
+"""Post-mapping handling of multiple sparse sub-models."""
+import json
+import os
+import shutil
+from pathlib import Path
+
+from core.colmap_model import is_model_dir, read_images_binary, read_model_counts
+
+
+def index_models(sparse_root):
+    """
+    Index all numbered sub-models below a sparse folder.
+
+    Args:
+        sparse_root: Folder containing 0/, 1/, ... sub-models
+
+    Returns:
+        List of dicts with 'path', 'num_images' and 'num_points', best first
+        (most registered images, then most points)
+    """
+    models = []
+    for path in Path(sparse_root).iterdir():
+        if path.is_dir() and path.name.isdigit() and is_model_dir(path):
+            num_images, num_points = read_model_counts(path)
+            models.append({'path': path, 'num_images': num_images, 'num_points': num_points})
+    models.sort(key=lambda m: (m['num_images'], m['num_points']), reverse=True)
+    return models
+
+
+def flatten_nested_models(sparse_root):
+    """
+    Move sub-models nested one level too deep (sparse/0/0, sparse/0/1, ...) up.
+
+    Projects whose COLMAP mapper wrote into sparse/0 instead of sparse/
+    have this layout; the moved models get the next free numbers.
+
+    Args:
+        sparse_root: Folder containing 0/, 1/, ... sub-models
+
+    Returns:
+        Number of models moved
+    """
+    sparse_root = Path(sparse_root)
+    if not sparse_root.exists():
+        return 0
+    moved = 0
+    for parent in sorted(p for p in sparse_root.iterdir() if p.is_dir() and p.name.isdigit()):
+        if is_model_dir(parent):
+            continue
+        nested = sorted((p for p in parent.iterdir() if p.is_dir() and p.name.isdigit() and is_model_dir(p)),
+                        key=lambda p: int(p.name))
+        for model in nested:
+            used = [int(p.name) for p in sparse_root.iterdir() if p.name.isdigit()]
+            os.replace(model, sparse_root / str(max(used) + 1))
+            moved += 1
+        if nested and not any(parent.iterdir()):
+            parent.rmdir()
+    return moved
+
+
+def archive_previous_models(sparse_root, archive_name='previous'):
+    """
+    Move the results of an earlier mapping run out of the way.
+
+    Numbered sub-models, the merged/ archive and models.json are moved to
+    sparse_root/<archive_name> (replacing an older archive), so a new
+    mapper run is never ranked or merged together with stale fragments.
+
+    Args:
+        sparse_root: Folder containing 0/, 1/, ... sub-models
+        archive_name: Folder receiving the previous run's models
+
+    Returns:
+        Number of entries moved
+    """
+    sparse_root = Path(sparse_root)
+    if not sparse_root.exists():
+        return 0
+    entries = [p for p in sparse_root.iterdir()
+               if (p.is_dir() and (p.name.isdigit() or p.name == SparseModelSelector.ARCHIVE_DIR)
+                   and any(p.iterdir()))
+               or p.name == 'models.json']
+    if not entries:
+        return 0
+    archive = sparse_root / archive_name
+    if archive.exists():
+        shutil.rmtree(archive)
+    archive.mkdir()
+    for entry in entries:
+        os.replace(entry, archive / entry.name)
+    return len(entries)
+
+
+def _read_image_names(model_path):
+    """Return the set of registered image names of a model."""
+    return {image['name'] for image in read_images_binary(Path(model_path) / 'images.bin').values()}
+
+
+class SparseModelSelector:
+    """
+    Picks (or builds by merging) the best sparse model and promotes it to sparse/0.
+
+    Downstream steps (export, dense reconstruction, 3DGUT) all read
+    sparse/0, so promoting the best model there keeps them from working
+    on a fragment. Sub-models that went into a merge are moved to
+    sparse/merged/, so running the selection again does not merge them a
+    second time.
+    """
+
+    ARCHIVE_DIR = 'merged'
+
+    def __init__(self, colmap_wrapper=None, merge_overlapping=True, min_shared_images=3):
+        """
+        Initialize selector.
+
+        Args:
+            colmap_wrapper: COLMAPWrapper used for model_merger (merging is
+                skipped if None)
+            merge_overlapping: Try to merge sub-models that share images with the best one
+            min_shared_images: Shared registered images required to attempt a merge
+        """
+        self.colmap = colmap_wrapper
+        self.merge_overlapping = merge_overlapping
+        self.min_shared_images = min_shared_images
+
+    def run(self, sparse_root, total_images=None, callback=None):
+        """
+        Rank sub-models, merge overlapping ones and promote the best to sparse/0.
+
+        A models.json index describing every sub-model is written to sparse_root.
+
+        Args:
+            sparse_root: Folder containing 0/, 1/, ... sub-models
+            total_images: Number of input images, used to report coverage
+            callback: Progress callback function
+
+        Returns:
+            Tuple of (success, message)
+        """
+        sparse_root = Path(sparse_root)
+        if flatten_nested_models(sparse_root) and callback:
+            callback("Moved sub-models nested in sparse/0 up one level")
+        models = index_models(sparse_root)
+        if not models:
+            return False, "No sparse model found"
+
+        if callback:
+            for model in models:
+                callback(f"  Model {model['path'].name}: {model['num_images']:,} images, "
+                         f"{model['num_points']:,} points")
+
+        index_path = sparse_root / 'models.json'
+        previous = {}
+        if index_path.exists():
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    previous = json.load(f)
+            except (OSError, ValueError):
+                previous = {}
+
+        best = models[0]
+        merged = []
+        if self.merge_overlapping and self.colmap and len(models) > 1:
+            best, merged = self._merge_into_best(sparse_root, models, callback)
+            if merged:
+                self._archive_sources(sparse_root, merged)
+
+        if best['path'] != sparse_root / '0':
+            self._promote(sparse_root, best['path'])
+            if callback:
+                callback(f"Promoted best model ({best['num_images']:,} images) to sparse/0")
+            models = index_models(sparse_root)
+
+        index = {
+            'selected': '0',
+            # Keep the record of an earlier merge when nothing was merged now
+            'merged_from': merged or previous.get('merged_from', []),
+            'total_images': total_images,
+            'models': [{'name': m['path'].name, 'num_images': m['num_images'],
+                        'num_points': m['num_points']} for m in models]
+        }
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+
+        selected = models[0]
+        message = f"Selected model with {selected['num_images']:,} images and {selected['num_points']:,} points"
+        if total_images:
+            coverage = selected['num_images'] / total_images
+            message += f" ({coverage:.0%} of input images)"
+            if coverage < 0.5 and callback:
+                callback("Warning: The best model registers less than half of the images")
+        return True, message
+
+    def _merge_into_best(self, sparse_root, models, callback=None):
+        """Merge sub-models sharing images with the best model into a new model folder."""
+        best = models[0]
+        best_names = _read_image_names(best['path'])
+        merged_from = [best['path'].name]
+        current = best['path']
+        work_dir = sparse_root / 'merge_work'
+
+        for step, model in enumerate(models[1:]):
+            shared = len(best_names & _read_image_names(model['path']))
+            if shared < self.min_shared_images:
+                continue
+
+            output = work_dir / f"step_{step:03d}"
+            success, msg = self.colmap.model_merger(current, model['path'], output, callback=callback)
+            if success and is_model_dir(output):
+                current = output
+                best_names |= _read_image_names(model['path'])
+                merged_from.append(model['path'].name)
+                if callback:
+                    callback(f"Merged model {model['path'].name} ({shared} shared images)")
+            elif callback:
+                callback(f"Warning: Could not merge model {model['path'].name}: {msg}")
+
+        if current == best['path']:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            return best, []
+
+        # Store the merged result as a new numbered model
+        next_index = max(int(m['path'].name) for m in models) + 1
+        merged_path = sparse_root / str(next_index)
+        shutil.move(str(current), str(merged_path))
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+        num_images, num_points = read_model_counts(merged_path)
+        return {'path': merged_path, 'num_images': num_images, 'num_points': num_points}, merged_from
+
+    def _archive_sources(self, sparse_root, names):
+        """Move merged source sub-models out of the numbered model folders."""
+        archive = sparse_root / self.ARCHIVE_DIR
+        archive.mkdir(exist_ok=True)
+        for name in names:
+            target = archive / name
+            if target.exists():
+                shutil.rmtree(target)
+            os.replace(sparse_root / name, target)
+
+    @staticmethod
+    def _promote(sparse_root, model_path):
+        """Swap a model folder with sparse/0."""
+        target = sparse_root / '0'
+        swap = sparse_root / '_swap'
+        if target.exists():
+            os.replace(target, swap)
+            os.replace(model_path, target)
+            os.replace(swap, model_path)
+        else:
+            os.replace(model_path, target)
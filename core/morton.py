@@ -0,0 +1,357 @@
+"""Morton (Z-curve) ordering of point clouds with a block index sidecar."""
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from core.incremental_fusion import read_visibility, write_visibility
+from core.ply_io import read_ply, read_ply_header, write_ply_header, xyz_of
+
+
+# Bits per axis of a 64-bit Morton code
+MORTON_BITS = 21
+
+# Points per index block aimed for when choosing the block level
+DEFAULT_BLOCK_POINTS = 65536
+
+
+def _spread_bits(values):
+    """Insert two zero bits between each of the low 21 bits of uint64 values."""
+    x = values & np.uint64(0x1fffff)
+    x = (x | (x << np.uint64(32))) & np.uint64(0x1f00000000ffff)
+    x = (x | (x << np.uint64(16))) & np.uint64(0x1f0000ff0000ff)
+    x = (x | (x << np.uint64(8))) & np.uint64(0x100f00f00f00f00f)
+    x = (x | (x << np.uint64(4))) & np.uint64(0x10c30c30c30c30c3)
+    x = (x | (x << np.uint64(2))) & np.uint64(0x1249249249249249)
+    return x
+
+
+def morton_codes(xyz, origin, cell_size, bits=MORTON_BITS):
+    """
+    Compute 3D Morton codes.
+
+    Args:
+        xyz: N x 3 positions
+        origin: Minimum corner of the quantization grid
+        cell_size: Grid cell edge length (equal on all axes)
+        bits: Bits per axis (at most 21)
+
+    Returns:
+        Length N uint64 array
+    """
+    coords = np.floor((np.asarray(xyz, dtype=np.float64) - origin) / cell_size)
+    coords = np.clip(coords, 0, (1 << bits) - 1).astype(np.uint64)
+    return (_spread_bits(coords[:, 0]) << np.uint64(2)) \
+        | (_spread_bits(coords[:, 1]) << np.uint64(1)) \
+        | _spread_bits(coords[:, 2])
+
+
+def morton_grid(bounds_min, bounds_max, bits=MORTON_BITS):
+    """
+    Quantization grid covering a bounding box with cubic cells.
+
+    Args:
+        bounds_min: Minimum corner
+        bounds_max: Maximum corner
+        bits: Bits per axis
+
+    Returns:
+        Tuple of (origin, cell_size)
+    """
+    bounds_min = np.asarray(bounds_min, dtype=np.float64)
+    extent = float(np.max(np.asarray(bounds_max, dtype=np.float64) - bounds_min))
+    return bounds_min, max(extent, 1e-12) / ((1 << bits) - 1)
+
+
+def morton_order(xyz, bits=MORTON_BITS):
+    """
+    Permutation sorting points along the Z-curve of their bounding box.
+
+    Args:
+        xyz: N x 3 positions
+
+    Returns:
+        Index array (stable for points in the same cell)
+    """
+    xyz = np.asarray(xyz, dtype=np.float64)
+    if not len(xyz):
+        return np.zeros(0, dtype=np.int64)
+    origin, cell_size = morton_grid(xyz.min(axis=0), xyz.max(axis=0), bits)
+    return np.argsort(morton_codes(xyz, origin, cell_size, bits), kind='stable')
+
+
+def _chunks(count, chunk_size):
+    """Yield (start, stop) ranges covering count items."""
+    for start in range(0, count, chunk_size):
+        yield start, min(start + chunk_size, count)
+
+
+def _bounds(vertices, chunk_size):
+    """Bounding box of a (possibly memory-mapped) vertex array, read in chunks."""
+    bounds_min = np.full(3, np.inf)
+    bounds_max = np.full(3, -np.inf)
+    for start, stop in _chunks(len(vertices), chunk_size):
+        xyz = xyz_of(vertices[start:stop])
+        bounds_min = np.minimum(bounds_min, xyz.min(axis=0))
+        bounds_max = np.maximum(bounds_max, xyz.max(axis=0))
+    return bounds_min, bounds_max
+
+
+def _permute_visibility(vis_path, order):
+    """Reorder a fused.ply.vis file to a new point order."""
+    offsets, indices = read_visibility(vis_path)
+    lengths = np.diff(offsets)[order]
+    new_offsets = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    gather = np.repeat(offsets[:-1][order] - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+    write_visibility(vis_path, new_offsets, indices[gather])
+
+
+class MortonIndex:
+    """
+    Block index of a Morton-sorted PLY file, stored next to it as <file>.morton.json.
+
+    Every block is a contiguous run of vertices sharing the same octree
+    node at a fixed level, recorded with its first vertex, vertex count,
+    Morton code range and exact bounding box. Range queries select the
+    blocks overlapping a box and seek straight to their bytes in the
+    binary body.
+    """
+
+    SUFFIX = '.morton.json'
+
+    def __init__(self, bits, origin, cell_size, level, data_start, record_size, blocks):
+        """
+        Initialize index.
+
+        Args:
+            bits: Bits per axis of the Morton codes
+            origin: Quantization grid origin
+            cell_size: Quantization cell size
+            level: Octree level of the blocks
+            data_start: Byte offset of the vertex data in the PLY file
+            record_size: Bytes per vertex
+            blocks: List of [first code, last code, start, count, min xyz, max xyz]
+        """
+        self.bits = bits
+        self.origin = np.asarray(origin, dtype=np.float64)
+        self.cell_size = cell_size
+        self.level = level
+        self.data_start = data_start
+        self.record_size = record_size
+        self.blocks = blocks
+
+    @classmethod
+    def sidecar_path(cls, ply_path):
+        """Path of the index sidecar of a PLY file."""
+        ply_path = Path(ply_path)
+        return ply_path.with_name(ply_path.name + cls.SUFFIX)
+
+    @classmethod
+    def build(cls, ply_path, bits=MORTON_BITS, block_points=DEFAULT_BLOCK_POINTS, chunk_size=1 << 20):
+        """
+        Index a Morton-sorted binary PLY file.
+
+        Args:
+            ply_path: Sorted PLY file
+            bits: Bits per axis of the Morton codes
+            block_points: Target vertices per block
+            chunk_size: Vertices read per chunk
+
+        Returns:
+            MortonIndex
+
+        Raises:
+            ValueError: If the file is ASCII or not in Morton order
+        """
+        header = read_ply_header(ply_path)
+        if header['format'] == 'ascii':
+            raise ValueError("Morton index requires a binary PLY file")
+        vertices = read_ply(ply_path, mmap=True)
+        count = len(vertices)
+        origin, cell_size = morton_grid(*_bounds(vertices, chunk_size), bits=bits)
+        level = cls._block_level(vertices, origin, cell_size, bits, block_points)
+        shift = np.uint64(3 * (bits - level))
+
+        blocks = []
+        previous = None
+        for start, stop in _chunks(count, chunk_size):
+            xyz = xyz_of(vertices[start:stop])
+            codes = morton_codes(xyz, origin, cell_size, bits)
+            if np.any(codes[1:] < codes[:-1]) or (previous is not None and codes[0] < previous):
+                raise ValueError(f"{ply_path} is not in Morton order")
+            previous = codes[-1]
+
+            prefixes = codes >> shift
+            starts = np.flatnonzero(np.r_[True, prefixes[1:] != prefixes[:-1]])
+            ends = np.r_[starts[1:], len(codes)]
+            mins = np.minimum.reduceat(xyz, starts, axis=0)
+            maxs = np.maximum.reduceat(xyz, starts, axis=0)
+            for i, (first, last) in enumerate(zip(starts, ends)):
+                if blocks and blocks[-1][0] >> int(shift) == int(prefixes[first]):
+                    # Block continues from the previous chunk
+                    block = blocks[-1]
+                    block[1] = int(codes[last - 1])
+                    block[3] += int(last - first)
+                    block[4] = np.minimum(block[4], mins[i]).tolist()
+                    block[5] = np.maximum(block[5], maxs[i]).tolist()
+                else:
+                    blocks.append([int(codes[first]), int(codes[last - 1]), start + int(first),
+                                   int(last - first), mins[i].tolist(), maxs[i].tolist()])
+
+        return cls(bits, origin, cell_size, level, header['data_start'], vertices.dtype.itemsize, blocks)
+
+    @staticmethod
+    def _block_level(vertices, origin, cell_size, bits, block_points, sample_size=200000):
+        """Shallowest octree level with enough occupied nodes for the target block size."""
+        count = len(vertices)
+        wanted = count / block_points
+        if wanted <= 1:
+            return 0
+        sample = vertices[::max(1, count // sample_size)]
+        codes = morton_codes(xyz_of(sample), origin, cell_size, bits)
+        for level in range(1, bits + 1):
+            if len(np.unique(codes >> np.uint64(3 * (bits - level)))) >= wanted:
+                return level
+        return bits
+
+    def save(self, ply_path):
+        """Write the sidecar of a PLY file."""
+        data = {
+            'bits': self.bits,
+            'origin': self.origin.tolist(),
+            'cell_size': self.cell_size,
+            'level': self.level,
+            'data_start': self.data_start,
+            'record_size': self.record_size,
+            'blocks': self.blocks
+        }
+        self.sidecar_path(ply_path).write_text(json.dumps(data), encoding='utf-8')
+
+    @classmethod
+    def load(cls, ply_path):
+        """
+        Load the sidecar of a PLY file.
+
+        Args:
+            ply_path: Indexed PLY file
+
+        Returns:
+            MortonIndex
+        """
+        data = json.loads(cls.sidecar_path(ply_path).read_text(encoding='utf-8'))
+        return cls(data['bits'], data['origin'], data['cell_size'], data['level'],
+                   data['data_start'], data['record_size'], data['blocks'])
+
+    def ranges(self, box_min, box_max):
+        """
+        Vertex ranges whose blocks overlap an axis-aligned box.
+
+        Args:
+            box_min: Minimum corner of the query box
+            box_max: Maximum corner of the query box
+
+        Returns:
+            List of (first vertex, count), adjacent blocks merged
+        """
+        box_min = np.asarray(box_min, dtype=np.float64)
+        box_max = np.asarray(box_max, dtype=np.float64)
+        ranges = []
+        for _, _, start, count, block_min, block_max in self.blocks:
+            if np.any(np.asarray(block_max) < box_min) or np.any(np.asarray(block_min) > box_max):
+                continue
+            if ranges and ranges[-1][0] + ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], ranges[-1][1] + count)
+            else:
+                ranges.append((start, count))
+        return ranges
+
+    def read_box(self, ply_path, box_min, box_max):
+        """
+        Read the vertices inside an axis-aligned box.
+
+        Only the pages of the overlapping blocks are read from disk.
+
+        Args:
+            ply_path: Indexed PLY file
+            box_min: Minimum corner of the query box
+            box_max: Maximum corner of the query box
+
+        Returns:
+            Structured vertex array
+        """
+        mapped = read_ply(ply_path, mmap=True)
+        parts = [np.array(mapped[start:start + count]) for start, count in self.ranges(box_min, box_max)]
+        if not parts:
+            return np.zeros(0, dtype=mapped.dtype)
+        vertices = np.concatenate(parts)
+        xyz = xyz_of(vertices)
+        inside = np.all((xyz >= box_min) & (xyz <= box_max), axis=1)
+        return vertices[inside]
+
+
+def sort_ply_file(input_path, output_path=None, bits=MORTON_BITS, block_points=DEFAULT_BLOCK_POINTS,
+                  chunk_size=1 << 20, callback=None):
+    """
+    Reorder a PLY file along the Z-curve and write its block index.
+
+    The input is memory-mapped and written out chunk by chunk, so only
+    the codes and the permutation (16 bytes per point) are held in memory.
+    A COLMAP visibility file (<file>.vis) next to the input is reordered
+    along with it. Files already in Morton order are only indexed.
+
+    Args:
+        input_path: Input PLY file
+        output_path: Output PLY file (sorts in place if None)
+        bits: Bits per axis of the Morton codes
+        block_points: Target vertices per index block
+        chunk_size: Vertices processed per chunk
+        callback: Progress callback function
+
+    Returns:
+        Tuple of (success, message)
+    """
+    input_path = Path(input_path)
+    output_path = Path(output_path) if output_path else input_path
+    if not input_path.exists():
+        return False, f"Point cloud not found: {input_path}"
+
+    header = read_ply_header(input_path)
+    vertices = read_ply(input_path, mmap=True)
+    count = len(vertices)
+    dtype = np.dtype([(name, '<' + vertices.dtype[name].base.str[1:]) for name in vertices.dtype.names])
+
+    origin, cell_size = morton_grid(*_bounds(vertices, chunk_size), bits=bits) if count else (np.zeros(3), 1.0)
+    codes = np.empty(count, dtype=np.uint64)
+    for start, stop in _chunks(count, chunk_size):
+        codes[start:stop] = morton_codes(xyz_of(vertices[start:stop]), origin, cell_size, bits)
+    order = np.argsort(codes, kind='stable')
+    del codes
+
+    already_sorted = header['format'] != 'ascii' and np.array_equal(order, np.arange(count))
+    if not already_sorted or output_path != input_path:
+        temp_path = output_path.with_name(output_path.name + '.tmp')
+        with open(temp_path, 'wb') as f:
+            write_ply_header(f, dtype, count, header['comments'])
+            for start, stop in _chunks(count, chunk_size):
+                np.ascontiguousarray(vertices[order[start:stop]], dtype=dtype).tofile(f)
+        del vertices
+        os.replace(temp_path, output_path)
+
+        vis_path = input_path.with_name(input_path.name + '.vis')
+        if vis_path.exists():
+            output_vis = output_path.with_name(output_path.name + '.vis')
+            if output_vis != vis_path:
+                output_vis.write_bytes(vis_path.read_bytes())
+            if not already_sorted:
+                _permute_visibility(output_vis, order)
+    else:
+        del vertices
+
+    index = MortonIndex.build(output_path, bits, block_points, chunk_size)
+    index.save(output_path)
+    message = f"Sorted {count:,} points in Morton order ({len(index.blocks):,} index blocks)"
+    if callback:
+        callback(message)
+    return True, message
@@ -0,0 +1,256 @@
+"""Statistical and radius outlier removal for sparse and dense point clouds."""
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from core.ply_io import PlyWriter, read_ply, read_ply_header, write_ply, xyz_of
+from utils.spatial import point_index
+
+
+FILTER_METHODS = ('statistical', 'radius', 'both')
+
+
+def _knn_scale(xyz, k, total=None, sample_size=5000, seed=0):
+    """
+    Estimate the typical distance to the k-th neighbour in a cloud.
+
+    The estimate comes from a random sample and is corrected for the
+    lower sample density assuming points lie on surfaces (distances grow
+    with the square root of the thinning factor).
+
+    Args:
+        xyz: N x 3 positions (or a sample of them)
+        k: Neighbour rank
+        total: Number of points in the full cloud (len(xyz) if None)
+        sample_size: Points sampled for the estimate
+        seed: Random seed of the sample
+
+    Returns:
+        Median k-th neighbour distance (0.0 if it cannot be estimated)
+    """
+    total = total or len(xyz)
+    if len(xyz) <= k:
+        return 0.0
+    rng = np.random.default_rng(seed)
+    sample = xyz if len(xyz) <= sample_size else xyz[np.sort(rng.choice(len(xyz), sample_size, replace=False))]
+    sample = np.asarray(sample, dtype=np.float64)
+    distances, _ = point_index(sample, cell_size=None).query_knn(sample, k + 1)
+    return float(np.median(distances[:, k]) * np.sqrt(len(sample) / total))
+
+
+class PointCloudFilter:
+    """
+    Removes isolated points (floaters) from point clouds.
+
+    'statistical' drops points whose mean distance to their k nearest
+    neighbours is more than std_ratio standard deviations above the cloud
+    average. 'radius' drops points with fewer than min_neighbors other
+    points within radius. Neighbour queries run in vectorized batches on a
+    KD-tree (scipy) or a uniform grid index.
+
+    Clouds with more than max_points vertices are filtered out of core: the
+    memory-mapped file is split into slabs along its longest axis, and
+    every slab is processed together with a margin of its neighbours.
+    """
+
+    def __init__(self, method='statistical', k=16, std_ratio=2.0, radius=None,
+                 min_neighbors=4, batch_size=100000, max_points=10000000):
+        """
+        Initialize filter.
+
+        Args:
+            method: 'statistical', 'radius' or 'both'
+            k: Neighbours used by the statistical filter
+            std_ratio: Standard deviations above the mean distance that are kept
+            radius: Search radius of the radius filter (estimated as twice
+                the typical distance to the k-th neighbour if None)
+            min_neighbors: Minimum neighbours within radius
+            batch_size: Points queried per batch
+            max_points: Largest cloud filtered in memory
+        """
+        if method not in FILTER_METHODS:
+            raise ValueError(f"Unknown outlier filter '{method}' (expected one of {', '.join(FILTER_METHODS)})")
+        self.method = method
+        self.k = k
+        self.std_ratio = std_ratio
+        self.radius = radius
+        self.min_neighbors = min_neighbors
+        self.batch_size = batch_size
+        self.max_points = max_points
+
+    def _scales(self, xyz, total=None):
+        """Return (k-th neighbour scale, radius) for a cloud or a sample of it."""
+        scale = _knn_scale(xyz, self.k, total)
+        return scale, self.radius or 2.0 * scale
+
+    def _mean_distances(self, xyz, queries, scale):
+        """
+        Mean distance of each query to its k nearest neighbours in xyz (self excluded).
+
+        Neighbour distances are capped at the search limit (3 x scale, the
+        grid cell size), where the grid index stops searching, so every
+        index backend and the slab-wise filter give the same result.
+        """
+        limit = max(3.0 * scale, 1e-12)
+        index = point_index(xyz, cell_size=limit)
+        result = np.empty(len(queries))
+        for start in range(0, len(queries), self.batch_size):
+            distances, _ = index.query_knn(queries[start:start + self.batch_size], self.k + 1)
+            result[start:start + len(distances)] = np.minimum(distances[:, 1:], limit).mean(axis=1)
+        return result
+
+    def _radius_mask(self, xyz, queries, radius):
+        """Whether each query has at least min_neighbors other points of xyz within radius."""
+        index = point_index(xyz, cell_size=max(radius, 1e-12))
+        keep = np.empty(len(queries), dtype=bool)
+        for start in range(0, len(queries), self.batch_size):
+            counts = index.count_radius(queries[start:start + self.batch_size], radius)
+            keep[start:start + len(counts)] = counts - 1 >= self.min_neighbors
+        return keep
+
+    def _threshold(self, total, total_sq, count):
+        """Statistical distance threshold from accumulated sums."""
+        if not count:
+            return np.inf
+        mean = total / count
+        std = np.sqrt(max(total_sq / count - mean * mean, 0.0))
+        return mean + self.std_ratio * std
+
+    def mask(self, xyz):
+        """
+        Classify the points of an in-memory cloud.
+
+        Args:
+            xyz: N x 3 positions
+
+        Returns:
+            Boolean array, True for points that are kept
+        """
+        xyz = np.asarray(xyz, dtype=np.float64)
+        keep = np.ones(len(xyz), dtype=bool)
+        if len(xyz) <= self.k:
+            return keep
+
+        scale, radius = self._scales(xyz)
+        if self.method in ('statistical', 'both'):
+            distances = self._mean_distances(xyz, xyz, scale)
+            keep &= distances <= self._threshold(distances.sum(), (distances ** 2).sum(), len(distances))
+        if self.method in ('radius', 'both'):
+            keep &= self._radius_mask(xyz, xyz, radius)
+        return keep
+
+    def run(self, input_path, output_path, callback=None):
+        """
+        Filter a PLY file.
+
+        Args:
+            input_path: Input PLY file (vertex element without list properties)
+            output_path: Filtered binary PLY file to write
+            callback: Progress callback function
+
+        Returns:
+            Tuple of (success, message)
+        """
+        input_path = Path(input_path)
+        if not input_path.exists():
+            return False, f"Point cloud not found: {input_path}"
+
+        header = read_ply_header(input_path)
+        count = header['vertex_count']
+        if count > self.max_points:
+            kept = self._run_chunked(input_path, output_path, header, callback)
+        else:
+            vertices = read_ply(input_path)
+            kept_vertices = vertices[self.mask(xyz_of(vertices))]
+            write_ply(output_path, kept_vertices, comments=header['comments'])
+            kept = len(kept_vertices)
+
+        removed = count - kept
+        return True, (f"Removed {removed:,} of {count:,} points as outliers "
+                      f"({removed / max(count, 1):.1%}, {self.method} filter)")
+
+    def _run_chunked(self, input_path, output_path, header, callback=None):
+        """
+        Filter a large PLY file slab by slab.
+
+        Args:
+            input_path: Input PLY file
+            output_path: Output PLY file
+            header: Parsed input header
+            callback: Progress callback function
+
+        Returns:
+            Number of kept points
+        """
+        vertices = read_ply(input_path, mmap=True)
+        count = len(vertices)
+        dtype = np.dtype([(name, '<' + vertices.dtype[name].base.str[1:]) for name in vertices.dtype.names])
+        block = max(self.batch_size, 1000000)
+
+        # Slab layout from a random sample
+        rng = np.random.default_rng(0)
+        sample = xyz_of(vertices[np.sort(rng.choice(count, min(count, 200000), replace=False))])
+        scale, radius = self._scales(sample, total=count)
+        axis = int(np.argmax(sample.max(axis=0) - sample.min(axis=0)))
+        field = 'xyz'[axis]
+        num_slabs = int(np.ceil(2 * count / self.max_points))
+        edges = np.quantile(sample[:, axis], np.linspace(0, 1, num_slabs + 1)[1:-1])
+        margin = 3.0 * scale if self.method == 'statistical' else max(3.0 * scale, radius)
+
+        if callback:
+            callback(f"Filtering {count:,} points in {num_slabs} slabs along {field}...")
+
+        with tempfile.TemporaryDirectory(dir=Path(output_path).parent) as temp:
+            temp = Path(temp)
+            cores = [open(temp / f"slab_{i}.core", 'wb') for i in range(num_slabs)]
+            halos = [open(temp / f"slab_{i}.halo", 'wb') for i in range(num_slabs)]
+            try:
+                for start in range(0, count, block):
+                    chunk = np.ascontiguousarray(vertices[start:start + block], dtype=dtype)
+                    position = chunk[field].astype(np.float64)
+                    slab = np.searchsorted(edges, position, side='right')
+                    for i in range(num_slabs):
+                        chunk[slab == i].tofile(cores[i])
+                        halo = np.zeros(len(chunk), dtype=bool)
+                        if i > 0:
+                            halo |= (slab == i - 1) & (position >= edges[i - 1] - margin)
+                        if i < num_slabs - 1:
+                            halo |= (slab == i + 1) & (position < edges[i] + margin)
+                        chunk[halo].tofile(halos[i])
+            finally:
+                for f in cores + halos:
+                    f.close()
+
+            def load(i):
+                core = np.fromfile(temp / f"slab_{i}.core", dtype=dtype)
+                halo = np.fromfile(temp / f"slab_{i}.halo", dtype=dtype)
+                return core, np.concatenate([xyz_of(core), xyz_of(halo)])
+
+            # Pass 1: per-slab neighbour distances and global statistics
+            threshold = np.inf
+            if self.method in ('statistical', 'both'):
+                total = total_sq = 0.0
+                for i in range(num_slabs):
+                    core, xyz = load(i)
+                    distances = self._mean_distances(xyz, xyz[:len(core)], scale)
+                    total += distances.sum()
+                    total_sq += (distances ** 2).sum()
+                    np.save(temp / f"slab_{i}.dist.npy", distances)
+                threshold = self._threshold(total, total_sq, count)
+
+            # Pass 2: write kept points
+            with PlyWriter(output_path, dtype, header['comments']) as writer:
+                for i in range(num_slabs):
+                    core, xyz = load(i)
+                    keep = np.ones(len(core), dtype=bool)
+                    if self.method in ('statistical', 'both'):
+                        distances = np.load(temp / f"slab_{i}.dist.npy")
+                        keep &= distances <= threshold
+                    if self.method in ('radius', 'both'):
+                        keep &= self._radius_mask(xyz, xyz[:len(core)], radius)
+                    writer.write(core[keep])
+                    if callback:
+                        callback(f"  Slab {i + 1}/{num_slabs}: kept {int(keep.sum()):,} of {len(core):,} points")
+
+        return writer.count
@@ -0,0 +1,362 @@
+"""Image pair selection for COLMAP's matches_importer."""
+from pathlib import Path
+from statistics import median
+
+from core.colmap_database import read_image_names
+from core.image_descriptors import check_dependencies, compute_descriptors
+from utils.exif import read_gps
+from utils.spatial import NeighborIndex
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def top_k_pairs(embeddings, num_neighbors, block_size=1024):
+    """
+    Find the most similar images for every image by cosine similarity.
+
+    Similarities are computed in row blocks, so memory stays at
+    block_size x N instead of N x N.
+
+    Args:
+        embeddings: N x D array of unit-norm descriptors
+        num_neighbors: Neighbours to keep per image
+        block_size: Rows per similarity block
+
+    Returns:
+        Set of (i, j) index pairs with i < j
+    """
+    count = len(embeddings)
+    k = min(num_neighbors, count - 1)
+    pairs = set()
+    if k <= 0:
+        return pairs
+
+    for start in range(0, count, block_size):
+        stop = min(start + block_size, count)
+        similarity = embeddings[start:stop] @ embeddings.T
+        rows = np.arange(stop - start)
+        similarity[rows, rows + start] = -np.inf
+        neighbors = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        for row, cols in zip(range(start, stop), neighbors):
+            for col in cols:
+                col = int(col)
+                pairs.add((row, col) if row < col else (col, row))
+
+    return pairs
+
+
+def gps_to_local(gps_positions):
+    """
+    Convert GPS positions to local metric coordinates.
+
+    Uses an equirectangular approximation around the centroid, which is
+    accurate to well under a meter over survey-sized areas.
+
+    Args:
+        gps_positions: N x 3 array of (latitude, longitude, altitude)
+
+    Returns:
+        N x 3 array of (east, north, up) in meters
+    """
+    earth_radius = 6378137.0
+    lat0 = np.radians(gps_positions[:, 0].mean())
+    lon0 = np.radians(gps_positions[:, 1].mean())
+    lat = np.radians(gps_positions[:, 0])
+    lon = np.radians(gps_positions[:, 1])
+    east = (lon - lon0) * np.cos(lat0) * earth_radius
+    north = (lat - lat0) * earth_radius
+    up = gps_positions[:, 2] - gps_positions[:, 2].mean()
+    return np.column_stack([east, north, up])
+
+
+def write_pairs_file(pairs_path, names, pairs):
+    """
+    Write an image pair list in matches_importer format.
+
+    Args:
+        pairs_path: Output text file
+        names: Image names indexed by the pair indices
+        pairs: Iterable of (i, j) index pairs
+
+    Returns:
+        Number of pairs written
+    """
+    lines = sorted(f"{names[i]} {names[j]}\n" for i, j in pairs)
+    Path(pairs_path).write_text(''.join(lines), encoding='utf-8')
+    return len(lines)
+
+
+class RetrievalPairSelector:
+    """Selects match pairs by nearest-neighbour search over global descriptors."""
+
+    def __init__(self, num_neighbors=20, thumb_size=16):
+        """
+        Initialize pair selector.
+
+        Args:
+            num_neighbors: Retrieved neighbours per image
+            thumb_size: Side length of the thumbnail embedding
+        """
+        self.num_neighbors = num_neighbors
+        self.thumb_size = thumb_size
+
+    def run(self, database_path, image_root, pairs_path, callback=None):
+        """
+        Build the descriptor index and write the pairs file.
+
+        Only images already in the database (after feature extraction) are
+        considered, so the pair names always match COLMAP's image names.
+
+        Args:
+            database_path: Path to COLMAP database file
+            image_root: Images folder
+            pairs_path: Output pairs file for matches_importer
+            callback: Progress callback function
+
+        Returns:
+            Tuple of (success, message)
+        """
+        ok, msg = check_dependencies()
+        if not ok:
+            return False, msg
+
+        names = [name for _, name in read_image_names(database_path)]
+        if len(names) < 2:
+            return False, "Need at least 2 images in the database"
+
+        if callback:
+            callback(f"Computing global descriptors for {len(names):,} images...")
+        descriptors = compute_descriptors(image_root, names, self.thumb_size, callback)
+
+        pairs = top_k_pairs(descriptors['embeddings'], self.num_neighbors)
+        count = write_pairs_file(pairs_path, names, pairs)
+
+        exhaustive = len(names) * (len(names) - 1) // 2
+        return True, (f"Selected {count:,} pairs for {len(names):,} images "
+                      f"({count / exhaustive:.1%} of exhaustive)")
+
+
+class SpatialPairSelector:
+    """Selects match pairs from EXIF GPS positions with a KD-tree (brute force without SciPy)."""
+
+    def __init__(self, num_neighbors=20, max_distance=None, ignore_altitude=False,
+                 fallback_overlap=10):
+        """
+        Initialize pair selector.
+
+        Args:
+            num_neighbors: Nearest neighbours per image
+            max_distance: Optional radius in meters; farther neighbours are dropped
+            ignore_altitude: Match on horizontal distance only
+            fallback_overlap: Images without GPS are paired with this many
+                name-order neighbours instead
+        """
+        self.num_neighbors = num_neighbors
+        self.max_distance = max_distance
+        self.ignore_altitude = ignore_altitude
+        self.fallback_overlap = fallback_overlap
+
+    def run(self, database_path, image_root, pairs_path, callback=None):
+        """
+        Read GPS positions, query spatial neighbours and write the pairs file.
+
+        Args:
+            database_path: Path to COLMAP database file
+            image_root: Images folder
+            pairs_path: Output pairs file for matches_importer
+            callback: Progress callback function
+
+        Returns:
+            Tuple of (success, message)
+        """
+        if np is None:
+            return False, "NumPy not found. Install: pip install numpy"
+
+        names = [name for _, name in read_image_names(database_path)]
+        image_root = Path(image_root)
+
+        gps_indices = []
+        gps_positions = []
+        for i, name in enumerate(names):
+            position = read_gps(image_root / name)
+            if position is not None:
+                gps_indices.append(i)
+                gps_positions.append(position)
+
+        if len(gps_indices) < 2:
+            return False, "Fewer than 2 images have GPS positions in EXIF"
+
+        if callback:
+            callback(f"GPS positions found for {len(gps_indices):,} of {len(names):,} images")
+
+        coords = gps_to_local(np.asarray(gps_positions, dtype=np.float64))
+        if self.ignore_altitude:
+            coords = coords[:, :2]
+
+        index = NeighborIndex(coords)
+        k = min(self.num_neighbors + 1, len(coords))
+        distances, neighbors = index.query_knn(coords, k)
+
+        pairs = set()
+        for row, (dists, cols) in enumerate(zip(distances, neighbors)):
+            for dist, col in zip(dists, cols):
+                col = int(col)
+                if col == row or col >= len(coords):
+                    continue
+                if self.max_distance is not None and dist > self.max_distance:
+                    continue
+                a, b = gps_indices[row], gps_indices[col]
+                pairs.add((a, b) if a < b else (b, a))
+
+        # Images without GPS still need matches: pair them by capture order
+        has_gps = set(gps_indices)
+        missing = [i for i in range(len(names)) if i not in has_gps]
+        for i in missing:
+            for j in range(max(0, i - self.fallback_overlap),
+                           min(len(names), i + self.fallback_overlap + 1)):
+                if j != i:
+                    pairs.add((i, j) if i < j else (j, i))
+
+        count = write_pairs_file(pairs_path, names, pairs)
+        exhaustive = len(names) * (len(names) - 1) // 2
+        return True, (f"Selected {count:,} spatial pairs for {len(names):,} images "
+                      f"({count / exhaustive:.1%} of exhaustive)")
+
+
+class AdaptiveSequentialPlanner:
+    """
+    Plans sequential match pairs with a per-segment window.
+
+    Matching runs in two passes. The probe pass matches every image with a
+    few neighbours at growing offsets (1, 2, 4, ...). From the resulting
+    inlier counts, each segment of the sequence gets the largest offset that
+    still overlaps well: slow walk-throughs get a wide but sparse window,
+    fast pans a narrow one. A small budget of retrieval-based loop-closure
+    pairs is added on top.
+    """
+
+    def __init__(self, probe_offsets=(1, 2, 4, 8, 16), segment_size=50, min_inliers=100,
+                 min_overlap=3, max_overlap=30, dense_overlap=5, loop_closures=2,
+                 thumb_size=16):
+        """
+        Initialize planner.
+
+        Args:
+            probe_offsets: Offsets matched in the probe pass
+            segment_size: Images per segment sharing one window
+            min_inliers: Median inliers an offset needs to count as overlapping
+            min_overlap: Smallest window per segment
+            max_overlap: Largest window per segment
+            dense_overlap: Offsets up to this are all matched; beyond it only
+                powers of two are matched
+            loop_closures: Retrieval loop-closure pairs per image (0 disables)
+            thumb_size: Side length of the thumbnail embedding for loop closures
+        """
+        self.probe_offsets = tuple(sorted(probe_offsets))
+        self.segment_size = segment_size
+        self.min_inliers = min_inliers
+        self.min_overlap = min_overlap
+        self.max_overlap = max_overlap
+        self.dense_overlap = dense_overlap
+        self.loop_closures = loop_closures
+        self.thumb_size = thumb_size
+
+    def probe_pairs(self, count):
+        """
+        Pairs matched in the probe pass.
+
+        Args:
+            count: Number of images in capture order
+
+        Returns:
+            Set of (i, j) index pairs
+        """
+        return {(i, i + offset)
+                for offset in self.probe_offsets
+                for i in range(count - offset)}
+
+    def segment_windows(self, image_ids, inliers):
+        """
+        Choose the window of every segment from probe-pass inlier counts.
+
+        Args:
+            image_ids: Database image IDs in capture order
+            inliers: Dictionary from read_inlier_counts
+
+        Returns:
+            List of windows, one per segment
+        """
+        count = len(image_ids)
+        windows = []
+        for start in range(0, count, self.segment_size):
+            stop = min(start + self.segment_size, count)
+            window = self.min_overlap
+            for offset in self.probe_offsets:
+                counts = [inliers.get(tuple(sorted((image_ids[i], image_ids[i + offset]))), 0)
+                          for i in range(start, min(stop, count - offset))]
+                if not counts or median(counts) < self.min_inliers:
+                    break
+                window = offset
+            # A healthy largest probe means the overlap extends further
+            if window == self.probe_offsets[-1]:
+                window = self.max_overlap
+            windows.append(max(self.min_overlap, min(self.max_overlap, window)))
+        return windows
+
+    def window_pairs(self, count, windows):
+        """
+        Sequential pairs for the chosen segment windows.
+
+        Args:
+            count: Number of images in capture order
+            windows: Result of segment_windows
+
+        Returns:
+            Set of (i, j) index pairs
+        """
+        pairs = set()
+        for i in range(count):
+            window = windows[i // self.segment_size]
+            offsets = set(range(1, min(window, self.dense_overlap) + 1))
+            offset = 1
+            while offset <= window:
+                offsets.add(offset)
+                offset *= 2
+            offsets.add(window)
+            pairs.update((i, i + o) for o in offsets if i + o < count)
+        return pairs
+
+    def loop_closure_pairs(self, image_root, names, windows, callback=None):
+        """
+        Retrieval pairs between images far apart in the sequence.
+
+        Args:
+            image_root: Images folder
+            names: Image names in capture order
+            windows: Result of segment_windows
+            callback: Progress callback function
+
+        Returns:
+            Set of (i, j) index pairs (empty if loop closures are disabled
+            or the optional dependencies are missing)
+        """
+        ok, msg = check_dependencies()
+        if self.loop_closures <= 0 or not ok:
+            if not ok and callback:
+                callback(f"Skipping loop-closure pairs: {msg}")
+            return set()
+
+        descriptors = compute_descriptors(image_root, names, self.thumb_size, callback)
+        candidates = top_k_pairs(descriptors['embeddings'],
+                                 self.loop_closures + 2 * self.max_overlap)
+        embeddings = descriptors['embeddings']
+
+        # Keep only non-sequential candidates, best first, up to the budget
+        far = [(float(embeddings[i] @ embeddings[j]), i, j) for i, j in candidates
+               if j - i > windows[i // self.segment_size]]
+        far.sort(reverse=True)
+        budget = self.loop_closures * len(names)
+        return {(i, j) for _, i, j in far[:budget]}
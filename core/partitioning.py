@@ -0,0 +1,283 @@
+"""Divide-and-conquer sparse reconstruction over view-graph partitions."""
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from core.colmap_database import extract_sub_database, read_image_names, read_inlier_counts
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.linalg import eigsh
+except ImportError:
+    csr_matrix = None
+    eigsh = None
+
+
+# Largest subgraph bisected with a dense eigendecomposition when scipy is missing
+DENSE_EIGEN_LIMIT = 4000
+
+
+def _fiedler_order(num_nodes, rows, cols, weights):
+    """
+    Order nodes by the spectral (normalized cut) embedding of a graph.
+
+    Args:
+        num_nodes: Number of nodes
+        rows, cols, weights: Undirected edge list (each edge once)
+
+    Returns:
+        Node indices sorted along the Fiedler direction, or None if no
+        eigen solver fits the graph size
+    """
+    degree = np.bincount(rows, weights, num_nodes) + np.bincount(cols, weights, num_nodes)
+    scale = 1.0 / np.sqrt(degree + 1e-9)
+    values = weights * scale[rows] * scale[cols]
+
+    # The second-largest eigenvector of D^-1/2 W D^-1/2 is the normalized
+    # Laplacian's Fiedler vector; largest eigenpairs converge quickly.
+    if eigsh is not None:
+        matrix = csr_matrix((np.concatenate([values, values]),
+                             (np.concatenate([rows, cols]), np.concatenate([cols, rows]))),
+                            shape=(num_nodes, num_nodes))
+        _, vectors = eigsh(matrix, k=2, which='LA')
+    elif num_nodes <= DENSE_EIGEN_LIMIT:
+        matrix = np.zeros((num_nodes, num_nodes))
+        matrix[rows, cols] = values
+        matrix[cols, rows] = values
+        _, vectors = np.linalg.eigh(matrix)
+        vectors = vectors[:, -2:]
+    else:
+        return None
+
+    fiedler = vectors[:, 0] * scale
+    return np.argsort(fiedler, kind='stable')
+
+
+def _bfs_order(num_nodes, rows, cols):
+    """
+    Order nodes by BFS distance from a pseudo-peripheral node.
+
+    Used as a bisection fallback for large graphs without scipy.
+    """
+    neighbors = [[] for _ in range(num_nodes)]
+    for a, b in zip(rows.tolist(), cols.tolist()):
+        neighbors[a].append(b)
+        neighbors[b].append(a)
+
+    def bfs(start):
+        seen = [False] * num_nodes
+        order = []
+        for root in [start] + list(range(num_nodes)):
+            if seen[root]:
+                continue
+            seen[root] = True
+            queue = deque([root])
+            while queue:
+                node = queue.popleft()
+                order.append(node)
+                for other in neighbors[node]:
+                    if not seen[other]:
+                        seen[other] = True
+                        queue.append(other)
+        return order
+
+    return np.asarray(bfs(bfs(0)[-1]))
+
+
+def partition_view_graph(image_ids, inliers, max_cluster_size=500, overlap_ratio=0.15):
+    """
+    Split the view graph into overlapping clusters.
+
+    Clusters are produced by recursive balanced normalized-cut bisection
+    weighted by inlier counts, so cuts go through weakly matched regions.
+    Each cluster is then grown by the outside images most strongly
+    connected to it, which gives neighbouring sub-models shared images to
+    be merged on.
+
+    Args:
+        image_ids: Database image IDs
+        inliers: Dictionary from read_inlier_counts
+        max_cluster_size: Maximum images per cluster before overlap
+        overlap_ratio: Extra images added per cluster, as a fraction of its size
+
+    Returns:
+        List of clusters, each a sorted list of image IDs
+    """
+    index = {image_id: i for i, image_id in enumerate(image_ids)}
+    edges = [(index[a], index[b], count) for (a, b), count in inliers.items()
+             if a in index and b in index]
+    num_nodes = len(image_ids)
+    rows = np.asarray([e[0] for e in edges], dtype=np.int64)
+    cols = np.asarray([e[1] for e in edges], dtype=np.int64)
+    weights = np.asarray([e[2] for e in edges], dtype=np.float64)
+
+    pending = [np.arange(num_nodes)]
+    clusters = []
+    while pending:
+        nodes = pending.pop()
+        if len(nodes) <= max_cluster_size:
+            clusters.append(nodes)
+            continue
+
+        local = np.full(num_nodes, -1, dtype=np.int64)
+        local[nodes] = np.arange(len(nodes))
+        mask = (local[rows] >= 0) & (local[cols] >= 0)
+        sub_rows, sub_cols = local[rows[mask]], local[cols[mask]]
+
+        order = _fiedler_order(len(nodes), sub_rows, sub_cols, weights[mask])
+        if order is None:
+            order = _bfs_order(len(nodes), sub_rows, sub_cols)
+
+        half = len(nodes) // 2
+        pending.append(nodes[order[:half]])
+        pending.append(nodes[order[half:]])
+
+    result = []
+    for nodes in clusters:
+        inside = np.zeros(num_nodes, dtype=bool)
+        inside[nodes] = True
+        crossing_a = inside[rows] & ~inside[cols]
+        crossing_b = inside[cols] & ~inside[rows]
+        strength = np.bincount(cols[crossing_a], weights[crossing_a], num_nodes) + \
+            np.bincount(rows[crossing_b], weights[crossing_b], num_nodes)
+
+        extra = int(np.ceil(overlap_ratio * len(nodes)))
+        candidates = np.argsort(-strength)[:extra]
+        candidates = candidates[strength[candidates] > 0]
+        members = np.concatenate([nodes, candidates])
+        result.append(sorted(int(image_ids[i]) for i in members))
+
+    return result
+
+
+class PartitionedMapper:
+    """Reconstructs view-graph clusters in parallel and merges the sub-models."""
+
+    def __init__(self, colmap_wrapper, glomap_wrapper=None, max_cluster_size=500,
+                 overlap_ratio=0.15, max_workers=2, glomap_options=None, colmap_options=None):
+        """
+        Initialize partitioned mapper.
+
+        Args:
+            colmap_wrapper: COLMAPWrapper (used for merging, and mapping if no GloMAP)
+            glomap_wrapper: GloMAPWrapper for mapping clusters (optional)
+            max_cluster_size: Maximum images per cluster before overlap
+            overlap_ratio: Overlap added per cluster, as a fraction of its size
+            max_workers: Clusters reconstructed concurrently
+            glomap_options: Extra GloMAP mapper options
+            colmap_options: Extra COLMAP mapper options
+        """
+        self.colmap = colmap_wrapper
+        self.glomap = glomap_wrapper
+        self.max_cluster_size = max_cluster_size
+        self.overlap_ratio = overlap_ratio
+        self.max_workers = max_workers
+        self.glomap_options = glomap_options
+        self.colmap_options = colmap_options
+
+    def run(self, database_path, image_path, work_dir, output_path, callback=None):
+        """
+        Partition, reconstruct and merge.
+
+        Args:
+            database_path: COLMAP database with matches
+            image_path: Images folder
+            work_dir: Folder for cluster databases and sub-models
+            output_path: Folder receiving the merged model (cameras/images/points3D)
+            callback: Progress callback function
+
+        Returns:
+            Tuple of (success, message)
+        """
+        if np is None:
+            return False, "NumPy not found. Install: pip install numpy"
+
+        work_dir = Path(work_dir)
+        image_ids = [image_id for image_id, _ in read_image_names(database_path)]
+        clusters = partition_view_graph(image_ids, read_inlier_counts(database_path),
+                                        self.max_cluster_size, self.overlap_ratio)
+
+        if callback:
+            sizes = ', '.join(str(len(c)) for c in clusters)
+            callback(f"Partitioned {len(image_ids):,} images into {len(clusters)} clusters ({sizes})")
+
+        if work_dir.exists():
+            shutil.rmtree(work_dir)
+        work_dir.mkdir(parents=True)
+
+        use_glomap = self.glomap is not None and self.glomap.check_installation()[0]
+
+        def reconstruct(index):
+            cluster_dir = work_dir / f"cluster_{index:03d}"
+            cluster_dir.mkdir()
+            cluster_db = cluster_dir / "database.db"
+            extract_sub_database(database_path, cluster_db, clusters[index])
+
+            cluster_callback = None
+            if callback:
+                cluster_callback = lambda line: callback(f"[cluster {index + 1}] {line}")
+
+            if use_glomap:
+                success, msg = self.glomap.mapper(cluster_db, image_path, cluster_dir / "sparse",
+                                                  options=self.glomap_options,
+                                                  callback=cluster_callback)
+            else:
+                success, msg = self.colmap.mapper(cluster_db, image_path, cluster_dir / "sparse",
+                                                  options=self.colmap_options,
+                                                  callback=cluster_callback)
+            model = cluster_dir / "sparse" / "0"
+            return (model if success and model.exists() else None), msg
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(reconstruct, range(len(clusters))))
+
+        models = [(set(clusters[i]), model) for i, (model, _) in enumerate(results) if model]
+        if not models:
+            return False, "No cluster could be reconstructed"
+        if callback:
+            callback(f"Reconstructed {len(models)} of {len(clusters)} clusters, merging...")
+
+        # Merge greedily: always add the sub-model sharing most images with the result
+        models.sort(key=lambda m: len(m[0]), reverse=True)
+        merged_images, merged_model = models.pop(0)
+        merged_count = 1
+        step = 0
+        while models:
+            best = max(range(len(models)), key=lambda i: len(models[i][0] & merged_images))
+            images, model = models.pop(best)
+            if not images & merged_images:
+                break
+
+            step += 1
+            merge_dir = work_dir / f"merged_{step:03d}"
+            merge_dir.mkdir()
+            success, msg = self.colmap.model_merger(merged_model, model, merge_dir, callback=callback)
+            if success:
+                merged_images |= images
+                merged_model = merge_dir
+                merged_count += 1
+            elif callback:
+                callback(f"Warning: Could not merge a sub-model: {msg}")
+
+        output_path = Path(output_path)
+        output_path.mkdir(parents=True, exist_ok=True)
+        if merged_count > 1:
+            # Refine the merged model jointly across the former cluster seams
+            success, msg = self.colmap.bundle_adjuster(merged_model, output_path, callback=callback)
+            if not success:
+                return False, f"Bundle adjustment of merged model failed: {msg}"
+        else:
+            for item in Path(merged_model).iterdir():
+                if item.is_file():
+                    shutil.copy2(item, output_path / item.name)
+
+        message = f"Merged {merged_count} of {len(clusters)} cluster models"
+        if merged_count < len(clusters):
+            message += f" (the others failed or share no images; see {work_dir})"
+        return True, message
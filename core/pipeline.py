@@ -1,26 +1,77 @@
 """Pipeline orchestration for photogrammetry processing."""
+import functools
 import os
+import time
 from pathlib import Path
 from enum import Enum
 
+from core.video_ingest import VideoFrameExtractor, find_videos
+from core.image_descriptors import DuplicateFilter
+from core.pair_selection import (
+    AdaptiveSequentialPlanner, RetrievalPairSelector, SpatialPairSelector, write_pairs_file
+)
+from core.colmap_database import read_image_names, read_inlier_counts
+from core.sharding import LocalShardExecutor, SSHShardExecutor, ShardedFeatureExtractor
+from core.partitioning import PartitionedMapper
+from core.model_selection import SparseModelSelector, archive_previous_models
+from core.profiles import resolve_profile
+from core.dense_partitioning import ClusteredDenseReconstructor
+from core.view_selection import SourceViewSelector
+from core.depth_maps import DepthMapInspector
+from core.incremental_fusion import IncrementalFusion
+from core.manifest import ProjectManifest
+from core.outlier_filter import PointCloudFilter
+from core.morton import sort_ply_file
+from core.splat_pruning import SplatPruner
+from core.training_monitor import TrainingMonitor
+from core.checkpoints import CheckpointTracker
+from core.dgut_dataset import DGUTDatasetBuilder
+from core.seed_points import SeedPointBuilder
+from core.events import Artifact, Progress, StageFinished, StageStarted, emit
+
 
 class PipelineStep(Enum):
     """Enumeration of pipeline steps."""
+    VIDEO_INGESTION = "Video Keyframe Extraction"
+    DEDUPLICATION = "Near-Duplicate Image Removal"
     FEATURE_EXTRACTION = "Feature Extraction"
     FEATURE_MATCHING = "Feature Matching"
     SPARSE_RECONSTRUCTION = "Sparse Reconstruction (GloMAP)"
+    MODEL_SELECTION = "Sparse Model Selection"
     EXPORT_SPARSE = "Export Sparse Point Cloud"
     IMAGE_UNDISTORTION = "Image Undistortion"
+    VIEW_SELECTION = "Stereo Source View Selection"
     STEREO_MATCHING = "Stereo Depth Computation"
+    DEPTH_INSPECTION = "Depth Map Inspection"
     DENSE_FUSION = "Dense Point Cloud Fusion"
+    OUTLIER_REMOVAL = "Point Cloud Outlier Removal"
+    MORTON_ORDER = "Morton Point Ordering"
+    CLUSTERED_DENSE = "Clustered Dense Reconstruction"
+    DGUT_DATASET = "3DGUT Dataset Preparation"
+    DGUT_SEEDING = "3DGUT Dense Initialization"
     DGUT_TRAINING = "3DGUT Training (Gaussian Splatting)"
     DGUT_EXPORT = "3DGUT Point Cloud Export"
+    SPLAT_PRUNING = "Gaussian Splat Pruning"
+
+
+def _stage_method(method):
+    """End the stage a step method started with the method's (success, message) result."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            result = method(self, *args, **kwargs)
+        except Exception as e:
+            self._end_stage(False, str(e))
+            raise
+        self._end_stage(result[0], result[1])
+        return result
+    return wrapper
 
 
 class PhotogrammetryPipeline:
     """Manages the complete photogrammetry workflow."""
     
-    def __init__(self, colmap_wrapper, glomap_wrapper, dgut_wrapper=None):
+    def __init__(self, colmap_wrapper, glomap_wrapper, dgut_wrapper=None, profile=None):
         """
         Initialize pipeline.
         
@@ -28,11 +79,57 @@ class PhotogrammetryPipeline:
             colmap_wrapper: COLMAPWrapper instance
             glomap_wrapper: GloMAPWrapper instance
             dgut_wrapper: DGUTWrapper instance (optional)
+            profile: Parameter profile name ('draft', 'balanced', 'survey-grade'
+                or one defined in config.json); defaults to config.json's choice
         """
         self.colmap = colmap_wrapper
         self.glomap = glomap_wrapper
         self.dgut = dgut_wrapper
         self.current_step = None
+        self.profile = resolve_profile(profile)
+        self._stage_started = None
+        self._stage_callback = None
+    
+    def _start_stage(self, step, callback):
+        """
+        End the running stage and announce the next one.
+        
+        Args:
+            step: PipelineStep starting
+            callback: Progress callback function
+        """
+        self._end_stage(True)
+        self.current_step = step
+        self._stage_started = time.time()
+        self._stage_callback = callback
+        emit(callback, StageStarted(step.value))
+    
+    def _end_stage(self, success, message=''):
+        """
+        Announce the end of the running stage (if any).
+        
+        Args:
+            success: Whether the stage succeeded
+            message: Failure message
+        """
+        if self._stage_started is None:
+            return
+        emit(self._stage_callback, StageFinished(self.current_step.value, success,
+                                                 '' if success else message,
+                                                 time.time() - self._stage_started))
+        self._stage_started = None
+    
+    def set_profile(self, name):
+        """
+        Select the parameter profile used for GloMAP/COLMAP options.
+        
+        Args:
+            name: Profile name
+            
+        Raises:
+            ValueError: If the profile does not exist
+        """
+        self.profile = resolve_profile(name)
     
     def setup_workspace(self, project_path):
         """
@@ -49,14 +146,27 @@ class PhotogrammetryPipeline:
         paths = {
             'project': project_path,
             'images': project_path / 'images',
+            'videos': project_path / 'videos',
+            'image_list': project_path / 'image_list.txt',
+            'dedup_report': project_path / 'dedup_report.json',
             'database': project_path / 'database.db',
+            'shards': project_path / 'shards',
+            'pairs': project_path / 'pairs.txt',
+            'probe_pairs': project_path / 'pairs_probe.txt',
             'sparse': project_path / 'sparse',
             'sparse_0': project_path / 'sparse' / '0',
             'sparse_ply': project_path / 'sparse' / 'sparse.ply',
+            'sparse_clean_ply': project_path / 'sparse' / 'sparse_clean.ply',
+            'partitions': project_path / 'sparse' / 'partitions',
             'dense': project_path / 'dense',
             'dense_ply': project_path / 'dense' / 'fused.ply',
+            'dense_clean_ply': project_path / 'dense' / 'fused_clean.ply',
+            'dense_clusters': project_path / 'dense' / 'clusters',
             'dgut': project_path / '3dgut',
-            'dgut_ply': project_path / '3dgut' / 'pointcloud.ply'
+            'dgut_data': project_path / '3dgut_data',
+            'dgut_seed_ply': project_path / '3dgut_data' / 'seed_points.ply',
+            'dgut_ply': project_path / '3dgut' / 'pointcloud.ply',
+            'dgut_pruned_ply': project_path / '3dgut' / 'pointcloud_pruned.ply'
         }
         
         # Create necessary directories
@@ -65,8 +175,75 @@ class PhotogrammetryPipeline:
         
         return paths
     
+    @_stage_method
+    def run_video_ingestion(self, paths, video_paths=None, window_seconds=0.5, callback=None):
+        """
+        Extract sharp keyframes from videos into the images folder.
+        
+        Args:
+            paths: Dictionary of paths from setup_workspace
+            video_paths: List of video files (defaults to all videos in paths['videos'])
+            window_seconds: Keep the best frame of every window of this length
+            callback: Progress callback function
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        self._start_stage(PipelineStep.VIDEO_INGESTION, callback)
+        
+        if video_paths is None:
+            video_paths = find_videos(paths['videos'])
+        if not video_paths:
+            return False, "No videos found"
+        
+        extractor = VideoFrameExtractor(window_seconds=window_seconds)
+        total = 0
+        for i, video_path in enumerate(video_paths):
+            success, msg, count = extractor.extract(video_path, paths['images'], callback=callback)
+            if not success:
+                return False, msg
+            total += count
+            emit(callback, Progress(i + 1, len(video_paths), msg))
+        
+        return True, f"Extracted {total:,} keyframes from {len(video_paths)} video(s)"
+    
+    @_stage_method
+    def run_duplicate_removal(self, paths, max_hash_distance=4, min_similarity=0.97, callback=None):
+        """
+        Detect near-duplicate images and write the list of images to keep.
+        
+        The kept images are written to paths['image_list'] and a report of
+        dropped images to paths['dedup_report'].
+        
+        Args:
+            paths: Dictionary of paths from setup_workspace
+            max_hash_distance: Maximum perceptual hash distance for duplicates
+            min_similarity: Minimum thumbnail similarity for duplicates
+            callback: Progress callback function
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        self._start_stage(PipelineStep.DEDUPLICATION, callback)
+        
+        dedup = DuplicateFilter(max_hash_distance=max_hash_distance, min_similarity=min_similarity)
+        success, msg = dedup.run(
+            image_root=paths['images'],
+            image_list_path=paths['image_list'],
+            report_path=paths['dedup_report'],
+            callback=callback
+        )
+        
+        if success and callback:
+            callback(msg)
+            callback(f"Report: {paths['dedup_report']}")
+        
+        return success, msg
+    
+    @_stage_method
     def run_feature_extraction(self, paths, use_gpu=True, max_features=8192, 
-                              camera_model=None, camera_params=None, single_camera=False, callback=None):
+                              camera_model=None, camera_params=None, single_camera=False,
+                              image_list_path=None, num_shards=1, shard_hosts=None, callback=None):
         """
         Run feature extraction step.
         
@@ -77,17 +254,37 @@ class PhotogrammetryPipeline:
             camera_model: Camera model for fisheye (e.g., 'OPENCV_FISHEYE')
             camera_params: Camera parameters string
             single_camera: Force single camera model
+            image_list_path: Only extract the images listed in this file
+            num_shards: Split extraction into this many concurrent shards
+            shard_hosts: Run shards on these SSH hosts instead of locally
             callback: Progress callback function
             
         Returns:
             Tuple of (success, message)
         """
-        self.current_step = PipelineStep.FEATURE_EXTRACTION
+        self._start_stage(PipelineStep.FEATURE_EXTRACTION, callback)
+        if callback and camera_model:
+            callback(f"Using camera model: {camera_model}")
         
-        if callback:
-            callback(f"=== {PipelineStep.FEATURE_EXTRACTION.value} ===")
-            if camera_model:
-                callback(f"Using camera model: {camera_model}")
+        if num_shards > 1:
+            if shard_hosts:
+                executor = SSHShardExecutor(self.colmap, shard_hosts)
+            else:
+                executor = LocalShardExecutor(self.colmap)
+            extractor = ShardedFeatureExtractor(executor, num_shards)
+            return extractor.run(
+                database_path=paths['database'],
+                image_path=paths['images'],
+                shard_dir=paths['shards'],
+                image_list_path=image_list_path,
+                use_gpu=use_gpu,
+                max_features=max_features,
+                camera_model=camera_model,
+                camera_params=camera_params,
+                single_camera=single_camera,
+                options=self.profile.options('colmap', 'feature_extraction'),
+                callback=callback
+            )
         
         return self.colmap.feature_extraction(
             database_path=paths['database'],
@@ -97,42 +294,74 @@ class PhotogrammetryPipeline:
             camera_model=camera_model,
             camera_params=camera_params,
             single_camera=single_camera,
+            image_list_path=image_list_path,
+            options=self.profile.options('colmap', 'feature_extraction'),
             callback=callback
         )
     
-    def run_feature_matching(self, paths, matcher_type='sequential', overlap=10, callback=None):
+    @_stage_method
+    def run_feature_matching(self, paths, matcher_type='sequential', overlap=10,
+                             num_neighbors=20, max_distance=None, callback=None):
         """
         Run feature matching step.
         
         Args:
             paths: Dictionary of paths from setup_workspace
-            matcher_type: 'sequential' or 'exhaustive'
+            matcher_type: 'sequential', 'adaptive', 'exhaustive', 'retrieval' or 'spatial'
             overlap: Number of overlapping images (for sequential)
+            num_neighbors: Neighbours per image (for retrieval and spatial)
+            max_distance: Neighbour radius in meters (for spatial)
             callback: Progress callback function
             
         Returns:
             Tuple of (success, message)
         """
-        self.current_step = PipelineStep.FEATURE_MATCHING
-        
-        if callback:
-            callback(f"=== {PipelineStep.FEATURE_MATCHING.value} ===")
+        self._start_stage(PipelineStep.FEATURE_MATCHING, callback)
         
-        if matcher_type == 'exhaustive':
+        options = self.profile.options('colmap', 'matching')
+        if matcher_type == 'adaptive':
+            return self._run_adaptive_matching(paths, callback=callback)
+        elif matcher_type == 'exhaustive':
             return self.colmap.exhaustive_matcher(
                 database_path=paths['database'],
+                options=options,
+                callback=callback
+            )
+        elif matcher_type in ('retrieval', 'spatial'):
+            if matcher_type == 'spatial':
+                selector = SpatialPairSelector(num_neighbors=num_neighbors,
+                                               max_distance=max_distance,
+                                               fallback_overlap=overlap)
+            else:
+                selector = RetrievalPairSelector(num_neighbors=num_neighbors)
+            success, msg = selector.run(
+                database_path=paths['database'],
+                image_root=paths['images'],
+                pairs_path=paths['pairs'],
+                callback=callback
+            )
+            if not success:
+                return False, f"Pair selection failed: {msg}"
+            if callback:
+                callback(msg)
+            
+            return self.colmap.matches_importer(
+                database_path=paths['database'],
+                match_list_path=paths['pairs'],
+                options=options,
                 callback=callback
             )
         else:
             return self.colmap.sequential_matcher(
                 database_path=paths['database'],
                 overlap=overlap,
+                options=options,
                 callback=callback
             )
     
-    def run_sparse_reconstruction(self, paths, callback=None):
+    def _run_adaptive_matching(self, paths, callback=None):
         """
-        Run sparse reconstruction using GloMAP (if available) or COLMAP mapper.
+        Sequential matching with a per-segment window and loop closures.
         
         Args:
             paths: Dictionary of paths from setup_workspace
@@ -141,10 +370,83 @@ class PhotogrammetryPipeline:
         Returns:
             Tuple of (success, message)
         """
-        self.current_step = PipelineStep.SPARSE_RECONSTRUCTION
+        planner = AdaptiveSequentialPlanner()
+        options = self.profile.options('colmap', 'matching')
+        images = read_image_names(paths['database'])
+        if len(images) < 2:
+            return False, "Need at least 2 images in the database"
+        image_ids = [image_id for image_id, _ in images]
+        names = [name for _, name in images]
         
+        # Pass 1: probe overlap at growing offsets
+        probe = planner.probe_pairs(len(names))
+        write_pairs_file(paths['probe_pairs'], names, probe)
         if callback:
-            callback(f"=== {PipelineStep.SPARSE_RECONSTRUCTION.value} ===")
+            callback(f"Probing overlap with {len(probe):,} pairs...")
+        success, msg = self.colmap.matches_importer(
+            database_path=paths['database'],
+            match_list_path=paths['probe_pairs'],
+            options=options,
+            callback=callback
+        )
+        if not success:
+            return False, f"Probe matching failed: {msg}"
+        
+        # Pass 2: per-segment windows plus loop closures
+        windows = planner.segment_windows(image_ids, read_inlier_counts(paths['database']))
+        if callback:
+            callback(f"Adaptive windows per {planner.segment_size} images: "
+                     f"{', '.join(str(w) for w in windows)}")
+        
+        pairs = planner.window_pairs(len(names), windows)
+        loops = planner.loop_closure_pairs(paths['images'], names, windows, callback=callback)
+        pairs = (pairs | loops) - probe
+        write_pairs_file(paths['pairs'], names, pairs)
+        if callback:
+            callback(f"Matching {len(pairs):,} pairs ({len(loops):,} loop closures)...")
+        
+        return self.colmap.matches_importer(
+            database_path=paths['database'],
+            match_list_path=paths['pairs'],
+            options=options,
+            callback=callback
+        )
+    
+    @_stage_method
+    def run_sparse_reconstruction(self, paths, partitioned=False, max_cluster_size=500,
+                                  callback=None):
+        """
+        Run sparse reconstruction using GloMAP (if available) or COLMAP mapper.
+        
+        Args:
+            paths: Dictionary of paths from setup_workspace
+            partitioned: Split the view graph into overlapping clusters,
+                reconstruct them in parallel and merge the sub-models
+            max_cluster_size: Maximum images per cluster (partitioned mode)
+            callback: Progress callback function
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        self._start_stage(PipelineStep.SPARSE_RECONSTRUCTION, callback)
+        
+        # Sub-models of an earlier run must not be ranked with the new ones
+        if archive_previous_models(paths['sparse']):
+            if callback:
+                callback(f"Moved the previous sparse models to {paths['sparse'] / 'previous'}")
+            paths['sparse_0'].mkdir(parents=True, exist_ok=True)
+        
+        if partitioned:
+            mapper = PartitionedMapper(self.colmap, self.glomap, max_cluster_size=max_cluster_size,
+                                       glomap_options=self.profile.options('glomap', 'mapper'),
+                                       colmap_options=self.profile.options('colmap', 'mapper'))
+            return mapper.run(
+                database_path=paths['database'],
+                image_path=paths['images'],
+                work_dir=paths['partitions'],
+                output_path=paths['sparse_0'],
+                callback=callback
+            )
         
         # Try GloMAP first (10-100x faster)
         glomap_ok, _ = self.glomap.check_installation()
@@ -157,20 +459,52 @@ class PhotogrammetryPipeline:
                 database_path=paths['database'],
                 image_path=paths['images'],
                 output_path=paths['sparse'],
+                options=self.profile.options('glomap', 'mapper'),
                 callback=callback
             )
         else:
-            # Fallback to COLMAP mapper
+            # Fallback to COLMAP mapper (writes numbered sub-models like GloMAP)
             if callback:
                 callback("GloMAP not found - using COLMAP mapper (slower but reliable)")
             
             return self.colmap.mapper(
                 database_path=paths['database'],
                 image_path=paths['images'],
-                output_path=paths['sparse_0'],
+                output_path=paths['sparse'],
+                options=self.profile.options('colmap', 'mapper'),
                 callback=callback
             )
     
+    @_stage_method
+    def select_sparse_model(self, paths, merge_overlapping=True, callback=None):
+        """
+        Rank all sparse sub-models and promote the best one to sparse/0.
+        
+        Mappers can split a scene into several sub-models (sparse/0,
+        sparse/1, ...). Sub-models sharing registered images with the best
+        one are merged into it first if merge_overlapping is set.
+        
+        Args:
+            paths: Dictionary of paths from setup_workspace
+            merge_overlapping: Merge sub-models overlapping the best one
+            callback: Progress callback function
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        self._start_stage(PipelineStep.MODEL_SELECTION, callback)
+        
+        total_images = None
+        if paths['database'].exists():
+            total_images = len(read_image_names(paths['database']))
+        
+        selector = SparseModelSelector(self.colmap, merge_overlapping=merge_overlapping)
+        try:
+            return selector.run(paths['sparse'], total_images=total_images, callback=callback)
+        except Exception as e:
+            return False, f"Model selection failed: {e}"
+    
+    @_stage_method
     def export_sparse_pointcloud(self, paths, callback=None):
         """
         Export sparse reconstruction to PLY format.
@@ -182,10 +516,7 @@ class PhotogrammetryPipeline:
         Returns:
             Tuple of (success, message)
         """
-        self.current_step = PipelineStep.EXPORT_SPARSE
-        
-        if callback:
-            callback(f"=== {PipelineStep.EXPORT_SPARSE.value} ===")
+        self._start_stage(PipelineStep.EXPORT_SPARSE, callback)
         
         return self.colmap.model_converter(
             input_path=paths['sparse_0'],
@@ -194,64 +525,215 @@ class PhotogrammetryPipeline:
             callback=callback
         )
     
-    def run_dense_reconstruction(self, paths, callback=None):
+    @_stage_method
+    def filter_point_cloud(self, input_path, output_path, method='statistical', callback=None):
+        """
+        Remove outliers (floaters) from an exported point cloud.
+        
+        The input file is left untouched; the cleaned cloud is written to
+        output_path.
+        
+        Args:
+            input_path: PLY file to filter (e.g. sparse.ply or fused.ply)
+            output_path: Filtered PLY file to write
+            method: 'statistical', 'radius' or 'both'
+            callback: Progress callback function
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        self._start_stage(PipelineStep.OUTLIER_REMOVAL, callback)
+        
+        try:
+            return PointCloudFilter(method=method).run(input_path, output_path, callback=callback)
+        except Exception as e:
+            return False, f"Outlier removal failed: {e}"
+    
+    @_stage_method
+    def sort_point_cloud(self, ply_path, callback=None):
+        """
+        Reorder a point cloud along the Z-curve and write its block index.
+        
+        Args:
+            ply_path: PLY file sorted in place (a .vis file next to it is
+                reordered as well)
+            callback: Progress callback function
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        self._start_stage(PipelineStep.MORTON_ORDER, callback)
+        
+        try:
+            return sort_ply_file(ply_path)
+        except Exception as e:
+            return False, f"Morton ordering failed: {e}"
+    
+    def postprocess_point_cloud(self, ply_path, clean_path, outlier_filter='statistical',
+                                morton_order=False, callback=None):
+        """
+        Optional Morton ordering and outlier removal of an exported cloud.
+        
+        Failures are reported as warnings; the exported cloud stays usable.
+        
+        Args:
+            ply_path: Exported PLY file
+            clean_path: Output of the outlier filter
+            outlier_filter: 'statistical', 'radius', 'both' or 'none'
+            morton_order: Sort both clouds in Morton order
+            callback: Progress callback function
+        """
+        emit(callback, Artifact('point_cloud', str(ply_path)))
+        steps = []
+        if morton_order:
+            steps.append(lambda: self.sort_point_cloud(ply_path, callback=callback))
+        if outlier_filter != 'none':
+            steps.append(lambda: self.filter_point_cloud(ply_path, clean_path, method=outlier_filter,
+                                                         callback=callback))
+            if morton_order:
+                # Large clouds are filtered slab by slab, which breaks the order
+                steps.append(lambda: sort_ply_file(clean_path))
+        
+        for step in steps:
+            success, msg = step()
+            if callback:
+                callback(msg if success else f"Warning: {msg}")
+            if not success:
+                break
+        else:
+            if outlier_filter != 'none':
+                emit(callback, Artifact('clean_point_cloud', str(clean_path)))
+    
+    @_stage_method
+    def run_dense_reconstruction(self, paths, clustered=False, max_cluster_size=200,
+                                 cluster_workers=2, source_views=10, min_depth_coverage=0.0,
+                                 min_depth_score=0.0, incremental_fusion=False, callback=None):
         """
         Run complete dense reconstruction pipeline.
         
         Args:
             paths: Dictionary of paths from setup_workspace
+            clustered: Reconstruct spatial clusters of cameras separately and
+                merge their fused clouds (bounded memory, parallel clusters)
+            max_cluster_size: Maximum images per cluster (clustered mode)
+            cluster_workers: Clusters processed concurrently (clustered mode)
+            source_views: Source images per reference image chosen from sparse
+                covisibility before stereo (0 keeps COLMAP's own selection)
+            min_depth_coverage: Only fuse depth maps with at least this valid fraction
+            min_depth_score: Only fuse depth maps with at least this quality score
+            incremental_fusion: Re-fuse only views whose depth maps changed since
+                the last run (single-workspace mode)
             callback: Progress callback function
             
         Returns:
             Tuple of (success, message)
         """
+        if clustered:
+            self._start_stage(PipelineStep.CLUSTERED_DENSE, callback)
+            
+            reconstructor = ClusteredDenseReconstructor(
+                self.colmap,
+                max_cluster_size=max_cluster_size,
+                max_workers=cluster_workers,
+                source_views=source_views,
+                depth_inspector=DepthMapInspector(min_coverage=min_depth_coverage,
+                                                  min_score=min_depth_score),
+                options={command: self.profile.options('colmap', command)
+                         for command in ('image_undistorter', 'patch_match_stereo', 'stereo_fusion')}
+            )
+            return reconstructor.run(
+                image_path=paths['images'],
+                sparse_path=paths['sparse_0'],
+                work_dir=paths['dense_clusters'],
+                output_path=paths['dense_ply'],
+                callback=callback
+            )
+        
         # Step 1: Image Undistortion
-        self.current_step = PipelineStep.IMAGE_UNDISTORTION
-        if callback:
-            callback(f"=== {PipelineStep.IMAGE_UNDISTORTION.value} ===")
+        self._start_stage(PipelineStep.IMAGE_UNDISTORTION, callback)
         
         success, msg = self.colmap.image_undistorter(
             image_path=paths['images'],
             input_path=paths['sparse_0'],
             output_path=paths['dense'],
+            options=self.profile.options('colmap', 'image_undistorter'),
             callback=callback
         )
         
         if not success:
             return False, f"Image undistortion failed: {msg}"
         
+        # Step 2a: Prune PatchMatch source views by covisibility
+        if source_views:
+            self._start_stage(PipelineStep.VIEW_SELECTION, callback)
+            
+            selector = SourceViewSelector(num_sources=source_views)
+            try:
+                success, msg = selector.run(paths['dense'], callback=callback)
+            except Exception as e:
+                success, msg = False, str(e)
+            if not success and callback:
+                callback(f"Warning: Keeping COLMAP's source views: {msg}")
+        
         # Step 2: Stereo Depth Computation
-        self.current_step = PipelineStep.STEREO_MATCHING
-        if callback:
-            callback(f"=== {PipelineStep.STEREO_MATCHING.value} ===")
+        self._start_stage(PipelineStep.STEREO_MATCHING, callback)
         
         success, msg = self.colmap.patch_match_stereo(
             workspace_path=paths['dense'],
+            options=self.profile.options('colmap', 'patch_match_stereo'),
             callback=callback
         )
         
         if not success:
             return False, f"Stereo matching failed: {msg}"
         
-        # Step 3: Depth Map Fusion
-        self.current_step = PipelineStep.DENSE_FUSION
+        # Step 2b: Inspect depth maps and drop bad views from fusion
+        self._start_stage(PipelineStep.DEPTH_INSPECTION, callback)
+        
+        inspector = DepthMapInspector(min_coverage=min_depth_coverage, min_score=min_depth_score)
+        try:
+            success, msg = inspector.run(paths['dense'], callback=callback)
+        except Exception as e:
+            success, msg = False, str(e)
         if callback:
-            callback(f"=== {PipelineStep.DENSE_FUSION.value} ===")
+            callback(msg if success else f"Warning: Depth map inspection failed: {msg}")
+        
+        # Step 3: Depth Map Fusion
+        self._start_stage(PipelineStep.DENSE_FUSION, callback)
+        
+        if incremental_fusion:
+            fusion = IncrementalFusion(self.colmap, ProjectManifest(paths['project']),
+                                       options=self.profile.options('colmap', 'stereo_fusion'))
+            return fusion.run(paths['dense'], paths['dense_ply'], callback=callback)
         
         success, msg = self.colmap.stereo_fusion(
             workspace_path=paths['dense'],
             output_path=paths['dense_ply'],
+            options=self.profile.options('colmap', 'stereo_fusion'),
             callback=callback
         )
         
         return success, msg
     
-    def run_dense_only(self, project_path, callback=None):
+    def run_dense_only(self, project_path, clustered=False, max_cluster_size=200,
+                       cluster_workers=2, source_views=10, min_depth_coverage=0.0,
+                       min_depth_score=0.0, incremental_fusion=False,
+                       outlier_filter='statistical', morton_order=False, callback=None):
         """
         Run dense reconstruction on existing sparse model.
         
         Args:
             project_path: Root path for the project with existing sparse reconstruction
+            clustered: Use clustered dense reconstruction
+            max_cluster_size: Maximum images per cluster (clustered mode)
+            cluster_workers: Clusters processed concurrently (clustered mode)
+            source_views: Source images per reference image (0 keeps COLMAP's)
+            min_depth_coverage: Minimum depth coverage of fused views
+            min_depth_score: Minimum depth quality score of fused views
+            incremental_fusion: Re-fuse only changed depth maps
+            outlier_filter: Outlier removal of the fused cloud ('statistical',
+                'radius', 'both' or 'none')
+            morton_order: Sort the fused cloud in Morton (Z-curve) order
             callback: Progress callback function
             
         Returns:
@@ -273,11 +755,27 @@ class PhotogrammetryPipeline:
         if not paths['images'].exists() or not any(paths['images'].iterdir()):
             return False, "No images found in images folder", paths
         
+        # Make sure sparse/0 holds the largest model
+        success, msg = self.select_sparse_model(paths, callback=callback)
+        if not success:
+            return False, msg, paths
+        
         # Run dense reconstruction
-        success, msg = self.run_dense_reconstruction(paths, callback=callback)
+        success, msg = self.run_dense_reconstruction(paths, clustered=clustered,
+                                                     max_cluster_size=max_cluster_size,
+                                                     cluster_workers=cluster_workers,
+                                                     source_views=source_views,
+                                                     min_depth_coverage=min_depth_coverage,
+                                                     min_depth_score=min_depth_score,
+                                                     incremental_fusion=incremental_fusion,
+                                                     callback=callback)
         if not success:
             return False, f"Dense reconstruction failed: {msg}", paths
         
+        self.postprocess_point_cloud(paths['dense_ply'], paths['dense_clean_ply'],
+                                     outlier_filter=outlier_filter, morton_order=morton_order,
+                                     callback=callback)
+        
         if callback:
             callback("========================================")
             callback("  Dense Reconstruction Completed!")
@@ -286,8 +784,108 @@ class PhotogrammetryPipeline:
         
         return True, "Dense reconstruction completed successfully", paths
     
+    @_stage_method
+    def prepare_dgut_dataset(self, paths, factors=(2, 4), callback=None):
+        """
+        Write the 3DGUT dataset (sparse model and pre-resized images) into paths['dgut_data'].
+        
+        Resized images are kept between runs and only redone for new or
+        changed images.
+        
+        Args:
+            paths: Dictionary of paths from setup_workspace
+            factors: Downsample factors written as images_<factor>
+            callback: Progress callback function
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        self._start_stage(PipelineStep.DGUT_DATASET, callback)
+        
+        builder = DGUTDatasetBuilder(factors=factors)
+        try:
+            return builder.build(paths['images'], paths['sparse_0'], paths['dgut_data'], callback=callback)
+        except Exception as e:
+            return False, f"Dataset preparation failed: {e}"
+    
+    @_stage_method
+    def prepare_dgut_seed(self, paths, max_points=1000000, voxel_size=None, callback=None):
+        """
+        Build the 3DGUT initialization cloud paths['dgut_seed_ply'] from the dense cloud.
+        
+        Uses fused_clean.ply if the outlier filter already ran, otherwise
+        fused.ply filtered here.
+        
+        Args:
+            paths: Dictionary of paths from setup_workspace
+            max_points: Maximum number of seed points
+            voxel_size: Downsampling voxel size (estimated if None)
+            callback: Progress callback function
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        self._start_stage(PipelineStep.DGUT_SEEDING, callback)
+        
+        if paths['dense_clean_ply'].exists():
+            source, outlier_filter = paths['dense_clean_ply'], 'none'
+        elif paths['dense_ply'].exists():
+            source, outlier_filter = paths['dense_ply'], 'statistical'
+        else:
+            return False, "No dense point cloud found (run dense reconstruction first)"
+        
+        builder = SeedPointBuilder(max_points=max_points, voxel_size=voxel_size,
+                                   outlier_filter=outlier_filter)
+        try:
+            return builder.run(source, paths['dgut_seed_ply'], callback=callback)
+        except Exception as e:
+            return False, f"Seed point generation failed: {e}"
+    
+    @_stage_method
+    def prune_splats(self, paths, min_opacity=0.005, min_contribution=0.5, sh_degree=None,
+                     merge_voxel=0.0, callback=None):
+        """
+        Prune the exported 3DGUT splats into paths['dgut_pruned_ply'].
+        
+        Uses pointcloud.ply if it was exported, otherwise the newest PLY
+        written by training into the 3dgut folder.
+        
+        Args:
+            paths: Dictionary of paths from setup_workspace
+            min_opacity: Minimum opacity of kept Gaussians
+            min_contribution: Minimum screen-space contribution in pixels
+            sh_degree: SH degree of the output (None keeps the trained degree)
+            merge_voxel: Voxel size for merging tiny Gaussians (0 disables)
+            callback: Progress callback function
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        self._start_stage(PipelineStep.SPLAT_PRUNING, callback)
+        
+        source = paths['dgut_ply']
+        if not source.exists():
+            candidates = [path for path in paths['dgut'].rglob('*.ply') if path != paths['dgut_pruned_ply']]
+            if not candidates:
+                return False, "No exported splat PLY found"
+            source = max(candidates, key=lambda path: path.stat().st_mtime)
+        
+        pruner = SplatPruner(min_opacity=min_opacity, min_contribution=min_contribution,
+                             sh_degree=sh_degree, merge_voxel=merge_voxel)
+        sparse_path = paths['sparse_0'] if (paths['sparse_0'] / 'images.bin').exists() else None
+        try:
+            return pruner.run(source, paths['dgut_pruned_ply'], sparse_path=sparse_path, callback=callback)
+        except Exception as e:
+            return False, f"Splat pruning failed: {e}"
+    
+    @_stage_method
     def run_3dgut_reconstruction(self, paths, camera_model='perspective', use_mcmc=True, 
-                                iterations=30000, export_ply=True, callback=None):
+                                iterations=30000, export_ply=True, down_sample_factor=2,
+                                dense_init=False, init_max_points=1000000,
+                                early_stopping=False, plateau_iterations=3000, min_psnr_gain=0.05,
+                                resume=True, checkpoint_budget_gb=20.0, prune_splats=True,
+                                splat_min_opacity=0.005, splat_min_contribution=0.5,
+                                splat_sh_degree=None, splat_merge_voxel=0.0, callback=None):
         """
         Run 3DGUT Gaussian Splatting reconstruction.
         
@@ -297,6 +895,21 @@ class PhotogrammetryPipeline:
             use_mcmc: Enable MCMC optimization
             iterations: Training iterations
             export_ply: Export point cloud after training
+            down_sample_factor: Training resolution (1=full, 2=half, 4=quarter)
+            dense_init: Seed the Gaussians from the filtered dense cloud
+                instead of the sparse points
+            init_max_points: Maximum number of dense seed points
+            early_stopping: Stop training when the loss/PSNR plateaus
+            plateau_iterations: Iterations without improvement before stopping
+            min_psnr_gain: Smallest PSNR gain (dB) counted as improvement
+            resume: Continue an interrupted training run from its newest checkpoint
+            checkpoint_budget_gb: Disk budget for checkpoints; the oldest are
+                deleted beyond it (None keeps all)
+            prune_splats: Write a pruned copy of the exported splats
+            splat_min_opacity: Minimum opacity of kept Gaussians
+            splat_min_contribution: Minimum screen-space contribution in pixels
+            splat_sh_degree: SH degree of the pruned splats (None keeps it)
+            splat_merge_voxel: Voxel size for merging tiny Gaussians (0 disables)
             callback: Progress callback function
             
         Returns:
@@ -310,28 +923,82 @@ class PhotogrammetryPipeline:
         if not ok:
             return False, f"3DGUT not available: {msg}"
         
-        # Step 1: Train 3DGUT model
-        self.current_step = PipelineStep.DGUT_TRAINING
+        # Make sure training starts from the largest sparse model
+        if paths['sparse'].exists():
+            success, msg = self.select_sparse_model(paths, callback=callback)
+            if not success:
+                return False, msg
+        
+        # Step 1: Dataset with images pre-resized for training
+        success, msg = self.prepare_dgut_dataset(paths, factors=sorted({2, 4, down_sample_factor}),
+                                                 callback=callback)
+        # With OpenCV available (resizing possible) a failure is a real one
+        if not success and DGUTDatasetBuilder(factors=(2,)).check_installation()[0]:
+            return False, f"3DGUT dataset preparation failed: {msg}"
+        if not success:
+            # Without OpenCV only the full-resolution images can be provided
+            if callback:
+                callback(f"Warning: {msg}; training at full resolution")
+            success, msg = self.prepare_dgut_dataset(paths, factors=(), callback=callback)
+            if not success:
+                return False, f"3DGUT dataset preparation failed: {msg}"
+            down_sample_factor = 1
         if callback:
-            callback(f"=== {PipelineStep.DGUT_TRAINING.value} ===")
+            callback(msg)
+        emit(callback, Artifact('dgut_dataset', str(paths['dgut_data'])))
+        
+        # Optional: seed from the dense cloud (falls back to sparse points)
+        init_point_cloud = None
+        if dense_init:
+            success, msg = self.prepare_dgut_seed(paths, max_points=init_max_points, callback=callback)
+            if success:
+                init_point_cloud = paths['dgut_seed_ply']
+                emit(callback, Artifact('seed_points', str(init_point_cloud)))
+            if callback:
+                callback(msg if success else f"Warning: {msg}; initializing from sparse points")
+        
+        # Step 2: Train 3DGUT model
+        self._start_stage(PipelineStep.DGUT_TRAINING, callback)
+        
+        tracker = CheckpointTracker(ProjectManifest(paths['project']), paths['dgut'],
+                                    disk_budget_gb=checkpoint_budget_gb)
+        settings = {'camera_model': camera_model, 'use_mcmc': use_mcmc, 'iterations': iterations,
+                    'down_sample_factor': down_sample_factor, 'dense_init': init_point_cloud is not None}
+        resume_checkpoint = tracker.resume_checkpoint(settings) if resume else None
+        if resume_checkpoint and callback:
+            callback(f"Resuming interrupted training from {resume_checkpoint.name}")
+        tracker.mark_started(settings)
         
         success, msg = self.dgut.train(
-            source_path=paths['images'],
+            source_path=paths['dgut_data'],
             model_path=paths['dgut'],
             camera_model=camera_model,
             use_mcmc=use_mcmc,
             iterations=iterations,
+            down_sample_factor=down_sample_factor,
+            init_point_cloud=init_point_cloud,
+            monitor=TrainingMonitor(patience=plateau_iterations,
+                                    min_psnr_gain=min_psnr_gain) if early_stopping else None,
+            resume_checkpoint=resume_checkpoint,
             callback=callback
         )
         
+        # A failed run stays resumable: only a finished run leaves 'running'
+        if success:
+            tracker.mark_finished(True, msg)
+        else:
+            tracker.scan()
+        deleted, freed = tracker.collect_garbage()
+        if deleted and callback:
+            callback(f"Removed {deleted} old checkpoints ({freed / 1024 ** 3:.1f} GB) to stay "
+                     f"within {checkpoint_budget_gb} GB")
+        
         if not success:
             return False, f"3DGUT training failed: {msg}"
         
-        # Step 2: Export to PLY (optional)
+        # Step 3: Export to PLY (optional)
         if export_ply:
-            self.current_step = PipelineStep.DGUT_EXPORT
-            if callback:
-                callback(f"=== {PipelineStep.DGUT_EXPORT.value} ===")
+            self._start_stage(PipelineStep.DGUT_EXPORT, callback)
             
             success, msg = self.dgut.export_pointcloud(
                 model_path=paths['dgut'],
@@ -343,19 +1010,60 @@ class PhotogrammetryPipeline:
             if not success:
                 if callback:
                     callback(f"Warning: Could not export point cloud: {msg}")
+            else:
+                emit(callback, Artifact('splats', str(paths['dgut_ply'])))
+            
+            # Step 4: Shrink the exported splats (optional)
+            if prune_splats:
+                success, msg = self.prune_splats(paths, min_opacity=splat_min_opacity,
+                                                 min_contribution=splat_min_contribution,
+                                                 sh_degree=splat_sh_degree,
+                                                 merge_voxel=splat_merge_voxel,
+                                                 callback=callback)
+                if callback:
+                    callback(msg if success else f"Warning: {msg}")
+                if success:
+                    emit(callback, Artifact('pruned_splats', str(paths['dgut_pruned_ply'])))
         
         return True, "3DGUT reconstruction completed successfully"
     
     def run_complete_pipeline(self, project_path, use_gpu=True, matcher_type='sequential',
-                             include_dense=False, callback=None):
+                             overlap=10, num_neighbors=20, max_distance=None,
+                             include_dense=False, video_window=0.5, remove_duplicates=False,
+                             num_shards=1, shard_hosts=None, partitioned=False,
+                             clustered_dense=False, dense_cluster_size=200,
+                             dense_cluster_workers=2, source_views=10, min_depth_coverage=0.0,
+                             min_depth_score=0.0, incremental_fusion=False,
+                             outlier_filter='statistical', morton_order=False, callback=None):
         """
         Run the complete photogrammetry pipeline.
         
+        If the images folder is empty but the project has a videos folder,
+        keyframes are extracted from the videos first.
+        
         Args:
             project_path: Root path for the project
             use_gpu: Enable GPU acceleration
-            matcher_type: 'sequential' or 'exhaustive'
+            matcher_type: 'sequential', 'adaptive', 'exhaustive', 'retrieval' or 'spatial'
+            overlap: Number of overlapping images (for sequential)
+            num_neighbors: Neighbours per image (for retrieval and spatial)
+            max_distance: Neighbour radius in meters (for spatial)
             include_dense: Whether to run dense reconstruction
+            video_window: Keyframe window in seconds for video input
+            remove_duplicates: Drop near-duplicate images before extraction and matching
+            num_shards: Concurrent feature extraction shards
+            shard_hosts: SSH hosts for extraction shards (local processes if None)
+            partitioned: Use partitioned (divide-and-conquer) sparse reconstruction
+            clustered_dense: Run dense reconstruction per spatial camera cluster
+            dense_cluster_size: Maximum images per dense cluster
+            dense_cluster_workers: Dense clusters processed concurrently
+            source_views: PatchMatch source images per reference image (0 keeps COLMAP's)
+            min_depth_coverage: Minimum depth coverage of fused views
+            min_depth_score: Minimum depth quality score of fused views
+            incremental_fusion: Re-fuse only changed depth maps
+            outlier_filter: Outlier removal of the sparse and fused clouds
+                ('statistical', 'radius', 'both' or 'none')
+            morton_order: Sort exported clouds in Morton (Z-curve) order
             callback: Progress callback function
             
         Returns:
@@ -365,40 +1073,86 @@ class PhotogrammetryPipeline:
             callback("========================================")
             callback("  GloMAP Photogrammetry Pipeline")
             callback("========================================")
+            callback(f"Parameter profile: {self.profile.name}")
         
         # Setup workspace
         paths = self.setup_workspace(project_path)
         
+        # Video input: extract keyframes into the images folder
+        has_images = paths['images'].exists() and any(paths['images'].iterdir())
+        if not has_images and find_videos(paths['videos']):
+            success, msg = self.run_video_ingestion(paths, window_seconds=video_window,
+                                                    callback=callback)
+            if not success:
+                return False, f"Pipeline failed at video ingestion: {msg}", paths
+        
         # Check if images exist
         if not paths['images'].exists() or not any(paths['images'].iterdir()):
             return False, "No images found in images folder", paths
         
+        # Near-duplicate removal (optional)
+        image_list_path = None
+        if remove_duplicates:
+            success, msg = self.run_duplicate_removal(paths, callback=callback)
+            if success:
+                image_list_path = paths['image_list']
+            elif callback:
+                callback(f"Warning: Could not remove near-duplicates: {msg}")
+        
         # Feature Extraction
-        success, msg = self.run_feature_extraction(paths, use_gpu=use_gpu, callback=callback)
+        success, msg = self.run_feature_extraction(paths, use_gpu=use_gpu,
+                                                   image_list_path=image_list_path,
+                                                   num_shards=num_shards,
+                                                   shard_hosts=shard_hosts,
+                                                   callback=callback)
         if not success:
             return False, f"Pipeline failed at feature extraction: {msg}", paths
         
         # Feature Matching
-        success, msg = self.run_feature_matching(paths, matcher_type=matcher_type, callback=callback)
+        success, msg = self.run_feature_matching(paths, matcher_type=matcher_type, overlap=overlap,
+                                                 num_neighbors=num_neighbors, max_distance=max_distance,
+                                                 callback=callback)
         if not success:
             return False, f"Pipeline failed at feature matching: {msg}", paths
         
         # Sparse Reconstruction (GloMAP)
-        success, msg = self.run_sparse_reconstruction(paths, callback=callback)
+        success, msg = self.run_sparse_reconstruction(paths, partitioned=partitioned, callback=callback)
         if not success:
             return False, f"Pipeline failed at sparse reconstruction: {msg}", paths
         
+        # Pick (or merge) the best sub-model so later steps never use a fragment
+        success, msg = self.select_sparse_model(paths, callback=callback)
+        if not success:
+            return False, f"Pipeline failed at model selection: {msg}", paths
+        if callback:
+            callback(msg)
+        
         # Export Sparse Point Cloud
         success, msg = self.export_sparse_pointcloud(paths, callback=callback)
         if not success:
             if callback:
                 callback(f"Warning: Could not export sparse point cloud: {msg}")
+        else:
+            self.postprocess_point_cloud(paths['sparse_ply'], paths['sparse_clean_ply'],
+                                         outlier_filter=outlier_filter, morton_order=morton_order,
+                                         callback=callback)
         
         # Dense Reconstruction (optional)
         if include_dense:
-            success, msg = self.run_dense_reconstruction(paths, callback=callback)
+            success, msg = self.run_dense_reconstruction(paths, clustered=clustered_dense,
+                                                         max_cluster_size=dense_cluster_size,
+                                                         cluster_workers=dense_cluster_workers,
+                                                         source_views=source_views,
+                                                         min_depth_coverage=min_depth_coverage,
+                                                         min_depth_score=min_depth_score,
+                                                         incremental_fusion=incremental_fusion,
+                                                         callback=callback)
             if not success:
                 return False, f"Pipeline failed at dense reconstruction: {msg}", paths
+            
+            self.postprocess_point_cloud(paths['dense_ply'], paths['dense_clean_ply'],
+                                         outlier_filter=outlier_filter, morton_order=morton_order,
+                                         callback=callback)
         
         if callback:
             callback("========================================")
@@ -0,0 +1,221 @@
+"""Vectorized PLY point cloud I/O based on NumPy structured arrays."""
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+
+# PLY property types and their NumPy equivalents
+PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1',
+    'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2',
+    'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4',
+    'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4',
+    'double': 'f8', 'float64': 'f8'
+}
+
+# Preferred PLY type names when writing
+_NUMPY_TO_PLY = {
+    'i1': 'char', 'u1': 'uchar', 'i2': 'short', 'u2': 'ushort',
+    'i4': 'int', 'u4': 'uint', 'f4': 'float', 'f8': 'double'
+}
+
+_BYTE_ORDERS = {
+    'binary_little_endian': '<',
+    'binary_big_endian': '>',
+    'ascii': '<'
+}
+
+
+def read_ply_header(path):
+    """
+    Parse the header of a PLY file.
+
+    Args:
+        path: Path to PLY file
+
+    Returns:
+        Dictionary with 'format', 'vertex_count', 'properties' (list of
+        (name, type) of the vertex element), 'comments' and 'data_start'
+
+    Raises:
+        ValueError: If the file is not a PLY file or the vertex element
+            uses list properties
+    """
+    with open(path, 'rb') as f:
+        if f.readline().strip() != b'ply':
+            raise ValueError(f"Not a PLY file: {path}")
+
+        header = {'format': 'ascii', 'vertex_count': 0, 'properties': [], 'comments': []}
+        element = None
+        while True:
+            line = f.readline()
+            if not line:
+                raise ValueError(f"Truncated PLY header: {path}")
+            parts = line.decode('ascii', errors='replace').split()
+            if not parts:
+                continue
+            if parts[0] == 'end_header':
+                break
+            if parts[0] == 'format':
+                header['format'] = parts[1]
+            elif parts[0] == 'comment':
+                header['comments'].append(' '.join(parts[1:]))
+            elif parts[0] == 'element':
+                element = parts[1]
+                if element == 'vertex':
+                    header['vertex_count'] = int(parts[2])
+            elif parts[0] == 'property' and element == 'vertex':
+                if parts[1] == 'list':
+                    raise ValueError("List properties on vertices are not supported")
+                header['properties'].append((parts[2], parts[1]))
+
+        header['data_start'] = f.tell()
+
+    if header['format'] not in _BYTE_ORDERS:
+        raise ValueError(f"Unknown PLY format: {header['format']}")
+    return header
+
+
+def ply_dtype(properties, byte_order='<'):
+    """
+    Build the structured dtype of a vertex record.
+
+    Args:
+        properties: List of (name, PLY type)
+        byte_order: '<' or '>'
+
+    Returns:
+        numpy.dtype
+    """
+    return np.dtype([(name, byte_order + PLY_TYPES[ply_type]) for name, ply_type in properties])
+
+
+def read_ply(path, mmap=False):
+    """
+    Read the vertices of a PLY file.
+
+    Binary files are read in one block (or memory-mapped), ASCII files
+    are parsed with NumPy.
+
+    Args:
+        path: Path to PLY file
+        mmap: Memory-map binary files instead of reading them into RAM
+
+    Returns:
+        Structured array with one field per vertex property
+    """
+    header = read_ply_header(path)
+    dtype = ply_dtype(header['properties'], _BYTE_ORDERS[header['format']])
+    count = header['vertex_count']
+
+    if header['format'] == 'ascii':
+        with open(path, 'rb') as f:
+            f.seek(header['data_start'])
+            values = np.loadtxt(f, dtype=np.float64, max_rows=count, ndmin=2)
+        vertices = np.empty(len(values), dtype=dtype)
+        for i, name in enumerate(dtype.names):
+            vertices[name] = values[:, i]
+        return vertices
+
+    if mmap:
+        return np.memmap(path, dtype=dtype, mode='r', offset=header['data_start'], shape=(count,))
+    with open(path, 'rb') as f:
+        f.seek(header['data_start'])
+        return np.fromfile(f, dtype=dtype, count=count)
+
+
+def write_ply_header(f, dtype, count, comments=()):
+    """Write a binary little-endian PLY header for a structured dtype."""
+    lines = ["ply", "format binary_little_endian 1.0"]
+    lines.extend(f"comment {comment}" for comment in comments)
+    lines.append(f"element vertex {count}")
+    for name in dtype.names:
+        lines.append(f"property {_NUMPY_TO_PLY[dtype[name].base.str[1:]]} {name}")
+    lines.append("end_header")
+    f.write(('\n'.join(lines) + '\n').encode('ascii'))
+
+
+def write_ply(path, vertices, comments=()):
+    """
+    Write vertices as a binary little-endian PLY file.
+
+    Args:
+        path: Output path
+        vertices: Structured array (one field per property)
+        comments: Optional header comments
+    """
+    dtype = np.dtype([(name, '<' + vertices.dtype[name].base.str[1:]) for name in vertices.dtype.names])
+    with open(Path(path), 'wb') as f:
+        write_ply_header(f, dtype, len(vertices), comments)
+        np.ascontiguousarray(vertices, dtype=dtype).tofile(f)
+
+
+class PlyWriter:
+    """
+    Streams vertex chunks into a binary PLY file whose size is not known up front.
+
+    Chunks go to a temporary body file; the header with the final vertex
+    count is written when the writer is closed. Use as a context manager.
+    """
+
+    def __init__(self, path, dtype, comments=()):
+        """
+        Open a writer.
+
+        Args:
+            path: Output path
+            dtype: Structured dtype of the vertices (stored little-endian)
+            comments: Optional header comments
+        """
+        self.path = Path(path)
+        self.dtype = np.dtype([(name, '<' + dtype[name].base.str[1:]) for name in dtype.names])
+        self.comments = list(comments)
+        self.count = 0
+        self._body_path = self.path.with_name(self.path.name + '.body')
+        self._body = open(self._body_path, 'wb')
+
+    def write(self, vertices):
+        """Append a chunk of vertices."""
+        np.ascontiguousarray(vertices, dtype=self.dtype).tofile(self._body)
+        self.count += len(vertices)
+
+    def close(self):
+        """Write the final file and remove the temporary body."""
+        if self._body is None:
+            return
+        self._body.close()
+        self._body = None
+        try:
+            with open(self.path, 'wb') as f, open(self._body_path, 'rb') as body:
+                write_ply_header(f, self.dtype, self.count, self.comments)
+                shutil.copyfileobj(body, f, 16 << 20)
+        finally:
+            self._body_path.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._body.close()
+            self._body = None
+            self._body_path.unlink()
+
+
+def xyz_of(vertices):
+    """
+    Positions of a vertex array.
+
+    Args:
+        vertices: Structured array with x, y, z fields
+
+    Returns:
+        N x 3 float64 array
+    """
+    return np.stack([vertices['x'], vertices['y'], vertices['z']], axis=1).astype(np.float64)
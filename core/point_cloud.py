@@ -0,0 +1,70 @@
+"""Vectorized point cloud operations (voxel grids, spacing)."""
+import numpy as np
+
+from utils.spatial import NeighborIndex
+
+
+# Bits per axis when packing voxel coordinates into one int64 key
+_KEY_BITS = 21
+
+
+def voxel_coordinates(xyz, voxel_size, origin=None):
+    """
+    Integer voxel coordinates of points.
+
+    Args:
+        xyz: N x 3 positions
+        voxel_size: Voxel edge length
+        origin: Grid origin (defaults to the minimum corner of xyz)
+
+    Returns:
+        N x 3 int64 array
+    """
+    if origin is None:
+        origin = xyz.min(axis=0)
+    return np.floor((xyz - origin) / voxel_size).astype(np.int64)
+
+
+def voxel_labels(xyz, voxel_size):
+    """
+    Group points by voxel.
+
+    Args:
+        xyz: N x 3 positions
+        voxel_size: Voxel edge length
+
+    Returns:
+        Tuple of (labels, first_index): labels maps each point to a voxel
+        number, first_index holds the first point of every voxel
+    """
+    if len(xyz) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    coords = voxel_coordinates(xyz, voxel_size)
+    if coords.max() < (1 << _KEY_BITS):
+        keys = (coords[:, 0] << (2 * _KEY_BITS)) | (coords[:, 1] << _KEY_BITS) | coords[:, 2]
+        _, first_index, labels = np.unique(keys, return_index=True, return_inverse=True)
+    else:
+        _, first_index, labels = np.unique(coords, axis=0, return_index=True, return_inverse=True)
+    return labels.reshape(-1), first_index
+
+
+def estimate_spacing(xyz, sample_size=10000, seed=0):
+    """
+    Estimate the typical point spacing of a cloud.
+
+    Args:
+        xyz: N x 3 positions
+        sample_size: Points sampled for the estimate
+        seed: Random seed of the sample
+
+    Returns:
+        Median nearest-neighbour distance (0.0 for fewer than two points)
+    """
+    if len(xyz) < 2:
+        return 0.0
+    rng = np.random.default_rng(seed)
+    sample = xyz if len(xyz) <= sample_size else xyz[rng.choice(len(xyz), sample_size, replace=False)]
+    distances, _ = NeighborIndex(sample).query_knn(sample, 2)
+    return float(np.median(distances[:, 1]))
+
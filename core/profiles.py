@@ -0,0 +1,255 @@
+"""Tuned GloMAP/COLMAP parameter profiles trading accuracy for throughput."""
+import copy
+import json
+from pathlib import Path
+
+
+# Default location of the application configuration
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.json'
+
+DEFAULT_PROFILE = 'balanced'
+
+# Options are grouped by tool and command; keys are the command-line option
+# names without the leading '--'. 'balanced' reproduces the previous
+# hard-coded values.
+BUILTIN_PROFILES = {
+    'draft': {
+        'description': 'Fast preview: reduced solver budgets and dense resolution',
+        'glomap': {
+            'mapper': {
+                'GlobalPositioning.max_num_iterations': 50,
+                'BundleAdjustment.max_num_iterations': 50
+            }
+        },
+        'colmap': {
+            'mapper': {
+                'Mapper.ba_global_max_num_iterations': 20,
+                'Mapper.ba_local_max_num_iterations': 10,
+                'Mapper.ba_global_max_refinements': 2
+            },
+            'image_undistorter': {
+                'max_image_size': 1200
+            },
+            'patch_match_stereo': {
+                'PatchMatchStereo.max_image_size': 1200,
+                'PatchMatchStereo.window_radius': 4,
+                'PatchMatchStereo.num_iterations': 3,
+                'PatchMatchStereo.num_samples': 10
+            },
+            'stereo_fusion': {
+                'StereoFusion.max_image_size': 1200,
+                'StereoFusion.min_num_pixels': 3
+            }
+        }
+    },
+    'balanced': {
+        'description': 'Default quality and runtime',
+        'glomap': {
+            'mapper': {}
+        },
+        'colmap': {
+            'mapper': {},
+            'image_undistorter': {
+                'max_image_size': 2000
+            },
+            'patch_match_stereo': {
+                'PatchMatchStereo.window_radius': 5
+            },
+            'stereo_fusion': {
+                'StereoFusion.min_num_pixels': 3
+            }
+        }
+    },
+    'survey-grade': {
+        'description': 'Highest accuracy: larger solver budgets and full dense resolution',
+        'glomap': {
+            'mapper': {
+                'GlobalPositioning.max_num_iterations': 300,
+                'BundleAdjustment.max_num_iterations': 500
+            }
+        },
+        'colmap': {
+            'mapper': {
+                'Mapper.ba_global_max_num_iterations': 100,
+                'Mapper.ba_local_max_num_iterations': 40,
+                'Mapper.ba_global_max_refinements': 5
+            },
+            'image_undistorter': {
+                'max_image_size': 3200
+            },
+            'patch_match_stereo': {
+                'PatchMatchStereo.max_image_size': 3200,
+                'PatchMatchStereo.window_radius': 7,
+                'PatchMatchStereo.num_iterations': 7,
+                'PatchMatchStereo.num_samples': 20
+            },
+            'stereo_fusion': {
+                'StereoFusion.max_image_size': 3200,
+                'StereoFusion.min_num_pixels': 5
+            }
+        }
+    }
+}
+
+# Options receiving the profile's 'num_threads' value, per (tool, command)
+THREAD_OPTIONS = {
+    ('glomap', 'mapper'): ['GlobalPositioning.thread_num', 'BundleAdjustment.thread_num'],
+    ('colmap', 'feature_extraction'): ['SiftExtraction.num_threads'],
+    ('colmap', 'matching'): ['SiftMatching.num_threads'],
+    ('colmap', 'mapper'): ['Mapper.num_threads'],
+    ('colmap', 'stereo_fusion'): ['StereoFusion.num_threads']
+}
+
+# Legacy 'processing' keys of config.json and the options they override
+LEGACY_OPTIONS = {
+    'dense_window_radius': ('colmap', 'patch_match_stereo', 'PatchMatchStereo.window_radius'),
+    'min_num_pixels': ('colmap', 'stereo_fusion', 'StereoFusion.min_num_pixels')
+}
+
+
+def build_option_args(defaults, options=None):
+    """
+    Turn option dictionaries into command-line arguments.
+
+    Args:
+        defaults: Options used unless overridden
+        options: Overriding options (a value of None removes the option)
+
+    Returns:
+        List of arguments, e.g. ['--PatchMatchStereo.window_radius', '5']
+    """
+    merged = dict(defaults)
+    merged.update(options or {})
+    args = []
+    for key, value in merged.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = int(value)
+        args.extend([f"--{key}", str(value)])
+    return args
+
+
+def _deep_update(target, source):
+    """Recursively merge source into target."""
+    for key, value in source.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _deep_update(target[key], value)
+        else:
+            target[key] = copy.deepcopy(value)
+    return target
+
+
+def load_config(config_path=None):
+    """
+    Load config.json.
+
+    Args:
+        config_path: Path to configuration file (defaults to CONFIG_PATH)
+
+    Returns:
+        Configuration dictionary (empty if missing or invalid)
+    """
+    try:
+        with open(config_path or CONFIG_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_profiles(config=None):
+    """
+    Built-in profiles merged with the 'profiles' section of config.json.
+
+    Profiles in the configuration override built-in ones option by option,
+    or define new ones.
+
+    Args:
+        config: Configuration dictionary (loaded from config.json if None)
+
+    Returns:
+        Dictionary of profile name -> profile settings
+    """
+    if config is None:
+        config = load_config()
+    profiles = copy.deepcopy(BUILTIN_PROFILES)
+    for name, settings in (config.get('profiles') or {}).items():
+        _deep_update(profiles.setdefault(name, {}), settings)
+    return profiles
+
+
+class ParameterProfile:
+    """Resolved option set for all GloMAP/COLMAP commands of a run."""
+
+    def __init__(self, name, settings, num_threads=None):
+        """
+        Initialize profile.
+
+        Args:
+            name: Profile name
+            settings: Profile settings from load_profiles
+            num_threads: Thread count for all commands (None keeps tool defaults)
+        """
+        self.name = name
+        self.settings = settings
+        self.num_threads = settings.get('num_threads', num_threads)
+
+    @property
+    def description(self):
+        """Short human-readable description."""
+        return self.settings.get('description', '')
+
+    def options(self, tool, command):
+        """
+        Options for one command.
+
+        Args:
+            tool: 'glomap' or 'colmap'
+            command: Command name, e.g. 'mapper' or 'patch_match_stereo'
+
+        Returns:
+            Dictionary of option name -> value
+        """
+        options = {}
+        if self.num_threads:
+            for key in THREAD_OPTIONS.get((tool, command), []):
+                options[key] = self.num_threads
+        options.update(self.settings.get(tool, {}).get(command, {}))
+        return options
+
+
+def resolve_profile(name=None, config=None):
+    """
+    Resolve a profile by name, applying deployment overrides from config.json.
+
+    The 'processing' section may select the profile ('profile'), set a
+    global thread count ('num_threads') and still use the older
+    'dense_window_radius' and 'min_num_pixels' keys, which take precedence
+    over the profile's values.
+
+    Args:
+        name: Profile name (defaults to processing.profile, then DEFAULT_PROFILE)
+        config: Configuration dictionary (loaded from config.json if None)
+
+    Returns:
+        ParameterProfile
+
+    Raises:
+        ValueError: If the profile does not exist
+    """
+    if config is None:
+        config = load_config()
+    processing = config.get('processing') or {}
+    profiles = load_profiles(config)
+
+    name = name or processing.get('profile') or DEFAULT_PROFILE
+    if name not in profiles:
+        raise ValueError(f"Unknown parameter profile '{name}' "
+                         f"(available: {', '.join(sorted(profiles))})")
+
+    settings = copy.deepcopy(profiles[name])
+    for key, (tool, command, option) in LEGACY_OPTIONS.items():
+        if processing.get(key) is not None:
+            settings.setdefault(tool, {}).setdefault(command, {})[option] = processing[key]
+
+    return ParameterProfile(name, settings, num_threads=processing.get('num_threads'))
@@ -0,0 +1,259 @@
+"""Client side of the long-lived 3DGUT render worker."""
+import atexit
+import itertools
+import json
+import math
+import os
+import secrets
+import subprocess
+import threading
+from multiprocessing.connection import Client
+from pathlib import Path
+
+
+WORKER_SCRIPT = Path(__file__).with_name('render_worker.py')
+
+
+def turntable_trajectory(center, radius, elevation=0.0, num_frames=120, width=1280, height=720,
+                         fov_deg=60.0, up=(0.0, 0.0, 1.0)):
+    """
+    Camera trajectory circling a point, for turntable renders.
+
+    Args:
+        center: Point looked at (x, y, z)
+        radius: Orbit radius
+        elevation: Camera height above the center (along up)
+        num_frames: Frames per revolution
+        width: Image width in pixels
+        height: Image height in pixels
+        fov_deg: Horizontal field of view
+        up: World up axis ((0, 0, 1) or (0, -1, 0) for COLMAP scenes
+            without gravity alignment)
+
+    Returns:
+        Trajectory dictionary (see render_worker.write_trajectory_dataset)
+    """
+    up = [float(v) for v in up]
+    # Two axes spanning the orbit plane
+    a = [1.0, 0.0, 0.0] if abs(up[0]) < 0.9 else [0.0, 1.0, 0.0]
+    dot = sum(x * y for x, y in zip(a, up))
+    a = [x - dot * y for x, y in zip(a, up)]
+    norm = math.sqrt(sum(x * x for x in a))
+    a = [x / norm for x in a]
+    b = [up[1] * a[2] - up[2] * a[1], up[2] * a[0] - up[0] * a[2], up[0] * a[1] - up[1] * a[0]]
+
+    frames = []
+    for i in range(num_frames):
+        angle = 2 * math.pi * i / num_frames
+        position = [c + radius * (math.cos(angle) * x + math.sin(angle) * y) + elevation * u
+                    for c, x, y, u in zip(center, a, b, up)]
+        frames.append({'name': f"turntable_{i:04d}.png", 'position': position,
+                       'look_at': list(center), 'up': up})
+    return {'width': width, 'height': height, 'fov_deg': fov_deg, 'frames': frames}
+
+
+def load_trajectory(path):
+    """Load a trajectory JSON file."""
+    return json.loads(Path(path).read_text(encoding='utf-8'))
+
+
+class RenderService:
+    """
+    Handle to a render worker process that keeps 3DGUT models loaded.
+
+    The worker is started once (model loading and CUDA initialization are
+    paid on the first job per model) and then serves render jobs over an
+    authenticated localhost socket. Jobs from several threads are queued
+    by the worker and rendered one after another.
+    """
+
+    def __init__(self, dgut_path=None, python='python', backend=None, max_models=1):
+        """
+        Initialize service handle (the worker starts on first use).
+
+        Args:
+            dgut_path: 3DGUT installation folder
+            python: Python interpreter of the 3DGUT environment
+            backend: Render backend as 'module:Class' (3DGRUT if None)
+            max_models: Models the worker keeps loaded at once
+        """
+        self.dgut_path = dgut_path
+        self.python = python
+        self.backend = backend
+        self.max_models = max_models
+        self.process = None
+        self.connection = None
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._reader = None
+
+    def start(self, timeout=120):
+        """
+        Start the worker process if it is not running.
+
+        Args:
+            timeout: Seconds to wait for the worker to listen
+
+        Raises:
+            RuntimeError: If the worker does not come up
+        """
+        if self.is_running():
+            return
+        authkey = secrets.token_bytes(32)
+        env = os.environ.copy()
+        env['RENDER_WORKER_AUTHKEY'] = authkey.hex()
+        cmd = [self.python, str(WORKER_SCRIPT), '--max-models', str(self.max_models), '--watch-stdin']
+        if self.dgut_path:
+            cmd.extend(['--dgut-path', str(self.dgut_path)])
+        if self.backend:
+            cmd.extend(['--backend', self.backend])
+
+        # The worker exits when this pipe closes, so it never outlives this process
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT, text=True, env=env, bufsize=1)
+        atexit.register(self.stop)
+        ready = {}
+
+        def wait_ready():
+            for line in self.process.stdout:
+                if line.startswith('READY '):
+                    _, host, port = line.split()
+                    ready['address'] = (host, int(port))
+                    return
+                ready.setdefault('output', []).append(line.rstrip())
+
+        waiter = threading.Thread(target=wait_ready, daemon=True)
+        waiter.start()
+        waiter.join(timeout)
+        if 'address' not in ready:
+            self.stop()
+            details = '\n'.join(ready.get('output', [])[-20:])
+            raise RuntimeError(f"Render worker did not start{': ' + details if details else ''}")
+
+        # Keep draining worker output so it never blocks on a full pipe
+        threading.Thread(target=self.process.stdout.read, daemon=True).start()
+        self.connection = Client(ready['address'], authkey=authkey)
+        self._reader = threading.Thread(target=self._read_replies, daemon=True)
+        self._reader.start()
+
+    def is_running(self):
+        """Check whether the worker process is alive."""
+        return self.process is not None and self.process.poll() is None and self.connection is not None
+
+    def _read_replies(self):
+        """Dispatch worker replies to the waiting requests."""
+        try:
+            while True:
+                message = self.connection.recv()
+                with self._lock:
+                    slot = self._pending.pop(message.get('id'), None)
+                if slot:
+                    slot['reply'] = message
+                    slot['event'].set()
+        except Exception:
+            # Worker exited or the connection was closed by stop()
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            for slot in pending.values():
+                slot['reply'] = {'status': 'error', 'message': 'Render worker exited'}
+                slot['event'].set()
+
+    def submit(self, request):
+        """
+        Queue a request without waiting.
+
+        Args:
+            request: Request dictionary
+
+        Returns:
+            Handle to pass to wait
+        """
+        self.start()
+        request = dict(request, id=next(self._ids))
+        slot = {'event': threading.Event(), 'reply': None}
+        with self._lock:
+            self._pending[request['id']] = slot
+            self.connection.send(request)
+        return slot
+
+    @staticmethod
+    def wait(handle, timeout=None):
+        """
+        Wait for a submitted request.
+
+        Returns:
+            Reply dictionary ('status' is 'done', 'ok' or 'error')
+        """
+        if not handle['event'].wait(timeout):
+            return {'status': 'error', 'message': 'Timed out waiting for render worker'}
+        return handle['reply']
+
+    def render(self, checkpoint, output_path, trajectory=None, dataset_path=None, timeout=None):
+        """
+        Render a trajectory or the cameras of a dataset.
+
+        Args:
+            checkpoint: Trained model checkpoint (ckpt_*.pt)
+            output_path: Folder receiving the rendered images
+            trajectory: Trajectory dictionary or path to a trajectory JSON
+            dataset_path: COLMAP dataset whose cameras are rendered
+                (used when no trajectory is given)
+            timeout: Seconds to wait for the job
+
+        Returns:
+            Tuple of (success, message)
+        """
+        if trajectory is not None and not isinstance(trajectory, dict):
+            trajectory = load_trajectory(trajectory)
+        if trajectory is None and dataset_path is None:
+            return False, "Nothing to render: give a trajectory or a dataset"
+
+        reply = self.wait(self.submit({
+            'command': 'render',
+            'checkpoint': str(checkpoint),
+            'output_path': str(output_path),
+            'trajectory': trajectory,
+            'dataset_path': str(dataset_path) if dataset_path else None
+        }), timeout)
+
+        if reply.get('status') != 'done':
+            return False, f"Render failed: {reply.get('message', 'unknown error')}"
+        frames = f"{reply['frames']} frames" if reply.get('frames') is not None else "dataset cameras"
+        cached = "model loaded" if reply.get('model_loaded') else "cached model"
+        return True, f"Rendered {frames} in {reply['seconds']:.1f}s ({cached}) to {reply['output_path']}"
+
+    def ping(self, timeout=10):
+        """Worker status (queued jobs, loaded models, jobs rendered)."""
+        return self.wait(self.submit({'command': 'ping'}), timeout)
+
+    def stop(self, timeout=30):
+        """Shut the worker down."""
+        if self.connection is not None and self.process is not None and self.process.poll() is None:
+            try:
+                self.wait(self.submit({'command': 'shutdown'}), timeout)
+            except (OSError, EOFError):
+                pass
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        if self.process is not None:
+            if self.process.stdin is not None:
+                try:
+                    self.process.stdin.close()
+                except OSError:
+                    pass
+            try:
+                self.process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+        atexit.unregister(self.stop)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.stop()
@@ -0,0 +1,291 @@
+"""
+Long-lived 3DGUT render worker.
+
+Started by core.render_service.RenderService inside the 3DGUT Python
+environment. It listens on a local socket, queues render jobs from any
+number of clients and renders them one at a time on the GPU, keeping the
+most recently used models loaded between jobs. It exits when asked to,
+when its last client disconnects or (with --watch-stdin) when the
+parent closes its stdin.
+
+This file only depends on the standard library and NumPy at import time
+so it can run in the 3DGUT environment without the rest of this package.
+"""
+import argparse
+import importlib
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import traceback
+import zlib
+from collections import OrderedDict
+from multiprocessing.connection import Listener
+from pathlib import Path
+
+import numpy as np
+
+
+def _look_at_rotation(position, target, up):
+    """World-to-camera rotation (COLMAP convention: x right, y down, z forward)."""
+    forward = np.asarray(target, dtype=np.float64) - position
+    forward /= np.linalg.norm(forward)
+    right = np.cross(forward, np.asarray(up, dtype=np.float64))
+    if np.linalg.norm(right) < 1e-9:
+        right = np.cross(forward, [1.0, 0.0, 0.0])
+    right /= np.linalg.norm(right)
+    down = np.cross(forward, right)
+    return np.stack([right, down, forward])
+
+
+def _rotmat_to_qvec(R):
+    """Rotation matrix to a COLMAP quaternion (w, x, y, z)."""
+    K = np.array([
+        [R[0, 0] - R[1, 1] - R[2, 2], 0, 0, 0],
+        [R[1, 0] + R[0, 1], R[1, 1] - R[0, 0] - R[2, 2], 0, 0],
+        [R[2, 0] + R[0, 2], R[2, 1] + R[1, 2], R[2, 2] - R[0, 0] - R[1, 1], 0],
+        [R[2, 1] - R[1, 2], R[0, 2] - R[2, 0], R[1, 0] - R[0, 1], R[0, 0] + R[1, 1] + R[2, 2]]
+    ]) / 3.0
+    values, vectors = np.linalg.eigh(K)
+    qvec = vectors[[3, 0, 1, 2], np.argmax(values)]
+    return -qvec if qvec[0] < 0 else qvec
+
+
+def _blank_png(width, height):
+    """Encode a black RGB image as PNG bytes."""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    rows = (b'\x00' + bytes(3 * width)) * height
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows, 9))
+            + chunk(b'IEND', b''))
+
+
+def write_trajectory_dataset(trajectory, dataset_path):
+    """
+    Write a camera trajectory as a COLMAP text dataset 3DGUT can load.
+
+    Every frame gets a blank placeholder image of the trajectory's
+    resolution (the loader expects one per camera).
+
+    Args:
+        trajectory: Dictionary with 'width', 'height', 'fx' (or 'fov_deg')
+            and 'frames', each frame holding 'name' and either 'qvec' and
+            'tvec' (world-to-camera) or 'position' and 'look_at' (and 'up')
+        dataset_path: Output folder (images/ and sparse/0/ are created)
+
+    Returns:
+        Number of frames
+    """
+    dataset_path = Path(dataset_path)
+    image_dir = dataset_path / 'images'
+    sparse_dir = dataset_path / 'sparse' / '0'
+    image_dir.mkdir(parents=True, exist_ok=True)
+    sparse_dir.mkdir(parents=True, exist_ok=True)
+
+    width, height = int(trajectory['width']), int(trajectory['height'])
+    fx = trajectory.get('fx') or 0.5 * width / np.tan(np.radians(trajectory.get('fov_deg', 60.0)) / 2)
+    fy = trajectory.get('fy', fx)
+    (sparse_dir / 'cameras.txt').write_text(
+        f"1 PINHOLE {width} {height} {fx} {fy} {width / 2} {height / 2}\n", encoding='utf-8')
+
+    blank = _blank_png(width, height)
+    lines = []
+    for i, frame in enumerate(trajectory['frames']):
+        name = frame.get('name') or f"frame_{i:05d}.png"
+        if 'qvec' in frame:
+            qvec, tvec = np.asarray(frame['qvec'], dtype=np.float64), np.asarray(frame['tvec'], dtype=np.float64)
+        else:
+            position = np.asarray(frame['position'], dtype=np.float64)
+            R = _look_at_rotation(position, frame['look_at'], frame.get('up', [0.0, 0.0, 1.0]))
+            qvec, tvec = _rotmat_to_qvec(R), -R @ position
+        lines.append(' '.join(str(v) for v in [i + 1, *qvec, *tvec, 1, name]))
+        lines.append('')
+        (image_dir / name).write_bytes(blank)
+    (sparse_dir / 'images.txt').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    (sparse_dir / 'points3D.txt').write_text('', encoding='utf-8')
+    return len(trajectory['frames'])
+
+
+class GrutRenderBackend:
+    """
+    Renders with 3DGRUT's Renderer, keeping the loaded Gaussians between jobs.
+
+    A model is loaded once with Renderer.from_checkpoint; later jobs build
+    a new Renderer around the same model and configuration, which only
+    creates the dataloader of the requested dataset.
+    """
+
+    def __init__(self, dgut_path=None):
+        if dgut_path and dgut_path not in sys.path:
+            sys.path.insert(0, dgut_path)
+        from threedgrut.render import Renderer
+        self.renderer_class = Renderer
+
+    def load(self, checkpoint, dataset_path, output_path):
+        """Load a checkpoint; returns the renderer used as the cached model."""
+        return self.renderer_class.from_checkpoint(
+            checkpoint_path=str(checkpoint), path=str(dataset_path), out_dir=str(output_path),
+            save_gt=False, computes_extra_metrics=False)
+
+    def render(self, model, dataset_path, output_path):
+        """Render every camera of a dataset with a loaded model."""
+        renderer = self.renderer_class(
+            model=model.model, conf=model.conf, global_step=model.global_step,
+            out_dir=str(output_path), path=str(dataset_path), save_gt=False,
+            compute_extra_metrics=False)
+        renderer.render_all()
+
+
+def _load_backend(spec, dgut_path):
+    """Instantiate a backend from 'module:Class' (the 3DGRUT backend if empty)."""
+    if not spec:
+        return GrutRenderBackend(dgut_path)
+    module_name, class_name = spec.split(':')
+    return getattr(importlib.import_module(module_name), class_name)(dgut_path)
+
+
+class RenderWorker:
+    """Queue of render jobs served by a single GPU thread with a model cache."""
+
+    def __init__(self, backend, max_models=1):
+        self.backend = backend
+        self.max_models = max_models
+        self.models = OrderedDict()
+        self.jobs = queue.Queue()
+        self.rendered = 0
+
+    def _model(self, checkpoint, dataset_path, output_path):
+        """Get a cached model, loading (and evicting the oldest) if needed."""
+        key = str(Path(checkpoint).resolve())
+        if key in self.models:
+            self.models.move_to_end(key)
+            return self.models[key], False
+        model = self.backend.load(checkpoint, dataset_path, output_path)
+        self.models[key] = model
+        while len(self.models) > self.max_models:
+            self.models.popitem(last=False)
+        return model, True
+
+    def process(self, job):
+        """Run one job and return its reply."""
+        started = time.time()
+        output_path = Path(job['output_path'])
+        output_path.mkdir(parents=True, exist_ok=True)
+        dataset_path = job.get('dataset_path')
+        frames = None
+        if job.get('trajectory'):
+            dataset_path = output_path / '_trajectory'
+            frames = write_trajectory_dataset(job['trajectory'], dataset_path)
+
+        model, loaded = self._model(job['checkpoint'], dataset_path, output_path)
+        self.backend.render(model, dataset_path, output_path)
+        self.rendered += 1
+        return {'status': 'done', 'frames': frames, 'model_loaded': loaded,
+                'seconds': time.time() - started, 'output_path': str(output_path)}
+
+    def serve_forever(self):
+        """Process queued jobs until a None job arrives."""
+        while True:
+            item = self.jobs.get()
+            if item is None:
+                return
+            job, reply = item
+            try:
+                result = self.process(job)
+            except Exception as e:
+                result = {'status': 'error', 'message': str(e), 'traceback': traceback.format_exc()}
+            result['id'] = job.get('id')
+            reply(result)
+
+
+def _handle_client(connection, worker, stop):
+    """Read requests of one client and queue them."""
+    lock = threading.Lock()
+
+    def reply(message):
+        with lock:
+            try:
+                connection.send(message)
+            except (OSError, EOFError):
+                pass
+
+    try:
+        while True:
+            request = connection.recv()
+            command = request.get('command', 'render')
+            if command == 'ping':
+                reply({'id': request.get('id'), 'status': 'ok', 'queued': worker.jobs.qsize(),
+                       'models': list(worker.models), 'rendered': worker.rendered})
+            elif command == 'shutdown':
+                reply({'id': request.get('id'), 'status': 'ok'})
+                stop()
+                return
+            else:
+                worker.jobs.put((request, reply))
+    except (EOFError, OSError):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='3DGUT render worker')
+    parser.add_argument('--dgut-path', help='3DGUT installation folder')
+    parser.add_argument('--backend', default='', help='Render backend as module:Class')
+    parser.add_argument('--max-models', type=int, default=1, help='Models kept loaded')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--watch-stdin', action='store_true',
+                        help='Exit when stdin closes (the parent process went away)')
+    args = parser.parse_args()
+
+    authkey = bytes.fromhex(os.environ.pop('RENDER_WORKER_AUTHKEY'))
+    worker = RenderWorker(_load_backend(args.backend, args.dgut_path), max_models=args.max_models)
+    listener = Listener((args.host, args.port), authkey=authkey)
+
+    def stop():
+        worker.jobs.put(None)
+        listener.close()
+
+    clients = {'count': 0}
+    clients_lock = threading.Lock()
+
+    def serve(connection):
+        _handle_client(connection, worker, stop)
+        connection.close()
+        with clients_lock:
+            clients['count'] -= 1
+            last = clients['count'] == 0
+        if last:
+            stop()
+
+    def accept():
+        while True:
+            try:
+                connection = listener.accept()
+            except (OSError, EOFError):
+                return
+            except Exception:
+                # Failed handshake (wrong authkey); keep serving
+                continue
+            with clients_lock:
+                clients['count'] += 1
+            threading.Thread(target=serve, args=(connection,), daemon=True).start()
+
+    def watch_stdin():
+        sys.stdin.read()
+        stop()
+
+    threading.Thread(target=accept, daemon=True).start()
+    if args.watch_stdin:
+        threading.Thread(target=watch_stdin, daemon=True).start()
+    host, port = listener.address
+    print(f"READY {host} {port}", flush=True)
+    worker.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
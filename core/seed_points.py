@@ -0,0 +1,154 @@
+"""Initialization point sets for 3DGUT built from dense point clouds."""
+from pathlib import Path
+
+import numpy as np
+
+from core.outlier_filter import PointCloudFilter
+from core.ply_io import read_ply, read_ply_header, write_ply, xyz_of
+from core.point_cloud import estimate_spacing, voxel_labels
+
+
+_COLOR_FIELDS = ('red', 'green', 'blue')
+_NORMAL_FIELDS = ('nx', 'ny', 'nz')
+
+
+def _voxel_reduce(xyz, colors, normals, weights, voxel_size):
+    """
+    Average points per voxel.
+
+    Args:
+        xyz: N x 3 positions
+        colors: N x 3 colors (or None)
+        normals: N x 3 normals (or None)
+        weights: N source point counts
+        voxel_size: Voxel edge length
+
+    Returns:
+        Tuple of (xyz, colors, normals, weights) with one entry per voxel
+    """
+    labels, first = voxel_labels(xyz, voxel_size)
+    groups = len(first)
+    total = np.bincount(labels, weights, groups)
+
+    def average(values):
+        return np.stack([np.bincount(labels, weights * values[:, i], groups) for i in range(3)], axis=1) \
+            / total[:, None]
+
+    return (average(xyz),
+            average(colors) if colors is not None else None,
+            average(normals) if normals is not None else None,
+            total)
+
+
+class SeedPointBuilder:
+    """
+    Turns a fused dense cloud into a compact 3DGUT initialization cloud.
+
+    The cloud is streamed from the memory-mapped PLY and averaged per voxel
+    (positions, colors and normals), coarsened further until at most
+    max_points voxels remain, and cleaned with the outlier filter. The
+    voxel size defaults to twice the typical point spacing.
+    """
+
+    def __init__(self, max_points=1000000, voxel_size=None, outlier_filter='statistical',
+                 chunk_size=1 << 22):
+        """
+        Initialize builder.
+
+        Args:
+            max_points: Maximum number of seed points
+            voxel_size: Initial voxel size (estimated if None)
+            outlier_filter: 'statistical', 'radius', 'both' or 'none'
+                (use 'none' for an already filtered cloud)
+            chunk_size: Points read per chunk
+        """
+        self.max_points = max_points
+        self.voxel_size = voxel_size
+        self.outlier_filter = outlier_filter
+        self.chunk_size = chunk_size
+
+    def run(self, input_path, output_path, callback=None):
+        """
+        Build the seed cloud.
+
+        Args:
+            input_path: Dense PLY file (e.g. dense/fused.ply)
+            output_path: Seed PLY file (x, y, z, normals and colors as available)
+            callback: Progress callback function
+
+        Returns:
+            Tuple of (success, message)
+        """
+        input_path = Path(input_path)
+        if not input_path.exists():
+            return False, f"Point cloud not found: {input_path}"
+
+        header = read_ply_header(input_path)
+        vertices = read_ply(input_path, mmap=True)
+        count = len(vertices)
+        if not count:
+            return False, f"Point cloud is empty: {input_path}"
+        names = vertices.dtype.names
+        has_colors = all(name in names for name in _COLOR_FIELDS)
+        has_normals = all(name in names for name in _NORMAL_FIELDS)
+
+        voxel_size = self.voxel_size
+        if voxel_size is None:
+            # Spacing of an every-n-th sample shrinks by sqrt(n) on surfaces
+            sample = xyz_of(vertices[::max(1, count // 100000)])
+            voxel_size = 2.0 * estimate_spacing(sample) * (len(sample) / count) ** 0.5 or 1e-6
+
+        # Per-chunk voxel averages, then one more reduction over all chunks
+        parts = []
+        for start in range(0, count, self.chunk_size):
+            chunk = np.asarray(vertices[start:start + self.chunk_size])
+            colors = np.stack([chunk[name] for name in _COLOR_FIELDS], axis=1).astype(np.float64) \
+                if has_colors else None
+            normals = np.stack([chunk[name] for name in _NORMAL_FIELDS], axis=1).astype(np.float64) \
+                if has_normals else None
+            parts.append(_voxel_reduce(xyz_of(chunk), colors, normals, np.ones(len(chunk)), voxel_size))
+            if callback and count > self.chunk_size:
+                callback(f"  Downsampled {min(start + self.chunk_size, count):,}/{count:,} points")
+
+        def concatenate(index):
+            return np.concatenate([part[index] for part in parts]) if parts[0][index] is not None else None
+
+        reduced = tuple(concatenate(i) for i in range(4))
+        if len(parts) > 1:
+            reduced = _voxel_reduce(*reduced, voxel_size)
+
+        # Coarsen until the point budget is met (surfaces: count ~ 1 / voxel^2)
+        while len(reduced[0]) > self.max_points:
+            voxel_size *= max(1.05, (len(reduced[0]) / self.max_points) ** 0.5)
+            reduced = _voxel_reduce(*reduced, voxel_size)
+        xyz, colors, normals, _ = reduced
+        downsampled = len(xyz)
+
+        if self.outlier_filter != 'none':
+            keep = PointCloudFilter(method=self.outlier_filter).mask(xyz)
+            xyz = xyz[keep]
+            colors = colors[keep] if colors is not None else None
+            normals = normals[keep] if normals is not None else None
+
+        fields = [('x', '<f4'), ('y', '<f4'), ('z', '<f4')]
+        if normals is not None:
+            fields += [(name, '<f4') for name in _NORMAL_FIELDS]
+        if colors is not None:
+            fields += [(name, 'u1') for name in _COLOR_FIELDS]
+        seeds = np.empty(len(xyz), dtype=fields)
+        for i, name in enumerate('xyz'):
+            seeds[name] = xyz[:, i]
+        if normals is not None:
+            normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+            for i, name in enumerate(_NORMAL_FIELDS):
+                seeds[name] = normals[:, i]
+        if colors is not None:
+            for i, name in enumerate(_COLOR_FIELDS):
+                seeds[name] = np.clip(np.rint(colors[:, i]), 0, 255)
+
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        write_ply(output_path, seeds, comments=header['comments'])
+        message = f"Seed points: {count:,} -> {downsampled:,} (voxel {voxel_size:.4g})"
+        if self.outlier_filter != 'none':
+            message += f" -> {len(seeds):,} after {self.outlier_filter} outlier filter"
+        return True, message
@@ -0,0 +1,214 @@
+"""Sharded feature extraction across local processes or remote hosts."""
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from core.colmap_database import merge_databases, read_image_names
+from core.image_descriptors import list_images
+
+
+def split_image_list(names, num_shards):
+    """
+    Split image names into contiguous shards of near-equal size.
+
+    Contiguous ranges keep images of one sequence or folder together.
+
+    Args:
+        names: Image names in capture order
+        num_shards: Number of shards
+
+    Returns:
+        List of non-empty name lists
+    """
+    num_shards = max(1, min(num_shards, len(names)))
+    size, extra = divmod(len(names), num_shards)
+    shards = []
+    start = 0
+    for i in range(num_shards):
+        stop = start + size + (1 if i < extra else 0)
+        shards.append(names[start:stop])
+        start = stop
+    return [shard for shard in shards if shard]
+
+
+class LocalShardExecutor:
+    """Runs extraction shards as concurrent local COLMAP processes."""
+
+    def __init__(self, colmap_wrapper, max_workers=None):
+        """
+        Initialize executor.
+
+        Args:
+            colmap_wrapper: COLMAPWrapper used to launch feature_extractor
+            max_workers: Concurrent shards (defaults to one per shard)
+        """
+        self.colmap = colmap_wrapper
+        self.max_workers = max_workers
+
+    def extract(self, shard_index, options, callback=None):
+        """
+        Run feature extraction for one shard.
+
+        Args:
+            shard_index: Index of the shard
+            options: Keyword arguments for COLMAPWrapper.feature_extraction
+            callback: Progress callback function
+
+        Returns:
+            Tuple of (success, message)
+        """
+        return self.colmap.feature_extraction(callback=callback, **options)
+
+    def run_all(self, shard_options, callback=None):
+        """
+        Run all shards concurrently.
+
+        Args:
+            shard_options: One feature_extraction keyword dict per shard
+            callback: Progress callback function (output lines are prefixed
+                with the shard number)
+
+        Returns:
+            List of (success, message) tuples in shard order
+        """
+        def run(index):
+            shard_callback = None
+            if callback:
+                shard_callback = lambda line: callback(f"[shard {index + 1}] {line}")
+            return self.extract(index, shard_options[index], shard_callback)
+
+        workers = self.max_workers or len(shard_options)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(run, range(len(shard_options))))
+
+
+class SSHShardExecutor(LocalShardExecutor):
+    """
+    Runs extraction shards on remote hosts over SSH.
+
+    The project folder must be reachable under the same path on every host
+    (e.g. a shared network drive), since image lists and shard databases
+    are exchanged through the filesystem.
+    """
+
+    def __init__(self, colmap_wrapper, hosts, ssh_command=('ssh',)):
+        """
+        Initialize executor.
+
+        Args:
+            colmap_wrapper: COLMAPWrapper whose executable path is valid on the hosts
+            hosts: Host names; shards are assigned round-robin
+            ssh_command: Launcher used to reach a host
+        """
+        super().__init__(colmap_wrapper, max_workers=len(hosts))
+        self.hosts = list(hosts)
+        self.ssh_command = list(ssh_command)
+
+    def extract(self, shard_index, options, callback=None):
+        """Run feature extraction for one shard on its assigned host."""
+        host = self.hosts[shard_index % len(self.hosts)]
+        return self.colmap.feature_extraction(
+            command_prefix=self.ssh_command + [host], callback=callback, **options
+        )
+
+
+class ShardedFeatureExtractor:
+    """Splits an image set into shards, extracts them concurrently and merges the databases."""
+
+    def __init__(self, executor, num_shards):
+        """
+        Initialize sharded extractor.
+
+        Args:
+            executor: LocalShardExecutor or SSHShardExecutor
+            num_shards: Number of shards
+        """
+        self.executor = executor
+        self.num_shards = num_shards
+
+    def run(self, database_path, image_path, shard_dir, image_list_path=None,
+            callback=None, **options):
+        """
+        Run sharded extraction and merge the results into database_path.
+
+        If database_path already holds images, extraction falls back to a
+        single local COLMAP process, which adds the missing images to the
+        existing database instead of replacing it.
+
+        Args:
+            database_path: Merged COLMAP database to create
+            image_path: Images folder
+            shard_dir: Working folder for shard image lists and databases
+            image_list_path: Optional list restricting which images are extracted
+            callback: Progress callback function
+            **options: Further COLMAPWrapper.feature_extraction options
+                (use_gpu, max_features, camera_model, ...)
+
+        Returns:
+            Tuple of (success, message)
+        """
+        database_path = Path(database_path)
+        shard_dir = Path(shard_dir)
+
+        if database_path.exists() and read_image_names(database_path):
+            if callback:
+                callback(f"Warning: {database_path.name} already contains images; "
+                         "extracting the remaining images in a single process")
+            return self.executor.colmap.feature_extraction(
+                database_path=database_path, image_path=image_path,
+                image_list_path=image_list_path, callback=callback, **options
+            )
+
+        if image_list_path:
+            names = [line.strip() for line in
+                     Path(image_list_path).read_text(encoding='utf-8').splitlines() if line.strip()]
+        else:
+            names = list_images(image_path)
+        if not names:
+            return False, "No images found"
+
+        if shard_dir.exists():
+            shutil.rmtree(shard_dir)
+        shard_dir.mkdir(parents=True)
+
+        shards = split_image_list(names, self.num_shards)
+        shard_options = []
+        shard_databases = []
+        for i, shard in enumerate(shards):
+            list_path = shard_dir / f"shard_{i:03d}.txt"
+            list_path.write_text(''.join(name + '\n' for name in shard), encoding='utf-8')
+            shard_db = shard_dir / f"shard_{i:03d}.db"
+            shard_databases.append(shard_db)
+            shard_options.append(dict(options, database_path=shard_db, image_path=image_path,
+                                      image_list_path=list_path))
+
+        if callback:
+            callback(f"Extracting {len(names):,} images in {len(shards)} shards...")
+
+        results = self.executor.run_all(shard_options, callback=callback)
+        failed = [i + 1 for i, (success, _) in enumerate(results) if not success]
+        if failed:
+            return False, f"Shard(s) {', '.join(map(str, failed))} failed"
+
+        if callback:
+            callback("Merging shard databases...")
+
+        merged_path = database_path.with_suffix('.merging.db')
+        if merged_path.exists():
+            merged_path.unlink()
+        try:
+            num_cameras, num_images = merge_databases(
+                shard_databases, merged_path,
+                merge_cameras=bool(options.get('single_camera')),
+                callback=callback
+            )
+        except Exception as e:
+            return False, f"Database merge failed: {e}"
+
+        if database_path.exists():
+            database_path.unlink()
+        os.replace(merged_path, database_path)
+        shutil.rmtree(shard_dir, ignore_errors=True)
+
+        return True, f"Extracted {num_images:,} images ({num_cameras} camera(s)) in {len(shards)} shards"
@@ -0,0 +1,321 @@
+"""Pruning, SH reduction and tiny-Gaussian merging of Gaussian splat PLY files."""
+import re
+from pathlib import Path
+
+import numpy as np
+
+from core.colmap_model import qvec_to_rotmat, read_cameras_binary, read_images_binary
+from core.ply_io import PlyWriter, read_ply, read_ply_header, xyz_of
+from core.point_cloud import voxel_labels
+
+
+# Number of f_rest_* properties per SH degree (three color channels)
+SH_REST_FIELDS = {0: 0, 1: 9, 2: 24, 3: 45}
+
+_REST_FIELD = re.compile(r'^f_rest_(\d+)$')
+
+
+def sigmoid(values):
+    """Logistic function (splat opacities are stored as logits)."""
+    return 1.0 / (1.0 + np.exp(-values))
+
+
+def logit(values):
+    """Inverse of sigmoid."""
+    return np.log(values / (1.0 - values))
+
+
+def sh_degree_of(field_names):
+    """
+    SH degree stored in a splat PLY.
+
+    Args:
+        field_names: Vertex property names
+
+    Returns:
+        Degree 0-3
+
+    Raises:
+        ValueError: If the number of f_rest_* properties matches no degree
+    """
+    count = sum(1 for name in field_names if _REST_FIELD.match(name))
+    for degree, fields in SH_REST_FIELDS.items():
+        if fields == count:
+            return degree
+    raise ValueError(f"Unexpected number of SH coefficients: {count} f_rest_* properties")
+
+
+def truncated_fields(field_names, degree):
+    """
+    Map the properties of a splat PLY to those kept at a lower SH degree.
+
+    f_rest_* are stored channel by channel, so every channel keeps its
+    first coefficients and the kept ones are renumbered contiguously.
+
+    Args:
+        field_names: Vertex property names
+        degree: Target SH degree
+
+    Returns:
+        List of (new name, old name)
+    """
+    per_channel = SH_REST_FIELDS[sh_degree_of(field_names)] // 3
+    keep = SH_REST_FIELDS[degree] // 3
+    mapping = []
+    for name in field_names:
+        match = _REST_FIELD.match(name)
+        if not match:
+            mapping.append((name, name))
+            continue
+        channel, coefficient = divmod(int(match.group(1)), per_channel)
+        if coefficient < keep:
+            mapping.append((f"f_rest_{channel * keep + coefficient}", name))
+    return mapping
+
+
+class ViewSet:
+    """Pinhole approximation of the registered cameras of a sparse model."""
+
+    def __init__(self, rotations, translations, focals, widths, heights):
+        self.rotations = np.asarray(rotations, dtype=np.float32)
+        self.translations = np.asarray(translations, dtype=np.float32)
+        self.focals = np.asarray(focals, dtype=np.float32)
+        self.widths = np.asarray(widths, dtype=np.float32)
+        self.heights = np.asarray(heights, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.rotations)
+
+    @classmethod
+    def from_sparse(cls, sparse_path, max_views=200):
+        """
+        Load views from a binary sparse model.
+
+        Args:
+            sparse_path: Model folder (cameras.bin, images.bin)
+            max_views: Views kept, sampled evenly in image order
+
+        Returns:
+            Tuple of (ViewSet, all_views) where all_views tells whether no
+            view was left out
+        """
+        sparse_path = Path(sparse_path)
+        cameras = read_cameras_binary(sparse_path / 'cameras.bin')
+        images = read_images_binary(sparse_path / 'images.bin')
+        image_ids = sorted(images)
+        if len(image_ids) > max_views:
+            image_ids = [image_ids[i] for i in np.linspace(0, len(image_ids) - 1, max_views).astype(int)]
+
+        views = [(qvec_to_rotmat(images[i]['qvec']), images[i]['tvec'], cameras[images[i]['camera_id']])
+                 for i in image_ids]
+        view_set = cls([r for r, _, _ in views], [t for _, t, _ in views],
+                       [camera['params'][0] for _, _, camera in views],
+                       [camera['width'] for _, _, camera in views],
+                       [camera['height'] for _, _, camera in views])
+        return view_set, len(image_ids) == len(images)
+
+    def contribution(self, xyz, radius, alpha, batch_size=16384):
+        """
+        Largest screen-space contribution of Gaussians over all views.
+
+        The contribution in a view is the opacity times the projected
+        footprint area in pixels (radius = largest axis); Gaussians outside
+        a view or behind its camera contribute nothing there.
+
+        Args:
+            xyz: N x 3 centers
+            radius: N largest world-space scales
+            alpha: N opacities in [0, 1]
+            batch_size: Gaussians projected per batch
+
+        Returns:
+            Length N array in pixels
+        """
+        result = np.zeros(len(xyz), dtype=np.float32)
+        for start in range(0, len(xyz), batch_size):
+            points = np.asarray(xyz[start:start + batch_size], dtype=np.float32)
+            camera = np.einsum('vij,nj->vni', self.rotations, points) + self.translations[:, None, :]
+            depth = camera[..., 2]
+            safe = np.maximum(depth, 1e-6)
+            pixels = self.focals[:, None] * radius[None, start:start + len(points)] / safe
+            visible = (depth > 1e-3) \
+                & (np.abs(camera[..., 0] / safe) * self.focals[:, None] <= self.widths[:, None] / 2 + pixels) \
+                & (np.abs(camera[..., 1] / safe) * self.focals[:, None] <= self.heights[:, None] / 2 + pixels)
+            area = np.where(visible, np.pi * pixels * pixels, 0.0)
+            result[start:start + len(points)] = alpha[start:start + len(points)] * area.max(axis=0)
+        return result
+
+
+def merge_gaussians(splats, voxel_size):
+    """
+    Merge Gaussians sharing a voxel into one.
+
+    Within a voxel, positions, colors and other properties are averaged
+    weighted by opacity, opacities are composited (1 - prod(1 - alpha)), and
+    the merged Gaussian is an isotropic one covering the spread of its
+    members. Voxels holding a single Gaussian are left unchanged.
+
+    Args:
+        splats: Structured array of splat properties
+        voxel_size: Voxel edge length
+
+    Returns:
+        Structured array of merged splats
+    """
+    if len(splats) < 2:
+        return splats
+    xyz = xyz_of(splats)
+    labels, first = voxel_labels(xyz, voxel_size)
+    groups = len(first)
+    sizes = np.bincount(labels, minlength=groups)
+    if sizes.max() == 1:
+        return splats
+
+    alpha = sigmoid(splats['opacity'].astype(np.float64))
+    weight = np.maximum(alpha, 1e-6)
+    total = np.bincount(labels, weight, groups)
+
+    def average(values):
+        return np.bincount(labels, weight * values, groups) / total
+
+    merged = np.empty(groups, dtype=splats.dtype)
+    for name in splats.dtype.names:
+        merged[name] = average(splats[name].astype(np.float64))
+
+    center = np.stack([merged['x'], merged['y'], merged['z']], axis=1)
+    spread = ((xyz - center[labels]) ** 2).sum(axis=1) / 3.0
+    scales = np.exp(np.stack([splats[f'scale_{i}'] for i in range(3)], axis=1).astype(np.float64))
+    variance = average((scales ** 2).mean(axis=1) + spread)
+    for i in range(3):
+        merged[f'scale_{i}'] = 0.5 * np.log(np.maximum(variance, 1e-20))
+
+    transparency = np.exp(np.bincount(labels, np.log(np.maximum(1.0 - alpha, 1e-6)), groups))
+    merged['opacity'] = logit(np.clip(1.0 - transparency, 1e-6, 0.999))
+    if 'rot_0' in splats.dtype.names:
+        merged['rot_0'] = 1.0
+        for i in range(1, 4):
+            merged[f'rot_{i}'] = 0.0
+
+    # Keep single Gaussians exactly as they were
+    single = sizes == 1
+    merged[single] = splats[first[single]]
+    return merged
+
+
+class SplatPruner:
+    """
+    Shrinks Gaussian splat PLY files exported by 3DGUT.
+
+    Gaussians are dropped when their opacity is below min_opacity or, if
+    a sparse model is given, when their largest screen-space footprint
+    (opacity x projected area in pixels) is below min_contribution. Higher
+    SH bands can be dropped, and Gaussians smaller than a quarter of
+    merge_voxel can be merged per voxel. The input is memory-mapped and
+    processed in chunks; only the Gaussians to merge are held in memory.
+    """
+
+    def __init__(self, min_opacity=0.005, min_contribution=0.5, sh_degree=None,
+                 merge_voxel=0.0, chunk_size=1 << 20, max_views=200):
+        """
+        Initialize pruner.
+
+        Args:
+            min_opacity: Minimum opacity (after sigmoid) of kept Gaussians
+            min_contribution: Minimum screen-space contribution in pixels
+            sh_degree: SH degree of the output (0-3, None keeps the input's)
+            merge_voxel: Voxel size for merging tiny Gaussians (0 disables)
+            chunk_size: Gaussians processed per chunk
+            max_views: Views used to estimate screen-space contribution
+        """
+        self.min_opacity = min_opacity
+        self.min_contribution = min_contribution
+        self.sh_degree = sh_degree
+        self.merge_voxel = merge_voxel
+        self.chunk_size = chunk_size
+        self.max_views = max_views
+
+    def run(self, input_path, output_path, sparse_path=None, callback=None):
+        """
+        Prune a splat PLY file.
+
+        Args:
+            input_path: Splat PLY file (3DGS property layout)
+            output_path: Output PLY file
+            sparse_path: Sparse model used for screen-space contribution
+                (contribution pruning is skipped if None)
+            callback: Progress callback function
+
+        Returns:
+            Tuple of (success, message)
+        """
+        input_path = Path(input_path)
+        if not input_path.exists():
+            return False, f"Splat file not found: {input_path}"
+
+        header = read_ply_header(input_path)
+        vertices = read_ply(input_path, mmap=True)
+        names = vertices.dtype.names
+        missing = [name for name in ('x', 'y', 'z', 'opacity', 'scale_0', 'scale_1', 'scale_2')
+                   if name not in names]
+        if missing:
+            return False, f"Not a Gaussian splat PLY (missing {', '.join(missing)})"
+
+        degree = sh_degree_of(names)
+        target_degree = degree if self.sh_degree is None else min(self.sh_degree, degree)
+        mapping = truncated_fields(names, target_degree)
+        out_dtype = np.dtype([(new, '<' + vertices.dtype[old].base.str[1:]) for new, old in mapping])
+
+        views, all_views = None, False
+        if sparse_path and self.min_contribution > 0:
+            views, all_views = ViewSet.from_sparse(sparse_path, self.max_views)
+
+        count = len(vertices)
+        low_opacity = low_contribution = 0
+        tiny = []
+        with PlyWriter(output_path, out_dtype, header['comments']) as writer:
+            for start in range(0, count, self.chunk_size):
+                chunk = np.asarray(vertices[start:start + self.chunk_size])
+                alpha = sigmoid(chunk['opacity'].astype(np.float32))
+                keep = alpha >= self.min_opacity
+                low_opacity += int((~keep).sum())
+
+                radius = np.exp(np.maximum(np.maximum(chunk['scale_0'], chunk['scale_1']),
+                                           chunk['scale_2']).astype(np.float32))
+                if views is not None and len(views):
+                    contribution = views.contribution(xyz_of(chunk), radius, alpha)
+                    # Unseen Gaussians are only dropped when every view was checked
+                    weak = (contribution < self.min_contribution) & (all_views | (contribution > 0))
+                    low_contribution += int((keep & weak).sum())
+                    keep &= ~weak
+
+                out = np.empty(int(keep.sum()), dtype=out_dtype)
+                for new, old in mapping:
+                    out[new] = chunk[old][keep]
+                if self.merge_voxel:
+                    small = radius[keep] < 0.25 * self.merge_voxel
+                    tiny.append(out[small])
+                    out = out[~small]
+                writer.write(out)
+
+                if callback and count > self.chunk_size:
+                    callback(f"  Processed {min(start + self.chunk_size, count):,}/{count:,} Gaussians")
+
+            merged_from = merged_to = 0
+            if tiny:
+                tiny = np.concatenate(tiny)
+                merged = merge_gaussians(tiny, self.merge_voxel)
+                merged_from, merged_to = len(tiny), len(merged)
+                writer.write(merged)
+
+        input_size = input_path.stat().st_size
+        output_size = Path(output_path).stat().st_size
+        parts = [f"{low_opacity:,} below opacity {self.min_opacity}"]
+        if views is not None:
+            parts.append(f"{low_contribution:,} below {self.min_contribution} px contribution")
+        if merged_from:
+            parts.append(f"{merged_from:,} tiny Gaussians merged into {merged_to:,}")
+        if target_degree != degree:
+            parts.append(f"SH degree {degree} -> {target_degree}")
+        return True, (f"Gaussians: {count:,} -> {writer.count:,} ({'; '.join(parts)}); "
+                      f"size: {input_size / 1e6:.1f} MB -> {output_size / 1e6:.1f} MB "
+                      f"(-{1 - output_size / max(input_size, 1):.0%})")
@@ -0,0 +1,122 @@
+"""Loss/PSNR plateau detection on 3DGUT training logs."""
+import re
+
+
+_ITERATION = re.compile(r'\b(?:iter(?:ation)?|step)\b\s*[:=#\[]?\s*(\d+)', re.IGNORECASE)
+_PSNR = re.compile(r'\bpsnr\b\s*[:=]?\s*(-?\d+(?:\.\d+)?)', re.IGNORECASE)
+_LOSS = re.compile(r'\b(?:total_)?loss\b\s*[:=]?\s*(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)', re.IGNORECASE)
+
+
+def parse_metrics(line):
+    """
+    Extract iteration, PSNR and loss from a training log line.
+
+    Args:
+        line: Log line (e.g. "[iter 1200] loss=0.0312 psnr=27.41")
+
+    Returns:
+        Dictionary with the found keys among 'iteration', 'psnr', 'loss'
+    """
+    metrics = {}
+    match = _ITERATION.search(line)
+    if match:
+        metrics['iteration'] = int(match.group(1))
+    match = _PSNR.search(line)
+    if match:
+        metrics['psnr'] = float(match.group(1))
+    match = _LOSS.search(line)
+    if match:
+        metrics['loss'] = float(match.group(1))
+    return metrics
+
+
+class TrainingMonitor:
+    """
+    Stops training once the monitored metric stops improving.
+
+    PSNR is monitored when the log reports it, the loss otherwise. An
+    improvement counts when PSNR rises by at least min_psnr_gain dB, or the
+    loss drops by at least min_loss_ratio of its best value. Training is
+    stopped when no improvement was seen for patience iterations, but
+    never before warmup iterations. Loss values are smoothed with an
+    exponential moving average since per-batch losses are noisy.
+    """
+
+    def __init__(self, patience=3000, warmup=5000, min_psnr_gain=0.05, min_loss_ratio=0.01,
+                 smoothing=0.9):
+        """
+        Initialize monitor.
+
+        Args:
+            patience: Iterations without improvement before stopping
+            warmup: Iterations always trained
+            min_psnr_gain: Minimum PSNR improvement in dB
+            min_loss_ratio: Minimum relative loss improvement
+            smoothing: EMA factor applied to the loss
+        """
+        self.patience = patience
+        self.warmup = warmup
+        self.min_psnr_gain = min_psnr_gain
+        self.min_loss_ratio = min_loss_ratio
+        self.smoothing = smoothing
+        self.reset()
+
+    def reset(self):
+        """Forget the history (before a new run)."""
+        self.iteration = 0
+        self.metric = None
+        self.best = None
+        self.best_iteration = 0
+        self.smoothed_loss = None
+        self.history = []
+        self.stop_reason = None
+
+    def _improved(self, value):
+        """Check whether a metric value improves on the best one."""
+        if self.best is None:
+            return True
+        if self.metric == 'psnr':
+            return value >= self.best + self.min_psnr_gain
+        return value <= self.best * (1.0 - self.min_loss_ratio)
+
+    def feed(self, line):
+        """
+        Process a log line.
+
+        Args:
+            line: Training log line
+
+        Returns:
+            True if training should stop
+        """
+        metrics = parse_metrics(line)
+        if 'iteration' not in metrics:
+            return False
+        self.iteration = max(self.iteration, metrics['iteration'])
+
+        if 'psnr' in metrics:
+            if self.metric != 'psnr':
+                # PSNR takes over from the loss as soon as it is reported
+                self.metric, self.best, self.best_iteration = 'psnr', None, self.iteration
+            value = metrics['psnr']
+        elif 'loss' in metrics and self.metric != 'psnr':
+            self.metric = 'loss'
+            loss = metrics['loss']
+            self.smoothed_loss = loss if self.smoothed_loss is None else \
+                self.smoothing * self.smoothed_loss + (1.0 - self.smoothing) * loss
+            value = self.smoothed_loss
+        else:
+            return False
+
+        self.history.append((self.iteration, self.metric, value))
+        if self._improved(value):
+            self.best, self.best_iteration = value, self.iteration
+            return False
+
+        stalled = self.iteration - self.best_iteration
+        if self.iteration >= self.warmup and stalled >= self.patience:
+            unit = ' dB' if self.metric == 'psnr' else ''
+            self.stop_reason = (f"{self.metric} plateaued at {self.best:.4g}{unit} "
+                                f"(no improvement for {stalled:,} iterations, stopped at {self.iteration:,})")
+            return True
+        return False
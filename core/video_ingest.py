@@ -0,0 +1,168 @@
+"""Video ingestion with sharpness-based keyframe selection."""
+from pathlib import Path
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.avi', '.mkv', '.m4v', '.mts', '.webm'}
+
+
+def find_videos(folder):
+    """
+    List video files in a folder.
+
+    Args:
+        folder: Folder to scan
+
+    Returns:
+        Sorted list of video file paths
+    """
+    folder = Path(folder)
+    if not folder.is_dir():
+        return []
+    return sorted(f for f in folder.iterdir()
+                  if f.is_file() and f.suffix.lower() in VIDEO_EXTENSIONS)
+
+
+class VideoFrameExtractor:
+    """Streams video frames and keeps the sharpest frame per time window."""
+
+    def __init__(self, window_seconds=0.5, analysis_size=640, motion_weight=50.0,
+                 min_sharpness=0.0, min_keyframe_motion=0.01, jpeg_quality=95):
+        """
+        Initialize frame extractor.
+
+        Args:
+            window_seconds: Length of each time window; one frame is kept per window
+            analysis_size: Longest side (pixels) of the grayscale copy used for scoring
+            motion_weight: How strongly inter-frame motion penalizes a frame's score
+            min_sharpness: Windows whose best Laplacian variance is below this are dropped
+            min_keyframe_motion: Windows that barely differ from the last kept frame
+                (mean absolute difference, 0-1) are dropped as stationary
+            jpeg_quality: JPEG quality of the written frames
+        """
+        self.window_seconds = window_seconds
+        self.analysis_size = analysis_size
+        self.motion_weight = motion_weight
+        self.min_sharpness = min_sharpness
+        self.min_keyframe_motion = min_keyframe_motion
+        self.jpeg_quality = jpeg_quality
+
+    def check_installation(self):
+        """
+        Check if OpenCV is available for video decoding.
+
+        Returns:
+            Tuple of (success, message)
+        """
+        if cv2 is None:
+            return False, "OpenCV not found. Install: pip install opencv-python"
+        return True, "OpenCV installed"
+
+    def extract(self, video_path, output_path, callback=None):
+        """
+        Extract keyframes from a single video.
+
+        Frames are decoded one at a time, so memory use does not depend on
+        video length. Each frame is scored by Laplacian variance divided by
+        a motion penalty (mean absolute difference to the previous frame),
+        and the best frame of every window is written to output_path.
+
+        Args:
+            video_path: Path to video file
+            output_path: Folder to write the selected frames into
+            callback: Progress callback function
+
+        Returns:
+            Tuple of (success, message, number_of_frames_written)
+        """
+        ok, msg = self.check_installation()
+        if not ok:
+            return False, msg, 0
+
+        video_path = Path(video_path)
+        output_path = Path(output_path)
+        output_path.mkdir(parents=True, exist_ok=True)
+
+        capture = cv2.VideoCapture(str(video_path))
+        if not capture.isOpened():
+            return False, f"Cannot open video: {video_path}", 0
+
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        total_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+
+        if callback:
+            callback(f"Reading {video_path.name} ({fps:.1f} fps, {total_frames:,} frames)")
+
+        written = 0
+        frame_index = 0
+        current_window = None
+        best = None  # (score, sharpness, frame_index, frame, gray)
+        previous_gray = None
+        last_kept_gray = None
+
+        def flush(candidate):
+            nonlocal written, last_kept_gray
+            if candidate is None:
+                return
+            _, sharpness, index, frame, gray = candidate
+            if sharpness < self.min_sharpness:
+                return
+            if last_kept_gray is not None and \
+                    self._difference(gray, last_kept_gray) < self.min_keyframe_motion:
+                return
+            name = f"{video_path.stem}_{index:06d}.jpg"
+            cv2.imwrite(str(output_path / name), frame,
+                        [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            last_kept_gray = gray
+            written += 1
+
+        try:
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+
+                gray = self._analysis_gray(frame)
+                sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+                motion = 0.0 if previous_gray is None else self._difference(gray, previous_gray)
+                score = sharpness / (1.0 + self.motion_weight * motion)
+                previous_gray = gray
+
+                window = int(frame_index / fps / self.window_seconds)
+                if window != current_window:
+                    flush(best)
+                    best = None
+                    current_window = window
+
+                if best is None or score > best[0]:
+                    best = (score, sharpness, frame_index, frame, gray)
+
+                frame_index += 1
+                if callback and total_frames and frame_index % 500 == 0:
+                    callback(f"  {frame_index:,}/{total_frames:,} frames scanned, "
+                             f"{written:,} keyframes kept")
+
+            flush(best)
+        finally:
+            capture.release()
+
+        return True, f"Kept {written:,} of {frame_index:,} frames from {video_path.name}", written
+
+    def _analysis_gray(self, frame):
+        """Return a downscaled grayscale copy of a frame for scoring."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        height, width = gray.shape
+        scale = self.analysis_size / float(max(height, width))
+        if scale < 1.0:
+            gray = cv2.resize(gray, (int(width * scale), int(height * scale)),
+                              interpolation=cv2.INTER_AREA)
+        return gray
+
+    @staticmethod
+    def _difference(gray_a, gray_b):
+        """Mean absolute difference between two grayscale frames, in 0-1."""
+        return float(cv2.absdiff(gray_a, gray_b).mean()) / 255.0
@@ -0,0 +1,223 @@
+"""Covisibility-based source view selection for PatchMatch stereo."""
+from pathlib import Path
+
+import numpy as np
+
+from core.colmap_model import camera_center, read_images_binary, read_points3d_binary
+
+
+# Triangulation angle prior (degrees) of the view selection score
+DEFAULT_ANGLE = 5.0
+ANGLE_SIGMA_BELOW = 1.0
+ANGLE_SIGMA_ABOVE = 10.0
+
+
+def _pair_scores(image_points, centers, point_ids, point_xyz, max_pairs=2000000):
+    """
+    Accumulate a covisibility score for every image pair sharing points.
+
+    Each shared point contributes a Gaussian weight of its triangulation
+    angle in the pair: angles near DEFAULT_ANGLE score highest, very small
+    angles (unreliable depth) drop off quickly and large angles (hard to
+    match) slowly.
+
+    Args:
+        image_points: Per image, array of observed 3D point IDs
+        centers: N x 3 camera centers
+        point_ids: Sorted 3D point IDs
+        point_xyz: Positions of point_ids
+        max_pairs: Image pairs expanded per batch (a track of length L
+            expands to L * (L - 1) / 2 pairs)
+
+    Returns:
+        Tuple of (first, second, shared, score) arrays, one entry per pair
+    """
+    num_images = len(image_points)
+    image_index = np.concatenate([np.full(len(p), i, dtype=np.int64) for i, p in enumerate(image_points)])
+    observed = np.concatenate(image_points)
+    order = np.argsort(observed, kind='stable')
+    image_index, observed = image_index[order], observed[order]
+
+    # Group observations into tracks (one run per 3D point)
+    starts = np.flatnonzero(np.r_[True, observed[1:] != observed[:-1]])
+    lengths = np.diff(np.r_[starts, len(observed)])
+    positions = point_xyz[np.searchsorted(point_ids, observed[starts])]
+
+    keys = np.zeros(0, dtype=np.int64)
+    shared = np.zeros(0)
+    scores = np.zeros(0)
+
+    for length in np.unique(lengths):
+        if length < 2:
+            continue
+        tracks = np.flatnonzero(lengths == length)
+        pairs_a, pairs_b = np.triu_indices(length, k=1)
+        # Batch by expanded pairs; tracks longer than the budget are split by pairs
+        tracks_per_batch = max(1, max_pairs // len(pairs_a))
+        pair_step = min(len(pairs_a), max_pairs)
+        batches = ((begin, pair_begin)
+                   for begin in range(0, len(tracks), tracks_per_batch)
+                   for pair_begin in range(0, len(pairs_a), pair_step))
+        for begin, pair_begin in batches:
+            chunk = tracks[begin:begin + tracks_per_batch]
+            a = pairs_a[pair_begin:pair_begin + pair_step]
+            b = pairs_b[pair_begin:pair_begin + pair_step]
+            members = image_index[starts[chunk][:, None] + np.arange(length)]
+            first, second = members[:, a].ravel(), members[:, b].ravel()
+            xyz = np.repeat(positions[chunk], len(a), axis=0)
+
+            ray1 = centers[first] - xyz
+            ray2 = centers[second] - xyz
+            cosine = (ray1 * ray2).sum(axis=1) / (
+                np.linalg.norm(ray1, axis=1) * np.linalg.norm(ray2, axis=1) + 1e-12)
+            angle = np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+            sigma = np.where(angle <= DEFAULT_ANGLE, ANGLE_SIGMA_BELOW, ANGLE_SIGMA_ABOVE)
+            weight = np.exp(-((angle - DEFAULT_ANGLE) ** 2) / (2 * sigma ** 2))
+
+            pair_keys = np.minimum(first, second) * num_images + np.maximum(first, second)
+            keys = np.concatenate([keys, pair_keys])
+            shared = np.concatenate([shared, np.ones(len(pair_keys))])
+            scores = np.concatenate([scores, weight])
+
+            # Reduce after every batch to keep one entry per pair
+            keys, inverse = np.unique(keys, return_inverse=True)
+            inverse = inverse.reshape(-1)
+            shared = np.bincount(inverse, shared, len(keys))
+            scores = np.bincount(inverse, scores, len(keys))
+
+    return keys // num_images, keys % num_images, shared, scores
+
+
+def select_source_views(sparse_path, num_sources=10, min_shared_points=10,
+                        min_baseline_ratio=0.1, image_names=None):
+    """
+    Choose the most informative source images for every reference image.
+
+    Args:
+        sparse_path: Folder with the (undistorted) binary sparse model
+        num_sources: Sources kept per reference image
+        min_shared_points: Pairs sharing fewer 3D points are ignored
+        min_baseline_ratio: Pairs whose baseline is below this fraction of
+            the median nearest-camera distance are ignored (near-identical
+            viewpoints add cost but no depth information)
+        image_names: Restrict references and sources to these image names
+            (e.g. the images an undistorter wrote); all if None
+
+    Returns:
+        Dictionary of reference image name -> list of source image names,
+        best first
+    """
+    sparse_path = Path(sparse_path)
+    images = read_images_binary(sparse_path / 'images.bin')
+    points = read_points3d_binary(sparse_path / 'points3D.bin')
+
+    image_ids = sorted(images)
+    if image_names is not None:
+        image_names = set(image_names)
+        image_ids = [i for i in image_ids if images[i]['name'] in image_names]
+    names = [images[i]['name'] for i in image_ids]
+    if not image_ids:
+        return {}
+    centers = np.array([camera_center(images[i]) for i in image_ids])
+    image_points = [images[i]['point3D_ids'][images[i]['point3D_ids'] >= 0] for i in image_ids]
+
+    order = np.argsort(points['ids'])
+    first, second, shared, scores = _pair_scores(image_points, centers, points['ids'][order],
+                                                 points['xyz'][order])
+
+    baseline = np.linalg.norm(centers[first] - centers[second], axis=1)
+    valid = shared >= min_shared_points
+    if valid.any():
+        nearest = np.full(len(image_ids), np.inf)
+        np.minimum.at(nearest, first, np.where(baseline > 0, baseline, np.inf))
+        np.minimum.at(nearest, second, np.where(baseline > 0, baseline, np.inf))
+        finite = nearest[np.isfinite(nearest)]
+        if len(finite):
+            valid &= baseline >= min_baseline_ratio * np.median(finite)
+    first, second, scores = first[valid], second[valid], scores[valid]
+
+    # Rank candidate sources per reference image (both pair directions)
+    reference = np.concatenate([first, second])
+    source = np.concatenate([second, first])
+    score = np.concatenate([scores, scores])
+    order = np.lexsort((-score, reference))
+    reference, source = reference[order], source[order]
+
+    selection = {name: [] for name in names}
+    starts = np.flatnonzero(np.r_[True, reference[1:] != reference[:-1]]) if len(reference) else []
+    bounds = list(starts) + [len(reference)]
+    for begin, end in zip(bounds[:-1], bounds[1:]):
+        selection[names[reference[begin]]] = [names[s] for s in source[begin:min(end, begin + num_sources)]]
+    return selection
+
+
+def write_patch_match_config(config_path, selection, fallback_sources=20):
+    """
+    Write a PatchMatch stereo configuration (stereo/patch-match.cfg).
+
+    Args:
+        config_path: Path of patch-match.cfg
+        selection: Dictionary from select_source_views
+        fallback_sources: Automatic source count for images without
+            selected sources
+    """
+    lines = []
+    for name, sources in selection.items():
+        lines.append(name)
+        lines.append(', '.join(sources) if sources else f"__auto__, {fallback_sources}")
+    Path(config_path).write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+class SourceViewSelector:
+    """Replaces the undistorter's patch-match.cfg with a pruned, ranked one."""
+
+    def __init__(self, num_sources=10, min_shared_points=10, min_baseline_ratio=0.1):
+        """
+        Initialize selector.
+
+        Args:
+            num_sources: Sources kept per reference image
+            min_shared_points: Minimum shared 3D points of a source
+            min_baseline_ratio: Minimum baseline relative to the median
+                nearest-camera distance
+        """
+        self.num_sources = num_sources
+        self.min_shared_points = min_shared_points
+        self.min_baseline_ratio = min_baseline_ratio
+
+    def run(self, workspace_path, image_names=None, callback=None):
+        """
+        Select source views for an undistorted dense workspace.
+
+        Args:
+            workspace_path: Dense workspace written by image_undistorter
+            image_names: Images the workspace contains (defaults to the
+                files in its images folder)
+            callback: Progress callback function
+
+        Returns:
+            Tuple of (success, message)
+        """
+        workspace_path = Path(workspace_path)
+        config_path = workspace_path / 'stereo' / 'patch-match.cfg'
+        if not config_path.parent.exists():
+            return False, "No stereo folder in dense workspace"
+
+        if image_names is None and (workspace_path / 'images').is_dir():
+            image_folder = workspace_path / 'images'
+            image_names = [path.relative_to(image_folder).as_posix()
+                           for path in image_folder.rglob('*') if path.is_file()]
+        selection = select_source_views(workspace_path / 'sparse', self.num_sources,
+                                        self.min_shared_points, self.min_baseline_ratio,
+                                        image_names=image_names)
+        write_patch_match_config(config_path, selection)
+
+        counts = [len(sources) for sources in selection.values()]
+        without = sum(1 for count in counts if count == 0)
+        mean = sum(counts) / max(1, len(counts))
+        message = f"Selected {mean:.1f} source views per image on average for {len(counts):,} images"
+        if without:
+            message += f" ({without} fall back to automatic selection)"
+        if callback:
+            callback(message)
+        return True, message
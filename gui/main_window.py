@@ -10,6 +10,8 @@ from core.colmap_wrapper import COLMAPWrapper
 from core.glomap_wrapper import GloMAPWrapper
 from core.dgut_wrapper import DGUTWrapper
 from core.pipeline import PhotogrammetryPipeline
+from core.profiles import load_config, load_profiles
+from core.events import LogSubscriber, Metric, Progress, StageStarted, format_event
 from gui.workers import PipelineWorker, DenseOnlyWorker, DGUTWorker
 from utils.validators import validate_image_folder, validate_project_path
 from utils.logger import get_logger
@@ -31,7 +33,19 @@ class MainWindow(ctk.CTk):
         ctk.set_default_color_theme("blue")
         
         # Initialize logger
-        self.logger = get_logger()
+        app_config = load_config()
+        logging_config = app_config.get('logging', {})
+        self.run_logs = logging_config.get('enabled', True) and logging_config.get('log_to_file', True)
+        self.logger = get_logger(
+            log_dir=logging_config.get('log_directory', 'logs') if self.run_logs else None,
+            log_level=logging_config.get('log_level', 'INFO'),
+            max_bytes=int(logging_config.get('max_file_mb', 10) * 1024 * 1024),
+            backup_count=logging_config.get('backup_count', 5),
+            compress=logging_config.get('compress', False),
+            json_format=logging_config.get('json_format', False),
+            console=logging_config.get('enabled', True)
+        )
+        self.event_log = LogSubscriber(self.logger)
         
         # Application state
         self.image_path = None
@@ -44,6 +58,23 @@ class MainWindow(ctk.CTk):
             'include_dense': False,
             'max_features': 8192,
             'overlap': 10,
+            'retrieval_neighbors': 20,
+            'spatial_max_distance': None,
+            'video_window_seconds': 0.5,
+            'remove_duplicates': False,
+            'extraction_shards': 1,
+            'shard_hosts': [],
+            'partitioned_mapping': False,
+            'profile': 'balanced',
+            'clustered_dense': False,
+            'dense_cluster_size': 200,
+            'dense_cluster_workers': 2,
+            'stereo_source_views': 10,
+            'depth_min_coverage': 0.0,
+            'depth_min_score': 0.0,
+            'incremental_fusion': False,
+            'outlier_filter': 'statistical',
+            'morton_order': False,
             # Fisheye options
             'fisheye_enabled': False,
             'camera_model': 'OPENCV_FISHEYE',
@@ -53,9 +84,28 @@ class MainWindow(ctk.CTk):
             'dgut_enabled': False,
             'dgut_mcmc': True,
             'dgut_iterations': 30000,
-            'dgut_export_ply': True
+            'dgut_export_ply': True,
+            'dgut_downsample': 2,
+            'dgut_dense_init': False,
+            'dgut_init_max_points': 1000000,
+            'dgut_early_stopping': False,
+            'dgut_plateau_iterations': 3000,
+            'dgut_min_psnr_gain': 0.05,
+            'dgut_resume': True,
+            'dgut_checkpoint_budget_gb': 20.0,
+            'splat_pruning': True,
+            'splat_min_opacity': 0.005,
+            'splat_min_contribution': 0.5,
+            'splat_sh_degree': None,
+            'splat_merge_voxel': 0.0
         }
         
+        # Processing settings from config.json override the defaults above
+        processing = dict(app_config.get('processing', {}))
+        if 'matcher_overlap' in processing:
+            processing['overlap'] = processing.pop('matcher_overlap')
+        self.config.update(processing)
+        
         # Initialize wrappers
         self.setup_wrappers()
         
@@ -78,6 +128,7 @@ class MainWindow(ctk.CTk):
             self.glomap = GloMAPWrapper()
             self.dgut = DGUTWrapper()
             self.pipeline = PhotogrammetryPipeline(self.colmap, self.glomap, self.dgut)
+            self.config['profile'] = self.pipeline.profile.name
         except Exception as e:
             self.logger.error(f"Failed to initialize wrappers: {e}")
             self.colmap = None
@@ -178,7 +229,7 @@ class MainWindow(ctk.CTk):
         options_frame.grid(row=3, column=0, columnspan=3, sticky="ew", padx=15, pady=10)
         
         # GPU option
-        self.gpu_var = ctk.BooleanVar(value=True)
+        self.gpu_var = ctk.BooleanVar(value=self.config['use_gpu'])
         ctk.CTkCheckBox(
             options_frame,
             text="Use GPU Acceleration",
@@ -188,17 +239,37 @@ class MainWindow(ctk.CTk):
         
         # Matcher type
         ctk.CTkLabel(options_frame, text="Matcher:").pack(side="left", padx=(20, 5))
-        self.matcher_var = ctk.StringVar(value="sequential")
+        self.matcher_var = ctk.StringVar(value=self.config['matcher_type'])
         matcher_menu = ctk.CTkOptionMenu(
             options_frame,
-            values=["sequential", "exhaustive"],
+            values=["sequential", "adaptive", "exhaustive", "retrieval", "spatial"],
             variable=self.matcher_var,
             command=lambda x: self.update_config()
         )
         matcher_menu.pack(side="left", padx=5)
         
+        # Parameter profile
+        ctk.CTkLabel(options_frame, text="Profile:").pack(side="left", padx=(20, 5))
+        self.profile_var = ctk.StringVar(value=self.config['profile'])
+        profile_menu = ctk.CTkOptionMenu(
+            options_frame,
+            values=sorted(load_profiles()),
+            variable=self.profile_var,
+            command=lambda x: self.update_config()
+        )
+        profile_menu.pack(side="left", padx=5)
+        
+        # Near-duplicate removal option
+        self.dedup_var = ctk.BooleanVar(value=self.config['remove_duplicates'])
+        ctk.CTkCheckBox(
+            options_frame,
+            text="Skip Near-Duplicates",
+            variable=self.dedup_var,
+            command=self.update_config
+        ).pack(side="left", padx=(20, 5), pady=10)
+        
         # Dense reconstruction option
-        self.dense_var = ctk.BooleanVar(value=False)
+        self.dense_var = ctk.BooleanVar(value=self.config['include_dense'])
         self.dense_check = ctk.CTkCheckBox(
             options_frame,
             text="Include Dense Reconstruction",
@@ -476,6 +547,10 @@ class MainWindow(ctk.CTk):
         self.config['use_gpu'] = self.gpu_var.get()
         self.config['matcher_type'] = self.matcher_var.get()
         self.config['include_dense'] = self.dense_var.get()
+        self.config['remove_duplicates'] = self.dedup_var.get()
+        self.config['profile'] = self.profile_var.get()
+        if self.pipeline:
+            self.pipeline.set_profile(self.config['profile'])
         
         # Fisheye options
         self.config['fisheye_enabled'] = self.fisheye_var.get()
@@ -572,13 +647,14 @@ class MainWindow(ctk.CTk):
         
         # Clear log
         self.log_text.delete("1.0", "end")
+        self.start_run_log('pipeline')
         
         # Create and start worker
         self.worker = PipelineWorker(
             pipeline=self.pipeline,
             project_path=self.project_path,
             config=self.config,
-            callback=self.log_message
+            callback=None
         )
         self.worker.start()
         
@@ -619,12 +695,14 @@ class MainWindow(ctk.CTk):
         
         # Clear log
         self.log_text.delete("1.0", "end")
+        self.start_run_log('dense')
         
         # Create and start worker
         self.worker = DenseOnlyWorker(
             pipeline=self.pipeline,
             project_path=self.project_path,
-            callback=self.log_message
+            callback=None,
+            config=self.config
         )
         self.worker.start()
         
@@ -656,7 +734,7 @@ class MainWindow(ctk.CTk):
             )
             return
         
-        # Check if sparse reconstruction exists (unless using depth-based init)
+        # Check if sparse reconstruction exists (camera poses are always needed)
         sparse_path = Path(self.project_path) / 'sparse' / '0'
         images_path = Path(self.project_path) / 'images'
         
@@ -671,9 +749,9 @@ class MainWindow(ctk.CTk):
             response = messagebox.askyesno(
                 "Sparse Model Not Found",
                 "No sparse reconstruction found in the project folder.\n\n"
-                "3DGUT requires either:\n"
-                "1. Existing sparse model (run Complete Pipeline first)\n"
-                "2. Depth-based initialization (UniK3D - not yet implemented)\n\n"
+                "3DGUT requires the camera poses of a sparse model (run Complete Pipeline first).\n"
+                "Gaussians are seeded from the sparse points, or from the filtered dense\n"
+                "cloud (dense/fused.ply) when 'dgut_dense_init' is enabled in config.json.\n\n"
                 "Do you want to run the complete pipeline first?"
             )
             if response:
@@ -693,7 +771,8 @@ class MainWindow(ctk.CTk):
             f"• Camera: {camera_model}\n"
             f"• Iterations: {self.config['dgut_iterations']:,}\n"
             f"• MCMC: {'Enabled' if self.config['dgut_mcmc'] else 'Disabled'}\n"
-            f"• Export PLY: {'Yes' if self.config['dgut_export_ply'] else 'No'}\n\n"
+            f"• Export PLY: {'Yes' if self.config['dgut_export_ply'] else 'No'}\n"
+            f"• Initialization: {'Dense cloud' if self.config['dgut_dense_init'] else 'Sparse points'}\n\n"
             f"⏱ Estimated time: 30-80 minutes (RTX 4090)\n"
             f"💾 GPU memory required: ~16 GB\n\n"
             f"Continue?"
@@ -710,6 +789,7 @@ class MainWindow(ctk.CTk):
         
         # Clear log
         self.log_text.delete("1.0", "end")
+        self.start_run_log('3dgut')
         
         self.log_message("Starting 3DGUT training...")
         self.log_message(f"Camera model: {camera_model}")
@@ -722,7 +802,7 @@ class MainWindow(ctk.CTk):
             pipeline=self.pipeline,
             project_path=self.project_path,
             config=self.config.copy(),
-            callback=self.log_message
+            callback=None
         )
         self.worker.start()
         
@@ -732,9 +812,11 @@ class MainWindow(ctk.CTk):
     def stop_pipeline(self):
         """Stop the running pipeline."""
         if self.worker and self.worker.is_running():
-            self.log_message("⚠ Stopping pipeline (current step will finish)...")
-            # Note: Actual stopping requires more complex implementation
-            # For now, we just mark it as stopped
+            self.log_message("⚠ Cancelling pipeline (running step stops at its next progress message)...")
+            self.worker.cancel()
+            # Buttons are re-enabled when the worker reports back
+            self.stop_btn.configure(state="disabled")
+            return
         
         self.run_btn.configure(state="normal")
         self.dense_btn.configure(state="normal")
@@ -749,12 +831,12 @@ class MainWindow(ctk.CTk):
             if message:
                 msg_type, msg_data = message
                 
-                if msg_type == 'progress':
-                    # Progress update - already logged by callback
-                    self.progress.set(0.5)  # Indeterminate progress
+                if msg_type == 'events':
+                    self.handle_events(msg_data)
                 
                 elif msg_type == 'finished':
                     success, result_msg, paths = msg_data
+                    self.logger.end_run()
                     
                     if success:
                         self.log_message("")
@@ -777,6 +859,7 @@ class MainWindow(ctk.CTk):
                 
                 elif msg_type == 'error':
                     self.log_message(f"✗ Error: {msg_data}")
+                    self.logger.end_run()
                     self.progress.set(0)
                     self.run_btn.configure(state="normal")
                     self.dense_btn.configure(state="normal")
@@ -787,11 +870,43 @@ class MainWindow(ctk.CTk):
         # Schedule next check
         self.after(100, self.check_worker_messages)
     
+    def start_run_log(self, name):
+        """
+        Start the per-run log file in the project's logs folder.
+        
+        Args:
+            name: Run name used as file prefix
+        """
+        if self.run_logs and self.project_path:
+            log_file = self.logger.start_run(self.project_path, name)
+            self.log_message(f"Log file: {log_file}")
+    
     def open_output(self):
         """Open the output folder."""
         if self.project_path:
             os.startfile(self.project_path)
     
+    def handle_events(self, events):
+        """
+        Show a batch of pipeline events in the log and progress bar.
+        
+        Args:
+            events: List of events (core.events)
+        """
+        lines = []
+        for event in events:
+            if isinstance(event, StageStarted):
+                self.progress.set(0)
+            elif isinstance(event, Progress):
+                self.progress.set(event.fraction)
+            if not isinstance(event, Metric):
+                lines.append(format_event(event))
+        
+        if lines:
+            self.log_text.insert("end", "\n".join(lines) + "\n")
+            self.log_text.see("end")
+        self.event_log(events)
+    
     def log_message(self, message):
         """
         Add message to log display.
@@ -812,7 +927,11 @@ class MainWindow(ctk.CTk):
             )
             if not response:
                 return
+            self.worker.cancel()
         
+        if self.dgut:
+            self.dgut.close()
+        self.logger.close()
         self.destroy()
 
 
@@ -1,134 +1,91 @@
-"""Worker threads for background processing."""
-import threading
+"""Background workers of the GUI, running as jobs on a shared executor."""
 import queue
 from pathlib import Path
 
+from core.events import MetricsWriter, format_event
+from core.jobs import Job, JobRunner
 
-class PipelineWorker:
-    """Worker thread for running photogrammetry pipeline."""
-    
-    def __init__(self, pipeline, project_path, config, callback):
-        """
-        Initialize worker.
-        
-        Args:
-            pipeline: PhotogrammetryPipeline instance
-            project_path: Path to project directory
-            config: Configuration dictionary
-            callback: Callback function for progress updates
-        """
-        self.pipeline = pipeline
-        self.project_path = project_path
-        self.config = config
-        self.callback = callback
-        self.thread = None
-        self.running = False
-        self.output_queue = queue.Queue()
-    
-    def start(self):
-        """Start the worker thread."""
-        if self.running:
-            return
-        
-        self.running = True
-        self.thread = threading.Thread(target=self._run, daemon=True)
-        self.thread.start()
-    
-    def _run(self):
-        """Run the pipeline in background thread."""
-        try:
-            def progress_callback(message):
-                """Internal callback to queue messages."""
-                self.output_queue.put(('progress', message))
-                if self.callback:
-                    self.callback(message)
-            
-            # Run the complete pipeline
-            success, message, paths = self.pipeline.run_complete_pipeline(
-                project_path=self.project_path,
-                use_gpu=self.config.get('use_gpu', True),
-                matcher_type=self.config.get('matcher_type', 'sequential'),
-                include_dense=self.config.get('include_dense', False),
-                callback=progress_callback
-            )
-            
-            # Signal completion
-            self.output_queue.put(('finished', (success, message, paths)))
-            
-        except Exception as e:
-            self.output_queue.put(('error', str(e)))
-        finally:
-            self.running = False
-    
-    def is_running(self):
-        """Check if worker is still running."""
-        return self.running
-    
-    def get_message(self, timeout=0.1):
-        """
-        Get next message from queue.
-        
-        Args:
-            timeout: Timeout in seconds
-            
-        Returns:
-            Tuple of (message_type, message_data) or None
-        """
-        try:
-            return self.output_queue.get(timeout=timeout)
-        except queue.Empty:
-            return None
+
+# One runner for the whole application: stages run one at a time
+_runner = None
+
+
+def get_runner():
+    """
+    Shared job runner of the GUI.
+    
+    Returns:
+        JobRunner instance
+    """
+    global _runner
+    if _runner is None:
+        _runner = JobRunner(max_workers=1)
+    return _runner
 
 
-class StepWorker:
-    """Worker thread for running individual pipeline steps."""
+class JobWorker:
+    """
+    Runs one job on the shared runner and reports to the GUI through a queue.
     
-    def __init__(self, step_func, callback):
+    Queue messages are ('events', [events]) batches while the job runs,
+    then ('finished', result tuple) or ('error', message). Subclasses
+    implement execute(callback) and return the result tuple.
+    """
+    
+    name = "Job"
+    
+    def __init__(self, callback=None, project_path=None, runner=None):
         """
-        Initialize step worker.
+        Initialize worker.
         
         Args:
-            step_func: Function to execute
-            callback: Callback for progress updates
+            callback: Legacy callback receiving every event as a string (optional)
+            project_path: Project folder receiving metrics.jsonl (optional)
+            runner: JobRunner (the shared runner if None)
         """
-        self.step_func = step_func
         self.callback = callback
-        self.thread = None
-        self.running = False
+        self.project_path = project_path
+        self.runner = runner or get_runner()
         self.output_queue = queue.Queue()
+        self.job = None
+    
+    def execute(self, callback):
+        """Run the work; returns (success, message[, data])."""
+        raise NotImplementedError
     
     def start(self):
-        """Start the worker thread."""
-        if self.running:
+        """Submit the job."""
+        if self.is_running():
             return
         
-        self.running = True
-        self.thread = threading.Thread(target=self._run, daemon=True)
-        self.thread.start()
+        self.job = Job(self.name, self.execute)
+        self.job.subscribe(lambda events: self.output_queue.put(('events', events)), batched=True)
+        if self.callback:
+            self.job.subscribe(lambda event: self.callback(format_event(event)))
+        if self.project_path:
+            self.job.subscribe(MetricsWriter(Path(self.project_path) / 'metrics.jsonl'), batched=True)
+        self.job.future.add_done_callback(self._finished)
+        self.runner.submit(self.job)
+    
+    def _finished(self, future):
+        """Queue the final message."""
+        if future.cancelled():
+            self.output_queue.put(('error', f"{self.name} cancelled"))
+            return
+        result = future.result()
+        if self.job.state == 'cancelled':
+            self.output_queue.put(('error', result.message))
+        else:
+            self.output_queue.put(('finished', result.values))
     
-    def _run(self):
-        """Run the step in background thread."""
-        try:
-            def progress_callback(message):
-                """Internal callback to queue messages."""
-                self.output_queue.put(('progress', message))
-                if self.callback:
-                    self.callback(message)
-            
-            # Run the step function
-            success, message = self.step_func(progress_callback)
-            
-            # Signal completion
-            self.output_queue.put(('finished', (success, message)))
-            
-        except Exception as e:
-            self.output_queue.put(('error', str(e)))
-        finally:
-            self.running = False
+    def cancel(self):
+        """Cancel the job (a running stage stops at its next progress message)."""
+        if self.job:
+            self.job.cancel()
     
     def is_running(self):
-        """Check if worker is still running."""
-        return self.running
+        """Check if the job is queued or running."""
+        return self.job is not None and not self.job.done()
     
     def get_message(self, timeout=0.1):
         """
@@ -136,7 +93,7 @@ class StepWorker:
         
         Args:
             timeout: Timeout in seconds
-            
+        
         Returns:
             Tuple of (message_type, message_data) or None
         """
@@ -146,164 +103,116 @@ class StepWorker:
             return None
 
 
-class DenseOnlyWorker:
-    """Worker thread for running dense reconstruction on existing sparse model."""
+class PipelineWorker(JobWorker):
+    """Worker running the complete photogrammetry pipeline."""
     
-    def __init__(self, pipeline, project_path, callback):
+    name = "Photogrammetry pipeline"
+    
+    def __init__(self, pipeline, project_path, config, callback=None):
         """
-        Initialize dense-only worker.
+        Initialize worker.
         
         Args:
             pipeline: PhotogrammetryPipeline instance
-            project_path: Path to project directory with existing sparse model
+            project_path: Path to project directory
+            config: Configuration dictionary
             callback: Callback function for progress updates
         """
+        super().__init__(callback, project_path)
         self.pipeline = pipeline
-        self.project_path = project_path
-        self.callback = callback
-        self.thread = None
-        self.running = False
-        self.output_queue = queue.Queue()
-    
-    def start(self):
-        """Start the worker thread."""
-        if self.running:
-            return
-        
-        self.running = True
-        self.thread = threading.Thread(target=self._run, daemon=True)
-        self.thread.start()
+        self.config = config
     
-    def _run(self):
-        """Run dense reconstruction in background thread."""
-        try:
-            def progress_callback(message):
-                """Internal callback to queue messages."""
-                self.output_queue.put(('progress', message))
-                if self.callback:
-                    self.callback(message)
-            
-            # Run dense reconstruction only
-            success, message, paths = self.pipeline.run_dense_only(
-                project_path=self.project_path,
-                callback=progress_callback
-            )
-            
-            # Signal completion
-            self.output_queue.put(('finished', (success, message, paths)))
-            
-        except Exception as e:
-            self.output_queue.put(('error', str(e)))
-        finally:
-            self.running = False
+    def execute(self, callback):
+        """Run the complete pipeline."""
+        return self.pipeline.run_complete_pipeline(
+            project_path=self.project_path,
+            use_gpu=self.config.get('use_gpu', True),
+            matcher_type=self.config.get('matcher_type', 'sequential'),
+            overlap=self.config.get('overlap', 10),
+            num_neighbors=self.config.get('retrieval_neighbors', 20),
+            max_distance=self.config.get('spatial_max_distance'),
+            include_dense=self.config.get('include_dense', False),
+            video_window=self.config.get('video_window_seconds', 0.5),
+            remove_duplicates=self.config.get('remove_duplicates', False),
+            num_shards=self.config.get('extraction_shards', 1),
+            shard_hosts=self.config.get('shard_hosts') or None,
+            partitioned=self.config.get('partitioned_mapping', False),
+            clustered_dense=self.config.get('clustered_dense', False),
+            dense_cluster_size=self.config.get('dense_cluster_size', 200),
+            dense_cluster_workers=self.config.get('dense_cluster_workers', 2),
+            source_views=self.config.get('stereo_source_views', 10),
+            min_depth_coverage=self.config.get('depth_min_coverage', 0.0),
+            min_depth_score=self.config.get('depth_min_score', 0.0),
+            incremental_fusion=self.config.get('incremental_fusion', False),
+            outlier_filter=self.config.get('outlier_filter', 'statistical'),
+            morton_order=self.config.get('morton_order', False),
+            callback=callback
+        )
+
+
+class StepWorker(JobWorker):
+    """Worker running a single function taking the progress callback."""
     
-    def is_running(self):
-        """Check if worker is still running."""
-        return self.running
+    name = "Pipeline step"
     
-    def get_message(self, timeout=0.1):
+    def __init__(self, step_func, callback=None):
         """
-        Get next message from queue.
+        Initialize step worker.
         
         Args:
-            timeout: Timeout in seconds
-            
-        Returns:
-            Tuple of (message_type, message_data) or None
+            step_func: Function to execute; returns (success, message)
+            callback: Callback for progress updates
         """
-        try:
-            return self.output_queue.get(timeout=timeout)
-        except queue.Empty:
-            return None
+        super().__init__(callback)
+        self.step_func = step_func
+    
+    def execute(self, callback):
+        """Run the step function."""
+        return self.step_func(callback)
 
 
-class DGUTWorker:
-    """Worker thread for running 3D GRUT training."""
+class DenseOnlyWorker(JobWorker):
+    """Worker running dense reconstruction on an existing sparse model."""
     
-    def __init__(self, pipeline, project_path, config, callback):
+    name = "Dense reconstruction"
+    
+    def __init__(self, pipeline, project_path, callback=None, config=None):
         """
-        Initialize 3D GRUT worker.
+        Initialize dense-only worker.
         
         Args:
             pipeline: PhotogrammetryPipeline instance
-            project_path: Path to project directory with COLMAP sparse model
-            config: Configuration dictionary with 3D GRUT settings
+            project_path: Path to project directory with existing sparse model
             callback: Callback function for progress updates
+            config: Configuration dictionary (optional)
         """
+        super().__init__(callback, project_path)
         self.pipeline = pipeline
-        self.project_path = project_path
-        self.config = config
-        self.callback = callback
-        self.thread = None
-        self.running = False
-        self.output_queue = queue.Queue()
-    
-    def start(self):
-        """Start the worker thread."""
-        if self.running:
-            return
-        
-        self.running = True
-        self.thread = threading.Thread(target=self._run, daemon=True)
-        self.thread.start()
-    
-    def _run(self):
-        """Run 3D GRUT training in background thread."""
-        try:
-            def progress_callback(message):
-                """Internal callback to queue messages."""
-                self.output_queue.put(('progress', message))
-                if self.callback:
-                    self.callback(message)
-            
-            # Get 3D GRUT configuration
-            camera_model = self.config.get('camera_model', 'perspective')
-            use_mcmc = self.config.get('dgut_mcmc', True)
-            iterations = self.config.get('dgut_iterations', 30000)
-            export_ply = self.config.get('dgut_export_ply', True)
-            
-            # Run 3D GRUT reconstruction
-            success, message, output_path = self.pipeline.run_3dgut_reconstruction(
-                project_path=self.project_path,
-                camera_model=camera_model,
-                use_mcmc=use_mcmc,
-                iterations=iterations,
-                export_ply=export_ply,
-                callback=progress_callback
-            )
-            
-            # Signal completion
-            self.output_queue.put(('finished', (success, message, output_path)))
-            
-        except Exception as e:
-            self.output_queue.put(('error', str(e)))
-        finally:
-            self.running = False
-    
-    def is_running(self):
-        """Check if worker is still running."""
-        return self.running
-    
-    def get_message(self, timeout=0.1):
-        """
-        Get next message from queue.
-        
-        Args:
-            timeout: Timeout in seconds
-            
-        Returns:
-            Tuple of (message_type, message_data) or None
-        """
-        try:
-            return self.output_queue.get(timeout=timeout)
-        except queue.Empty:
-            return None
+        self.config = config or {}
+    
+    def execute(self, callback):
+        """Run dense reconstruction only."""
+        return self.pipeline.run_dense_only(
+            project_path=self.project_path,
+            clustered=self.config.get('clustered_dense', False),
+            max_cluster_size=self.config.get('dense_cluster_size', 200),
+            cluster_workers=self.config.get('dense_cluster_workers', 2),
+            source_views=self.config.get('stereo_source_views', 10),
+            min_depth_coverage=self.config.get('depth_min_coverage', 0.0),
+            min_depth_score=self.config.get('depth_min_score', 0.0),
+            incremental_fusion=self.config.get('incremental_fusion', False),
+            outlier_filter=self.config.get('outlier_filter', 'statistical'),
+            morton_order=self.config.get('morton_order', False),
+            callback=callback
+        )
 
 
-class DGUTWorker:
-    """Worker thread for running 3D GRUT training."""
+class DGUTWorker(JobWorker):
+    """Worker running 3D GRUT training."""
     
-    def __init__(self, pipeline, project_path, config, callback):
+    name = "3DGUT training"
+    
+    def __init__(self, pipeline, project_path, config, callback=None):
         """
         Initialize 3D GRUT worker.
         
@@ -313,71 +222,32 @@ class DGUTWorker:
             config: Configuration dictionary with 3D GRUT settings
             callback: Callback function for progress updates
         """
+        super().__init__(callback, project_path)
         self.pipeline = pipeline
-        self.project_path = project_path
         self.config = config
-        self.callback = callback
-        self.thread = None
-        self.running = False
-        self.output_queue = queue.Queue()
-    
-    def start(self):
-        """Start the worker thread."""
-        if self.running:
-            return
-        
-        self.running = True
-        self.thread = threading.Thread(target=self._run, daemon=True)
-        self.thread.start()
     
-    def _run(self):
-        """Run 3D GRUT training in background thread."""
-        try:
-            def progress_callback(message):
-                """Internal callback to queue messages."""
-                self.output_queue.put(('progress', message))
-                if self.callback:
-                    self.callback(message)
-            
-            # Get 3D GRUT configuration
-            camera_model = self.config.get('camera_model', 'perspective')
-            use_mcmc = self.config.get('dgut_mcmc', True)
-            iterations = self.config.get('dgut_iterations', 30000)
-            export_ply = self.config.get('dgut_export_ply', True)
-            
-            # Run 3D GRUT reconstruction
-            success, message, output_path = self.pipeline.run_3dgut_reconstruction(
-                project_path=self.project_path,
-                camera_model=camera_model,
-                use_mcmc=use_mcmc,
-                iterations=iterations,
-                export_ply=export_ply,
-                callback=progress_callback
-            )
-            
-            # Signal completion
-            self.output_queue.put(('finished', (success, message, output_path)))
-            
-        except Exception as e:
-            self.output_queue.put(('error', str(e)))
-        finally:
-            self.running = False
-    
-    def is_running(self):
-        """Check if worker is still running."""
-        return self.running
-    
-    def get_message(self, timeout=0.1):
-        """
-        Get next message from queue.
-        
-        Args:
-            timeout: Timeout in seconds
-            
-        Returns:
-            Tuple of (message_type, message_data) or None
-        """
-        try:
-            return self.output_queue.get(timeout=timeout)
-        except queue.Empty:
-            return None
+    def execute(self, callback):
+        """Run 3D GRUT reconstruction; returns (success, message, paths)."""
+        paths = self.pipeline.setup_workspace(self.project_path)
+        success, message = self.pipeline.run_3dgut_reconstruction(
+            paths,
+            camera_model=self.config.get('camera_model', 'perspective'),
+            use_mcmc=self.config.get('dgut_mcmc', True),
+            iterations=self.config.get('dgut_iterations', 30000),
+            export_ply=self.config.get('dgut_export_ply', True),
+            down_sample_factor=self.config.get('dgut_downsample', 2),
+            dense_init=self.config.get('dgut_dense_init', False),
+            init_max_points=self.config.get('dgut_init_max_points', 1000000),
+            early_stopping=self.config.get('dgut_early_stopping', False),
+            plateau_iterations=self.config.get('dgut_plateau_iterations', 3000),
+            min_psnr_gain=self.config.get('dgut_min_psnr_gain', 0.05),
+            resume=self.config.get('dgut_resume', True),
+            checkpoint_budget_gb=self.config.get('dgut_checkpoint_budget_gb', 20.0),
+            prune_splats=self.config.get('splat_pruning', True),
+            splat_min_opacity=self.config.get('splat_min_opacity', 0.005),
+            splat_min_contribution=self.config.get('splat_min_contribution', 0.5),
+            splat_sh_degree=self.config.get('splat_sh_degree'),
+            splat_merge_voxel=self.config.get('splat_merge_voxel', 0.0),
+            callback=callback
+        )
+        return success, message, paths
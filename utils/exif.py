@@ -0,0 +1,125 @@
+"""Minimal EXIF reader for GPS positions (JPEG and TIFF)."""
+import struct
+from pathlib import Path
+
+
+GPS_IFD_TAG = 0x8825
+
+# Byte sizes of TIFF field types
+_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 7: 1, 9: 4, 10: 8}
+
+
+def _read_tiff_gps(data):
+    """
+    Parse the GPS IFD from a TIFF/EXIF block.
+
+    Args:
+        data: Bytes starting at the TIFF header
+
+    Returns:
+        Dictionary of raw GPS tag values, or None
+    """
+    if data[:2] == b'II':
+        endian = '<'
+    elif data[:2] == b'MM':
+        endian = '>'
+    else:
+        return None
+
+    def read_ifd(offset):
+        entries = {}
+        count, = struct.unpack_from(endian + 'H', data, offset)
+        for i in range(count):
+            entry = offset + 2 + i * 12
+            tag, field_type, num = struct.unpack_from(endian + 'HHI', data, entry)
+            size = _TYPE_SIZES.get(field_type)
+            if size is None:
+                continue
+            value_offset = entry + 8
+            if size * num > 4:
+                value_offset, = struct.unpack_from(endian + 'I', data, entry + 8)
+            entries[tag] = (field_type, num, value_offset)
+        return entries
+
+    def read_value(field_type, num, offset):
+        if field_type in (5, 10):
+            fmt = 'I' if field_type == 5 else 'i'
+            values = struct.unpack_from(endian + fmt * (2 * num), data, offset)
+            return [values[i] / values[i + 1] if values[i + 1] else 0.0
+                    for i in range(0, len(values), 2)]
+        if field_type == 2:
+            return data[offset:offset + num].split(b'\x00')[0].decode('ascii', errors='ignore')
+        if field_type == 3:
+            return list(struct.unpack_from(endian + 'H' * num, data, offset))
+        if field_type in (4, 9):
+            return list(struct.unpack_from(endian + ('I' if field_type == 4 else 'i') * num,
+                                           data, offset))
+        return list(data[offset:offset + num])
+
+    ifd0_offset, = struct.unpack_from(endian + 'I', data, 4)
+    ifd0 = read_ifd(ifd0_offset)
+    if GPS_IFD_TAG not in ifd0:
+        return None
+
+    gps_offset = read_value(*ifd0[GPS_IFD_TAG])[0]
+    return {tag: read_value(*entry) for tag, entry in read_ifd(gps_offset).items()}
+
+
+def _exif_block(path):
+    """Return the TIFF-formatted EXIF block of a JPEG or TIFF file, or None."""
+    with open(path, 'rb') as f:
+        head = f.read(4)
+        if head[:2] in (b'II', b'MM'):
+            f.seek(0)
+            return f.read()
+        if head[:2] != b'\xff\xd8':
+            return None
+
+        f.seek(2)
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            if marker[1] in (0xD9, 0xDA):  # end of image / start of scan
+                return None
+            length, = struct.unpack('>H', f.read(2))
+            segment = f.read(length - 2)
+            if marker[1] == 0xE1 and segment[:6] == b'Exif\x00\x00':
+                return segment[6:]
+
+
+def read_gps(path):
+    """
+    Read the GPS position stored in an image's EXIF data.
+
+    Args:
+        path: Path to a JPEG or TIFF image
+
+    Returns:
+        Tuple of (latitude, longitude, altitude) in degrees/meters, or None
+        if the image has no GPS position. Altitude is 0.0 when missing.
+    """
+    try:
+        block = _exif_block(Path(path))
+        gps = _read_tiff_gps(block) if block else None
+    except (OSError, struct.error, IndexError):
+        return None
+
+    if not gps or 2 not in gps or 4 not in gps:
+        return None
+
+    def to_degrees(dms):
+        return dms[0] + dms[1] / 60.0 + dms[2] / 3600.0
+
+    latitude = to_degrees(gps[2])
+    longitude = to_degrees(gps[4])
+    if gps.get(1) == 'S':
+        latitude = -latitude
+    if gps.get(3) == 'W':
+        longitude = -longitude
+
+    altitude = gps[6][0] if 6 in gps else 0.0
+    if gps.get(5) and gps[5][0] == 1:
+        altitude = -altitude
+
+    return latitude, longitude, altitude
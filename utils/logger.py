@@ -1,35 +1,97 @@
 """Logging utilities for the application."""
+import atexit
+import gzip
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import shutil
 from datetime import datetime
 from pathlib import Path
 
 
+class JsonFormatter(logging.Formatter):
+    """Formats records as JSON lines (time, level, logger, message)."""
+    
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _gzip_namer(name):
+    """Name of a rotated, compressed log file."""
+    return name + '.gz'
+
+
+def _gzip_rotator(source, dest):
+    """Compress a rotated log file."""
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
 class PhotogrammetryLogger:
-    """Custom logger for photogrammetry operations."""
+    """
+    Custom logger for photogrammetry operations.
+    
+    Logging calls only put the record on a queue; a background listener
+    thread writes it to the console and the log files, so streaming tool
+    output never waits for disk or terminal I/O. Log files rotate by size.
+    """
     
-    def __init__(self, log_dir=None, log_level=logging.INFO):
+    def __init__(self, log_dir=None, log_level=logging.INFO, max_bytes=10 * 1024 * 1024,
+                 backup_count=5, compress=False, json_format=False, console=True):
         """
         Initialize logger.
         
         Args:
             log_dir: Directory to store log files
             log_level: Logging level (DEBUG, INFO, WARNING, ERROR)
+            max_bytes: Size at which a log file is rotated (0 disables rotation)
+            backup_count: Rotated files kept per log
+            compress: Gzip rotated log files
+            json_format: Write log files as JSON lines instead of text
+            console: Also log to the console
         """
+        if isinstance(log_level, str):
+            log_level = getattr(logging, log_level.upper(), logging.INFO)
+        self.log_level = log_level
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self.json_format = json_format
+        
         self.logger = logging.getLogger('PhotogrammetryGUI')
         self.logger.setLevel(log_level)
+        self.logger.propagate = False
         
-        # Remove existing handlers
+        # Remove existing handlers (and stop a previous instance's listener)
+        global _listener
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
         self.logger.handlers = []
         
+        self.handlers = []
+        
         # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(log_level)
-        console_format = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(message)s',
-            datefmt='%H:%M:%S'
-        )
-        console_handler.setFormatter(console_format)
-        self.logger.addHandler(console_handler)
+        if console:
+            console_handler = logging.StreamHandler()
+            console_handler.setLevel(log_level)
+            console_format = logging.Formatter(
+                '%(asctime)s - %(levelname)s - %(message)s',
+                datefmt='%H:%M:%S'
+            )
+            console_handler.setFormatter(console_format)
+            self.handlers.append(console_handler)
         
         # File handler (if log_dir specified)
         if log_dir:
@@ -37,20 +99,99 @@ class PhotogrammetryLogger:
             log_dir.mkdir(parents=True, exist_ok=True)
             
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            log_file = log_dir / f'photogrammetry_{timestamp}.log'
-            
-            file_handler = logging.FileHandler(log_file, encoding='utf-8')
-            file_handler.setLevel(log_level)
-            file_format = logging.Formatter(
-                '%(asctime)s - %(levelname)s - %(message)s',
-                datefmt='%Y-%m-%d %H:%M:%S'
-            )
-            file_handler.setFormatter(file_format)
-            self.logger.addHandler(file_handler)
-            
+            suffix = 'jsonl' if json_format else 'log'
+            log_file = log_dir / f'photogrammetry_{timestamp}.{suffix}'
+            self.handlers.append(self._file_handler(log_file))
             self.log_file = log_file
         else:
             self.log_file = None
+        
+        self.run_handler = None
+        self.run_log_file = None
+        
+        # Records go through a queue to the listener thread
+        self.queue = queue.SimpleQueue()
+        self.logger.addHandler(logging.handlers.QueueHandler(self.queue))
+        self._start_listener()
+    
+    def _file_handler(self, log_file):
+        """
+        Create a size-rotated file handler.
+        
+        Args:
+            log_file: Log file path
+        
+        Returns:
+            RotatingFileHandler instance
+        """
+        handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=self.max_bytes, backupCount=self.backup_count,
+            encoding='utf-8', delay=True
+        )
+        if self.compress:
+            handler.namer = _gzip_namer
+            handler.rotator = _gzip_rotator
+        handler.setLevel(self.log_level)
+        if self.json_format:
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter(
+                '%(asctime)s - %(levelname)s - %(message)s',
+                datefmt='%Y-%m-%d %H:%M:%S'
+            ))
+        return handler
+    
+    def _start_listener(self):
+        """(Re)start the listener thread with the current handlers."""
+        global _listener
+        if _listener is not None:
+            _listener.stop()
+        handlers = self.handlers + ([self.run_handler] if self.run_handler else [])
+        _listener = logging.handlers.QueueListener(self.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+    
+    def start_run(self, project_path, name='run'):
+        """
+        Start a per-run log file in the project's logs folder.
+        
+        Args:
+            project_path: Project directory
+            name: File name prefix (e.g. 'pipeline', 'dense', '3dgut')
+        
+        Returns:
+            Path to the run log file
+        """
+        self.end_run()
+        log_dir = Path(project_path) / 'logs'
+        log_dir.mkdir(parents=True, exist_ok=True)
+        
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        suffix = 'jsonl' if self.json_format else 'log'
+        self.run_log_file = log_dir / f'{name}_{timestamp}.{suffix}'
+        self.run_handler = self._file_handler(self.run_log_file)
+        self._start_listener()
+        return self.run_log_file
+    
+    def end_run(self):
+        """Close the per-run log file (after writing all queued records)."""
+        if self.run_handler is None:
+            return
+        handler, self.run_handler = self.run_handler, None
+        self._start_listener()
+        handler.close()
+    
+    def flush(self):
+        """Wait until all queued records are written."""
+        self._start_listener()
+    
+    def close(self):
+        """Write all queued records and stop the listener thread."""
+        global _listener
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+        for handler in self.handlers + ([self.run_handler] if self.run_handler else []):
+            handler.close()
     
     def debug(self, message):
         """Log debug message."""
@@ -75,23 +216,32 @@ class PhotogrammetryLogger:
     def get_log_file(self):
         """Get path to log file."""
         return self.log_file
+    
+    def get_run_log_file(self):
+        """Get path to the current per-run log file."""
+        return self.run_log_file
+
 
+# Listener thread of the active logger (one per process)
+_listener = None
 
 # Global logger instance
 _global_logger = None
 
 
-def get_logger(log_dir=None):
+def get_logger(log_dir=None, **options):
     """
     Get or create global logger instance.
     
     Args:
         log_dir: Directory for log files (only used on first call)
-        
+        **options: PhotogrammetryLogger options (only used on first call)
+    
     Returns:
         PhotogrammetryLogger instance
     """
     global _global_logger
     if _global_logger is None:
-        _global_logger = PhotogrammetryLogger(log_dir=log_dir)
+        _global_logger = PhotogrammetryLogger(log_dir=log_dir, **options)
+        atexit.register(_global_logger.close)
     return _global_logger
@@ -0,0 +1,279 @@
+"""Nearest-neighbour search over point sets."""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+class NeighborIndex:
+    """
+    k-nearest and radius neighbour queries over N x D points.
+
+    Uses scipy's cKDTree when available; otherwise falls back to blockwise
+    brute-force search in NumPy, which is fine for image-count sized sets
+    (tens of thousands of points).
+    """
+
+    def __init__(self, points, block_size=2048):
+        """
+        Build the index.
+
+        Args:
+            points: N x D array of points
+            block_size: Query rows per block in the NumPy fallback
+        """
+        self.points = np.asarray(points, dtype=np.float64)
+        self.block_size = block_size
+        self.tree = cKDTree(self.points) if cKDTree is not None else None
+
+    def __len__(self):
+        return len(self.points)
+
+    def query_knn(self, queries, k):
+        """
+        Find the k nearest indexed points for each query.
+
+        Args:
+            queries: M x D array of query points
+            k: Number of neighbours
+
+        Returns:
+            Tuple of (distances, indices), both M x k, sorted by distance.
+            Missing neighbours (k > N) have distance inf and index N.
+        """
+        queries = np.asarray(queries, dtype=np.float64)
+        if self.tree is not None:
+            distances, indices = self.tree.query(queries, k=k)
+            if k == 1:
+                distances, indices = distances[:, None], indices[:, None]
+            return distances, indices
+
+        count = len(self.points)
+        kk = min(k, count)
+        distances = np.full((len(queries), k), np.inf)
+        indices = np.full((len(queries), k), count, dtype=np.int64)
+        point_norms = (self.points ** 2).sum(axis=1)
+
+        for start in range(0, len(queries), self.block_size):
+            block = queries[start:start + self.block_size]
+            squared = (block ** 2).sum(axis=1)[:, None] + point_norms[None, :] \
+                - 2.0 * block @ self.points.T
+            np.maximum(squared, 0.0, out=squared)
+            nearest = np.argpartition(squared, kk - 1, axis=1)[:, :kk]
+            nearest_sq = np.take_along_axis(squared, nearest, axis=1)
+            order = np.argsort(nearest_sq, axis=1)
+            rows = slice(start, start + len(block))
+            indices[rows, :kk] = np.take_along_axis(nearest, order, axis=1)
+            distances[rows, :kk] = np.sqrt(np.take_along_axis(nearest_sq, order, axis=1))
+
+        return distances, indices
+
+    def query_radius(self, queries, radius):
+        """
+        Find all indexed points within a radius of each query.
+
+        Args:
+            queries: M x D array of query points
+            radius: Search radius
+
+        Returns:
+            List of M index arrays
+        """
+        queries = np.asarray(queries, dtype=np.float64)
+        if self.tree is not None:
+            return [np.asarray(found, dtype=np.int64)
+                    for found in self.tree.query_ball_point(queries, radius)]
+
+        results = []
+        radius_sq = radius * radius
+        point_norms = (self.points ** 2).sum(axis=1)
+        for start in range(0, len(queries), self.block_size):
+            block = queries[start:start + self.block_size]
+            squared = (block ** 2).sum(axis=1)[:, None] + point_norms[None, :] \
+                - 2.0 * block @ self.points.T
+            results.extend(np.flatnonzero(row <= radius_sq) for row in squared)
+        return results
+
+    def count_radius(self, queries, radius):
+        """
+        Count the indexed points within a radius of each query.
+
+        Args:
+            queries: M x D array of query points
+            radius: Search radius
+
+        Returns:
+            Length M int64 array (a query that is itself indexed counts itself)
+        """
+        queries = np.asarray(queries, dtype=np.float64)
+        if self.tree is not None:
+            return np.asarray(self.tree.query_ball_point(queries, radius, return_length=True),
+                              dtype=np.int64)
+
+        counts = np.zeros(len(queries), dtype=np.int64)
+        radius_sq = radius * radius
+        point_norms = (self.points ** 2).sum(axis=1)
+        for start in range(0, len(queries), self.block_size):
+            block = queries[start:start + self.block_size]
+            squared = (block ** 2).sum(axis=1)[:, None] + point_norms[None, :] \
+                - 2.0 * block @ self.points.T
+            counts[start:start + len(block)] = (squared <= radius_sq).sum(axis=1)
+        return counts
+
+
+# Bits per axis of packed grid cell keys
+_CELL_BITS = 21
+
+
+class GridIndex:
+    """
+    k-nearest and radius neighbour queries over N x 3 points using a uniform grid.
+
+    Points are bucketed into cubic cells and each query only searches its
+    own and the 26 adjacent cells, so the cost grows linearly with the
+    cloud size. Results are exact for neighbours closer than cell_size;
+    farther neighbours are not searched. Used for large point clouds when
+    scipy is not available.
+    """
+
+    def __init__(self, points, cell_size):
+        """
+        Build the index.
+
+        Args:
+            points: N x 3 array of points
+            cell_size: Cell edge length (the maximum exact search distance)
+        """
+        self.points = np.asarray(points, dtype=np.float64)
+        self.cell_size = float(cell_size)
+        self.origin = self.points.min(axis=0) if len(self.points) else np.zeros(3)
+
+        keys = self._cell_keys(self.points)
+        self.order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[self.order]
+        self.cells, self.starts = np.unique(sorted_keys, return_index=True)
+        self.ends = np.r_[self.starts[1:], len(sorted_keys)].astype(np.int64)
+
+        offsets = np.stack(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1], indexing='ij'), -1).reshape(-1, 3)
+        self._offset_keys = (offsets[:, 0] << (2 * _CELL_BITS)) + (offsets[:, 1] << _CELL_BITS) + offsets[:, 2]
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cell_keys(self, points):
+        """Packed cell key of every point (coordinates shifted so neighbours stay positive)."""
+        coords = np.floor((points - self.origin) / self.cell_size).astype(np.int64) + 1
+        np.clip(coords, 0, (1 << _CELL_BITS) - 2, out=coords)
+        return (coords[:, 0] << (2 * _CELL_BITS)) | (coords[:, 1] << _CELL_BITS) | coords[:, 2]
+
+    def _groups(self, queries):
+        """
+        Group queries by cell and collect the candidate points of each group.
+
+        Yields:
+            Tuples of (query indices, candidate point indices)
+        """
+        keys = self._cell_keys(queries)
+        order = np.argsort(keys, kind='stable')
+        query_cells, query_starts = np.unique(keys[order], return_index=True)
+        query_ends = np.r_[query_starts[1:], len(order)]
+
+        neighbours = query_cells[:, None] + self._offset_keys[None, :]
+        slots = np.minimum(np.searchsorted(self.cells, neighbours), max(len(self.cells) - 1, 0))
+        found = self.cells[slots] == neighbours if len(self.cells) else np.zeros(neighbours.shape, bool)
+
+        for group in range(len(query_cells)):
+            cells = slots[group][found[group]]
+            candidates = np.concatenate([self.order[self.starts[c]:self.ends[c]] for c in cells]) \
+                if len(cells) else np.zeros(0, dtype=np.int64)
+            yield order[query_starts[group]:query_ends[group]], candidates
+
+    def _squared_distances(self, queries, candidates):
+        """Squared distances between queries and candidate points (relative to the first query)."""
+        anchor = queries[0]
+        block = queries - anchor
+        points = self.points[candidates] - anchor
+        squared = (block ** 2).sum(axis=1)[:, None] + (points ** 2).sum(axis=1)[None, :] \
+            - 2.0 * block @ points.T
+        return np.maximum(squared, 0.0, out=squared)
+
+    def query_knn(self, queries, k):
+        """
+        Find the k nearest indexed points for each query.
+
+        Args:
+            queries: M x 3 array of query points
+            k: Number of neighbours
+
+        Returns:
+            Tuple of (distances, indices), both M x k, sorted by distance.
+            Neighbours farther than cell_size have distance inf and index N.
+        """
+        queries = np.asarray(queries, dtype=np.float64)
+        count = len(self.points)
+        distances = np.full((len(queries), k), np.inf)
+        indices = np.full((len(queries), k), count, dtype=np.int64)
+
+        for rows, candidates in self._groups(queries):
+            if not len(candidates):
+                continue
+            squared = self._squared_distances(queries[rows], candidates)
+            kk = min(k, len(candidates))
+            nearest = np.argpartition(squared, kk - 1, axis=1)[:, :kk] if kk < len(candidates) \
+                else np.broadcast_to(np.arange(kk), (len(rows), kk))
+            nearest_sq = np.take_along_axis(squared, nearest, axis=1)
+            order = np.argsort(nearest_sq, axis=1)
+            nearest_sq = np.take_along_axis(nearest_sq, order, axis=1)
+            nearest = candidates[np.take_along_axis(nearest, order, axis=1)]
+
+            beyond = nearest_sq > self.cell_size ** 2
+            distances[rows, :kk] = np.where(beyond, np.inf, np.sqrt(nearest_sq))
+            indices[rows, :kk] = np.where(beyond, count, nearest)
+
+        return distances, indices
+
+    def count_radius(self, queries, radius):
+        """
+        Count the indexed points within a radius of each query.
+
+        Args:
+            queries: M x 3 array of query points
+            radius: Search radius (at most cell_size)
+
+        Returns:
+            Length M int64 array (a query that is itself indexed counts itself)
+
+        Raises:
+            ValueError: If radius exceeds the cell size
+        """
+        if radius > self.cell_size:
+            raise ValueError(f"Radius {radius} exceeds grid cell size {self.cell_size}")
+        queries = np.asarray(queries, dtype=np.float64)
+        counts = np.zeros(len(queries), dtype=np.int64)
+        for rows, candidates in self._groups(queries):
+            if len(candidates):
+                squared = self._squared_distances(queries[rows], candidates)
+                counts[rows] = (squared <= radius * radius).sum(axis=1)
+        return counts
+
+
+def point_index(points, cell_size, brute_force_limit=20000):
+    """
+    Choose a neighbour index suited to the size of a point set.
+
+    Args:
+        points: N x 3 array of points
+        cell_size: Grid cell size used when neither scipy nor brute force fits
+        brute_force_limit: Largest set searched by brute force without scipy
+
+    Returns:
+        NeighborIndex (scipy or small sets) or GridIndex
+    """
+    if cKDTree is not None or len(points) <= brute_force_limit:
+        return NeighborIndex(points)
+    return GridIndex(points, cell_size)